@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Author-author co-engagement projection
+Projects the bipartite author x video graph onto authors as the sparse
+product B @ B.T, computed in row blocks sized by their expected output so a
+viral video can't make the product dense, with each author keeping only
+their strongest top-k links above a minimum weight.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Add current directory to path
+sys.path.append('.')
+
+from graph_artifacts import DEFAULT_CACHE_DIR, DEFAULT_INPUT, load_graph
+
+DEFAULT_TOP_K = 20
+DEFAULT_MIN_WEIGHT = 2
+# Upper bound on the nonzeros of one block's product before pruning
+DEFAULT_BLOCK_NNZ = 10_000_000
+OUTPUT_FILE = "collected_data/author_coengagement_edges.csv"
+
+
+def row_blocks(B, max_block_nnz=DEFAULT_BLOCK_NNZ):
+    """
+    Split the rows of B into blocks whose product with B.T stays bounded
+
+    Row i of B @ B.T has at most sum(commenters of each video i commented
+    on) nonzeros; rows are grouped until that estimate reaches
+    max_block_nnz. A single heavier row still gets a block of its own.
+
+    Returns:
+        List of (start, stop) row ranges
+    """
+    pattern = (B != 0).astype(np.float64)
+    commenters = np.asarray(pattern.sum(axis=0)).ravel()
+    estimate = pattern @ commenters
+
+    cumulative = np.cumsum(estimate)
+    blocks, start = [], 0
+    while start < B.shape[0]:
+        done = cumulative[start - 1] if start else 0.0
+        stop = max(int(np.searchsorted(cumulative, done + max_block_nnz, side='right')), start + 1)
+        blocks.append((start, stop))
+        start = stop
+    return blocks
+
+
+def _top_k(rows, cols, weights, k):
+    """Keep each row's k heaviest entries (ties go to the lower column)"""
+    order = np.lexsort((cols, -weights, rows))
+    rows, cols, weights = rows[order], cols[order], weights[order]
+    first = np.searchsorted(rows, rows, side='left')
+    keep = np.arange(len(rows)) - first < k
+    return rows[keep], cols[keep], weights[keep]
+
+
+def project_authors(B, top_k=DEFAULT_TOP_K, min_weight=DEFAULT_MIN_WEIGHT, weighted=False,
+                    max_block_nnz=DEFAULT_BLOCK_NNZ, verbose=False):
+    """
+    Author-author co-engagement weights from the author x video matrix
+
+    Args:
+        B: CSR author x video matrix (comment counts)
+        top_k: Links kept per author (None = keep all)
+        min_weight: Drop links weaker than this
+        weighted: Multiply comment counts instead of counting shared videos
+        max_block_nnz: Work bound per row block, see row_blocks()
+        verbose: Print progress per block
+
+    Returns:
+        Tuple (source, target, weight) arrays with source < target; a link
+        is kept if it is in the top-k of either author
+    """
+    B = B.tocsr().astype(np.float64)
+    if not weighted:
+        B.data = np.ones_like(B.data)
+    BT = B.T.tocsr()
+
+    kept_rows, kept_cols, kept_weights = [], [], []
+    blocks = row_blocks(B, max_block_nnz)
+    for number, (start, stop) in enumerate(blocks, 1):
+        C = (B[start:stop] @ BT).tocoo()
+        rows = C.row.astype(np.int64) + start
+        cols = C.col.astype(np.int64)
+        mask = (rows != cols) & (C.data >= min_weight)
+        rows, cols, weights = rows[mask], cols[mask], C.data[mask]
+        if top_k is not None:
+            rows, cols, weights = _top_k(rows, cols, weights, top_k)
+        kept_rows.append(rows)
+        kept_cols.append(cols)
+        kept_weights.append(weights)
+        if verbose:
+            print(f"  Block {number}/{len(blocks)}: authors {start:,}-{stop:,}, {len(rows):,} links kept")
+
+    n = B.shape[0]
+    kept = sparse.coo_matrix(
+        (np.concatenate(kept_weights or [np.empty(0)]),
+         (np.concatenate(kept_rows or [np.empty(0, np.int64)]),
+          np.concatenate(kept_cols or [np.empty(0, np.int64)]))),
+        shape=(n, n),
+    ).tocsr()
+    # A link kept by either endpoint is kept once, as source < target
+    upper = sparse.triu(kept.maximum(kept.T), k=1).tocoo()
+    return upper.row, upper.col, upper.data
+
+
+def coengagement_edges(graph, **kwargs):
+    """
+    Project a GraphArtifact onto authors
+
+    Returns:
+        DataFrame with author_a, author_b and weight (shared videos, or the
+        comment-count product if weighted=True), heaviest first
+    """
+    source, target, weight = project_authors(graph.matrix, **kwargs)
+    authors = graph.authors
+    edges = pd.DataFrame({
+        'author_a': authors.take(source),
+        'author_b': authors.take(target),
+        'weight': weight if kwargs.get('weighted') else weight.astype(np.int64),
+    })
+    return edges.sort_values('weight', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project the author-video graph onto authors")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="Sentiment results CSV")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Edge list CSV to write")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Graph artifact cache directory")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K,
+                        help="Links kept per author (0 = keep all)")
+    parser.add_argument("--min-weight", type=float, default=DEFAULT_MIN_WEIGHT,
+                        help="Drop links weaker than this")
+    parser.add_argument("--weighted", action="store_true",
+                        help="Weight links by comment counts instead of shared videos")
+    parser.add_argument("--block-nnz", type=int, default=DEFAULT_BLOCK_NNZ,
+                        help="Bound on one row block's product size")
+    args = parser.parse_args(argv)
+
+    if args.top_k < 0:
+        parser.error("--top-k must be 0 or a positive integer")
+    if args.block_nnz <= 0:
+        parser.error("--block-nnz must be positive")
+
+    graph = load_graph(args.input, cache_dir=args.cache_dir)
+    print(f"Projecting {graph.meta['authors']:,} authors over {graph.meta['videos']:,} videos...")
+    edges = coengagement_edges(
+        graph, top_k=args.top_k or None, min_weight=args.min_weight,
+        weighted=args.weighted, max_block_nnz=args.block_nnz, verbose=True,
+    )
+    edges.to_csv(args.output, index=False, encoding='utf-8')
+    print(f"✅ {len(edges):,} co-engagement links saved to: {args.output}")
+    return edges
+
+
+if __name__ == "__main__":
+    main()
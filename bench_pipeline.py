@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# bench_pipeline.py
+"""
+End-to-end benchmark from collection to influence on synthetic comments
+A synthetic YouTube API serves comment threads with realistic shapes (Zipfian
+authors per video and comments per video, reply threads, long-tailed text
+lengths, emoji and template spam), so the real collector code builds the
+rows. Each stage is timed with profiling.py and compared against the
+baseline committed next to this script; the run fails when a stage got
+slower than the tolerance allows, or when no baseline matches the workload.
+Baselines come from whatever host saved them, so every run also times a
+fixed calibration loop and the baseline's stage times are scaled by the
+ratio of the two calibrations before comparing.
+
+    python bench_pipeline.py --size 10k          # exits 1 on a regression
+    python bench_pipeline.py --size 10k --save-baseline
+    python bench_pipeline.py --rows 5000 --no-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+# Add current directory to path
+sys.path.append('.')
+
+import numpy as np
+
+import profiling
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+BASELINE_FILE = os.getenv('BENCH_BASELINE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         "bench_pipeline_baseline.json"))
+# A stage regresses when it is this much slower than the baseline...
+TOLERANCE = float(os.getenv('BENCH_TOLERANCE', '0.25'))
+# ...and at least this many seconds slower (timer noise on short stages)
+MIN_REGRESSION_SECONDS = float(os.getenv('BENCH_MIN_REGRESSION_SECONDS', '0.05'))
+# Best of this many runs of the calibration loop
+CALIBRATION_REPEATS = 5
+BENCH_METRICS = ['degree', 'prestige', 'pagerank', 'hubs', 'bridge', 'replies', 'communities']
+
+# Synthetic data shape
+VIDEOS = 50                 # one search page, as the collector fetches
+AUTHORS_PER_ROW = 0.12      # distinct authors per comment
+AUTHOR_ZIPF = 1.1           # author activity within a video
+VIDEO_ZIPF = 0.9            # comments per video
+REPLY_THREAD_RATE = 0.25    # threads with replies
+MEAN_REPLIES = 2.5          # replies per thread that has any (geometric)
+NESTED_REPLY_RATE = 0.4     # replies answering an earlier reply ('@author ...')
+MEDIAN_WORDS = 9            # log-normal comment length
+WORDS_SIGMA = 0.9
+MAX_WORDS = 300
+EMOJI_RATE = 0.15
+SPAM_RATE = 0.04
+SPAM_ACCOUNTS = 25
+START = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+
+FILLER = ['the', 'a', 'this', 'video', 'channel', 'not', 'very', 'so', 'but', 'really', 'lol', 'first',
+          'I', 'you', 'is', 'was', 'and', 'to', 'it', 'of', 'Thanks', 'GREAT', 'song', 'part', 'watch']
+EMOJI = ['🔥', '😂', '❤️', '👍', '😍', '🙏', '😭', '💯', '👏', '🤣']
+SPAM_TEMPLATES = [
+    "Check out my channel for daily {n} tips!!!",
+    "FREE gift cards at giveaway{n} dot com, limited time",
+    "Who is watching in {n}? Like if you are",
+    "I made ${n} working from home, DM me to learn how",
+]
+
+
+class SyntheticComments:
+    """Comment threads for VIDEOS videos, generated page by page from a seed"""
+
+    def __init__(self, rows, seed=42, videos=VIDEOS):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+        self.rows = rows
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.video_ids = [f'vid{seed}_{i:03d}' for i in range(videos)]
+        weights = 1.0 / np.arange(1, videos + 1) ** VIDEO_ZIPF
+        counts = self.rng.multinomial(rows, weights / weights.sum())
+        self.remaining = dict(zip(self.video_ids, (int(n) for n in counts)))
+        self.authors = max(10, int(rows * AUTHORS_PER_ROW))
+        author_weights = np.cumsum(1.0 / np.arange(1, self.authors + 1) ** AUTHOR_ZIPF)
+        self.author_cdf = author_weights / author_weights[-1]
+        lexicon = sorted(word for word in SentimentIntensityAnalyzer().lexicon if word.isalpha())
+        self.vocabulary = np.array(FILLER * 3 + lexicon[::8], dtype=object)
+        self.clock = {video_id: START + i * 3600.0 for i, video_id in enumerate(self.video_ids)}
+        self.issued = 0
+
+    def video_details(self, video_id):
+        index = self.video_ids.index(video_id)
+        return {
+            'id': video_id,
+            'snippet': {'title': f'Synthetic video {index}', 'description': '', 'channelTitle': f'channel{index % 7}',
+                        'publishedAt': _iso(START + index * 3600.0)},
+            'statistics': {'viewCount': str(1000 * (self.remaining[video_id] + 1)), 'likeCount': '0',
+                           'commentCount': str(self.remaining[video_id])},
+        }
+
+    def _authors(self, video_id, n):
+        # Every video has its own heavy commenters, overlapping across videos
+        offset = self.video_ids.index(video_id) * 7919
+        ranks = np.searchsorted(self.author_cdf, self.rng.random(n), side='right')
+        return (np.minimum(ranks, self.authors - 1) + offset) % self.authors
+
+    def _texts(self, n):
+        words = np.minimum(np.ceil(self.rng.lognormal(np.log(MEDIAN_WORDS), WORDS_SIGMA, n)), MAX_WORDS).astype(int)
+        picks = self.vocabulary[self.rng.integers(0, len(self.vocabulary), words.sum())]
+        emoji = self.rng.random(n) < EMOJI_RATE
+        ends = np.cumsum(words)
+        texts = []
+        for i, end in enumerate(ends):
+            text = ' '.join(picks[end - words[i]:end])
+            if emoji[i]:
+                text += ' ' + ''.join(self.rng.choice(EMOJI, size=int(self.rng.integers(1, 4))))
+            texts.append(text)
+        return texts
+
+    def page(self, video_id, max_threads):
+        """
+        Up to max_threads comment threads of a video, newest first
+
+        Returns:
+            (commentThreads items, True if the video has more comments)
+        """
+        budget = self.remaining[video_id]
+        if budget == 0:
+            return [], False
+        replies = np.where(self.rng.random(max_threads) < REPLY_THREAD_RATE,
+                           self.rng.geometric(1 / MEAN_REPLIES, max_threads), 0)
+        # Take whole threads while they fit, trimming the last so the video ends exactly on its count
+        ends = np.cumsum(replies + 1)
+        n = min(max_threads, int(np.searchsorted(ends, budget)) + 1)
+        replies = replies[:n]
+        replies[-1] -= max(int(ends[n - 1]) - budget, 0)
+        total = n + int(replies.sum())
+        authors = self._authors(video_id, total)
+        texts = self._texts(total)
+        likes = self.rng.geometric(0.3, total) - 1
+        spam = self.rng.random(n) < SPAM_RATE
+        gaps = self.rng.exponential(60.0, total)
+
+        items, row = [], 0
+        for i in range(n):
+            thread = f'{video_id}-{self.issued + row}'
+            top = self._snippet(authors[row], texts[row], likes[row] * 3, video_id, gaps[row])
+            if spam[i]:
+                top['authorDisplayName'] = f'spam_account_{authors[row] % SPAM_ACCOUNTS}'
+                top['textDisplay'] = SPAM_TEMPLATES[authors[row] % len(SPAM_TEMPLATES)].format(n=row % 97)
+            item = {'id': thread, 'snippet': {'topLevelComment': {'snippet': top},
+                                              'totalReplyCount': int(replies[i])}}
+            row += 1
+            if replies[i]:
+                comments, names = [], [top['authorDisplayName']]
+                for k in range(int(replies[i])):
+                    snippet = self._snippet(authors[row], texts[row], likes[row], video_id, gaps[row])
+                    if k and self.rng.random() < NESTED_REPLY_RATE:
+                        snippet['textDisplay'] = f"@{names[-1]} {snippet['textDisplay']}"
+                    names.append(snippet['authorDisplayName'])
+                    comments.append({'id': f'{thread}.r{k}', 'snippet': snippet})
+                    row += 1
+                item['replies'] = {'comments': comments}
+            items.append(item)
+        self.remaining[video_id] -= total
+        self.issued += total
+        return items, self.remaining[video_id] > 0
+
+    def _snippet(self, author, text, likes, video_id, gap):
+        self.clock[video_id] -= gap
+        return {'authorDisplayName': f'user{author}', 'textDisplay': text, 'likeCount': int(likes),
+                'publishedAt': _iso(self.clock[video_id])}
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class _Request:
+    def __init__(self, body):
+        self.body = body
+
+    def execute(self):
+        return self.body
+
+
+class SyntheticYouTube:
+    """The YouTube Data API resources the collector uses, answered from SyntheticComments"""
+
+    def __init__(self, comments):
+        self.comments = comments
+
+    def search(self):
+        return self
+
+    def videos(self):
+        return self
+
+    def commentThreads(self):
+        return self
+
+    def list(self, part, **params):
+        if 'q' in params:
+            return _Request({'items': [{'id': {'videoId': video_id}}
+                                       for video_id in self.comments.video_ids[:params['maxResults']]]})
+        if 'id' in params:
+            return _Request({'items': [self.comments.video_details(video_id) for video_id in params['id'].split(',')]})
+        items, more = self.comments.page(params['videoId'], params['maxResults'])
+        body = {'items': items}
+        if more:
+            body['nextPageToken'] = str(len(items))
+        return _Request(body)
+
+
+def run_benchmark(rows, work_dir, seed=42, engine='vectorized', workers=1):
+    """
+    Run every benchmark stage once; call inside an active profiling.Profiler
+
+    Args:
+        rows: Synthetic comments to collect
+        work_dir: Directory for the collected file, results and graph caches
+        seed: Generator seed
+        engine: Sentiment engine
+        workers: Sentiment worker processes
+
+    Returns:
+        Dict of row counts per stage
+    """
+    from collectors import CollectionStore
+    from comment_dataset import DatasetManifest
+    from communities import community_summary
+    from influence import RANK_COLUMNS, load_inputs, score_authors
+    from youtube_collector import YouTubeCollector
+    import youtube_sentiment_analysis as ysa
+
+    counts = {}
+    collector = YouTubeCollector(api_key='benchmark')
+    collector.youtube = SyntheticYouTube(SyntheticComments(rows, seed=seed))
+    collector.rate_limiter = None
+    store = CollectionStore(work_dir, 'bench', 'synthetic')
+    with profiling.stage('collect') as run, contextlib.redirect_stdout(io.StringIO()):
+        for batch in collector.stream('bench', max_comments=rows, max_videos=VIDEOS, include_replies=True):
+            store.write('youtube', batch)
+        store.close()
+        run.rows = counts['collect'] = store.rows.get('youtube', 0)
+
+    results = os.path.join(work_dir, 'youtube_sentiment_results.csv')
+    with profiling.stage('sentiment', rows=counts['collect']), contextlib.redirect_stdout(io.StringIO()):
+        labels = ysa.stream_sentiment(DatasetManifest(work_dir).dataset(), output_file=results,
+                                      workers=workers, engine=engine)
+    counts['sentiment'] = sum(labels.values())
+
+    cache_dir = os.path.join(work_dir, 'graph_cache')
+    with profiling.stage('graph_build', rows=counts['sentiment']), contextlib.redirect_stdout(io.StringIO()):
+        inputs = load_inputs(results, cache_dir=cache_dir)
+    counts['graph_build'] = len(inputs['edges'])
+
+    with profiling.stage('centralities', rows=len(inputs['nodes'])), contextlib.redirect_stdout(io.StringIO()):
+        profile = score_authors(inputs, metrics=BENCH_METRICS)
+    counts['centralities'] = len(profile)
+
+    with profiling.stage('summary', rows=len(profile)):
+        rank_by = next(column for column in RANK_COLUMNS if column in profile.columns)
+        summary = community_summary(profile, inputs['edges'], rank_by=rank_by)
+        profile.to_csv(os.path.join(work_dir, 'author_influence_profile.csv'), index=False)
+    counts['summary'] = len(summary)
+    return counts
+
+
+def calibrate(repeats=CALIBRATION_REPEATS):
+    """
+    Seconds this host takes for a fixed mix of Python, numpy and pandas work
+
+    Returns:
+        Best wall time of repeats runs, stored with each report
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    values = rng.random(500_000)
+    groups = rng.integers(0, 1000, len(values))
+    words = [f'word{i % 997}' for i in range(200_000)]
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        Counter(' '.join(words).lower().split())
+        np.sort(values)
+        pd.Series(values).groupby(groups).sum()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def host_scale(baseline, report):
+    """How many times slower this host is than the baseline's (1.0 if either lacks a calibration)"""
+    before = baseline.get('metadata', {}).get('calibration_seconds')
+    after = report.get('metadata', {}).get('calibration_seconds')
+    return after / before if before and after else 1.0
+
+
+def baseline_key(rows, seed, engine, workers):
+    """Runs are only compared with baselines of the same workload"""
+    return f'rows={rows} seed={seed} engine={engine} workers={workers}'
+
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(report, key, path=BASELINE_FILE):
+    baselines = load_baselines(path)
+    baselines[key] = report
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2)
+
+
+def find_regressions(baseline, report, tolerance=TOLERANCE, min_seconds=MIN_REGRESSION_SECONDS):
+    """
+    Stages of report that are slower than in baseline
+
+    Baseline times are first scaled to this host with host_scale().
+
+    Returns:
+        List of (stage, scaled baseline seconds, new seconds, ratio) beyond
+        both the relative tolerance and the absolute min_seconds
+    """
+    scale = host_scale(baseline, report)
+    return [(name, before * scale, after, ratio / scale)
+            for name, before, after, ratio in profiling.compare_reports(baseline, report)
+            if ratio is not None and ratio / scale > 1 + tolerance and after - before * scale > min_seconds]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the collection-to-influence stages on synthetic comments")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--size", choices=SIZES, default='10k', help="Preset workload (default: 10k)")
+    size.add_argument("--rows", type=int, help="Custom number of comments")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic data")
+    parser.add_argument("--engine", choices=['vader', 'vectorized'], default='vectorized', help="Sentiment engine")
+    parser.add_argument("--workers", type=int, default=1, help="Sentiment worker processes")
+    parser.add_argument("--mode", choices=profiling.MODES, default='timers',
+                        help="Also profile functions with cProfile or sampling (slows the run)")
+    parser.add_argument("--work-dir", help="Keep the generated data here instead of a temporary directory")
+    parser.add_argument("--report", help="Profile report path (default: under collected_data/profiles)")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="Baseline file (default: bench_pipeline_baseline.json next to this script)")
+    baseline = parser.add_mutually_exclusive_group()
+    baseline.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    baseline.add_argument("--no-baseline", action="store_true",
+                          help="Only report the timings (a run without a matching baseline fails otherwise)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"Allowed slowdown per stage before failing (default: {TOLERANCE:.0%})")
+    args = parser.parse_args(argv)
+
+    rows = args.rows or SIZES[args.size]
+    key = baseline_key(rows, args.seed, args.engine, args.workers)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.makedirs(work_dir, exist_ok=True)
+    print(f"Benchmarking {rows:,} synthetic comments ({key})")
+    calibration = calibrate()
+    try:
+        profiler = profiling.Profiler(f"bench_pipeline_{args.rows or args.size}", mode=args.mode,
+                                      output=args.report, argv=argv)
+        with profiler:
+            profiler.metadata.update(workload=key, calibration_seconds=round(calibration, 6), counts=run_benchmark(
+                rows, work_dir, seed=args.seed, engine=args.engine, workers=args.workers))
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = profiler.report()
+    print()
+    profiling.print_report(report)
+
+    if args.save_baseline:
+        save_baseline(report, key, args.baseline)
+        print(f"\n✅ Baseline saved to: {args.baseline}")
+        return 0
+    if args.no_baseline:
+        return 0
+
+    baseline = load_baselines(args.baseline).get(key)
+    if baseline is None:
+        print(f"\n❌ No baseline for this workload in {args.baseline}; run with --save-baseline to store one "
+              f"or --no-baseline to skip the comparison")
+        return 1
+    print(f"\nCalibration loop: {calibration:.3f}s, baseline times scaled x{host_scale(baseline, report):.2f}")
+    regressions = find_regressions(baseline, report, tolerance=args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}:")
+        for name, before, after, ratio in regressions:
+            print(f"  {name}: {before:.3f}s -> {after:.3f}s ({ratio - 1:+.0%})")
+        return 1
+    print(f"\n✅ No stage slower than the baseline by more than {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# bench_sentiment.py
+"""
+Throughput benchmark for the sentiment scoring engines
+Scores the same synthetic comments with VADER and the vectorized engine and
+reports rows/sec and the largest compound-score difference.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+# Add current directory to path
+sys.path.append('.')
+
+import youtube_sentiment_analysis as ysa
+from vader_vectorized import COMPOUND_TOLERANCE, VectorizedVader
+
+FILLER = ['the', 'a', 'this', 'video', 'channel', 'not', 'very', 'so', 'but',
+          'really', 'lol', 'first!', '🔥', ':)', 'Thanks', 'GREAT']
+
+
+def synthetic_comments(rows, seed=42):
+    """Random comments mixing lexicon words, filler and punctuation"""
+    rng = random.Random(seed)
+    lexicon = sorted(ysa.get_analyzer().lexicon)
+    comments = []
+    for _ in range(rows):
+        words = [rng.choice(lexicon) if rng.random() < 0.3 else rng.choice(FILLER)
+                 for _ in range(rng.randint(1, 30))]
+        comments.append(' '.join(words) + rng.choice(['', '!', '!!', '?', '.']))
+    return comments
+
+
+def timed(label, rows, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<12} {elapsed:8.2f}s  {rows / elapsed:12,.0f} rows/sec")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sentiment scoring engines")
+    parser.add_argument("--rows", type=int, default=100000, help="Synthetic comments to score")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the corpus")
+    args = parser.parse_args()
+
+    comments = synthetic_comments(args.rows, seed=args.seed)
+    scorer = VectorizedVader(ysa.get_analyzer())
+
+    print(f"Scoring {args.rows:,} synthetic comments")
+    expected, vader_time = timed("vader", args.rows, lambda: [ysa.get_sentiment_score(c) for c in comments])
+    actual, vectorized_time = timed("vectorized", args.rows, lambda: scorer.compound_scores(comments))
+
+    diffs = [abs(e - a) for e, a in zip(expected, actual)]
+    outside = sum(d > COMPOUND_TOLERANCE for d in diffs)
+    print(f"\nSpeedup: {vader_time / vectorized_time:.1f}x")
+    print(f"Max compound difference: {max(diffs):.4f} "
+          f"({outside:,} rows outside the {COMPOUND_TOLERANCE} tolerance)")
+
+
+if __name__ == "__main__":
+    main()
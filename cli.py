@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the collection and analysis commands
+    python cli.py <command> [options]     (or: python -m cli <command> ...)
+
+Each command runs an existing script's main(argv). The script is imported
+only when its command runs, so `--help`, config checks and short cron jobs
+don't pay for pandas, the Google API client or the graph libraries.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+# Add current directory to path
+sys.path.append('.')
+
+# command -> ('module:function', description); the function takes an argv list
+COMMANDS = {
+    'collect': ('social_collector:main', "Collect posts and comments for a hashtag from one or more platforms"),
+    'watch': ('youtube_watchlist:main', "Keep collecting new comments for a watchlist of hashtags and videos"),
+    'sentiment': ('youtube_sentiment_analysis:main', "Score collected YouTube comments with VADER"),
+    'network': ('youtube_network_analysis:main', "Draw commenter-video network figures"),
+    'influence': ('influence:main', "Compute author influence profiles and communities"),
+    'pipeline': ('pipeline:main', "Run the analysis stages whose inputs changed"),
+    'serve': ('query_service:main', "Serve influence and sentiment queries over HTTP"),
+    'summary': ('utils:main', "Summarize collected data files"),
+    'config': ('config:main', "Show the configuration and check the API keys"),
+}
+
+
+def resolve(command):
+    """Import and return a command's entry point"""
+    module_name, function_name = COMMANDS[command][0].split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    prog = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] not in ('', '-c', '-m') else 'cli.py'
+    if prog == '__main__.py':
+        prog = 'python -m cli'
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Social media collection and analysis",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n" + "\n".join(f"  {name:<11} {description}" for name, (_, description) in COMMANDS.items())
+              + f"\n\nRun '{prog} <command> --help' for a command's options.",
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="command", help="One of the commands below")
+    # Everything after the command belongs to the command's own parser
+    command = parser.parse_args(argv[:1]).command
+
+    # Usage lines of the command's parser read "<prog> <command> ..."
+    saved_argv = sys.argv
+    sys.argv = [f"{prog} {command}"] + argv[1:]
+    try:
+        return resolve(command)(argv[1:])
+    finally:
+        sys.argv = saved_argv
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,32 @@ import os
 
 import pandas as pd
 
-from xtweetcollector import get_twitter_comments
-from youtube_comment_collector import get_youtube_comments
+from collectors import available_platforms
+from config import config
+from social_collector import SocialMediaOrchestrator
 
 
 def collect(hashtag: str, max_results: int, youtube_api_key: str | None):
-    twitter_df = get_twitter_comments(hashtag, max_results)
+    # Twitter needs a bearer token (TWITTER_BEARER_TOKEN), YouTube an API key
+    platforms = ["twitter"] if config.TWITTER_BEARER_TOKEN and "twitter" in available_platforms() else []
+    if youtube_api_key:
+        platforms.append("youtube")
+    if not platforms:
+        return pd.DataFrame(), pd.DataFrame()
 
-    youtube_df = (
-        get_youtube_comments(youtube_api_key, hashtag, max_results)
-        if youtube_api_key
-        else pd.DataFrame()
+    results = SocialMediaOrchestrator().collect(
+        hashtag,
+        platforms,
+        twitter_max_results=max_results,
+        youtube_api_key=youtube_api_key,
+        youtube_max_comments=max_results,
     )
-
-    return twitter_df, youtube_df
+    return results.get("twitter", pd.DataFrame()), results.get("youtube", pd.DataFrame())
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
-        description="Collect social data for a hashtag (Twitter via snscrape, YouTube via API key)."
+        description="Collect social data for a hashtag (Twitter via bearer token, YouTube via API key, concurrently)."
     )
     parser.add_argument("hashtag", help="Hashtag without #")
     parser.add_argument(
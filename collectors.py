@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Collector registry and concurrent collection
+Every platform collector exposes the same streaming interface,
+stream(hashtag, **options), which yields DataFrame batches (one per API
+page) as they are fetched. Collectors are registered by name and imported
+only when used; collect_concurrently() runs several platforms at once, each
+paced by its own rate limiter, and hands their batches over as they arrive.
+"""
+
+import importlib
+import inspect
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+
+# name -> collector class, or 'module:ClassName' imported on first use
+COLLECTORS = {
+    'twitter': 'twitter_collector:TwitterCollector',
+    'youtube': 'youtube_collector:YouTubeCollector',
+}
+# Batches buffered between the collector threads and the consumer
+QUEUE_BATCHES = 64
+
+
+def register_collector(name, collector):
+    """
+    Register a collector class under a platform name
+
+    Args:
+        name: Platform name used on the command line (e.g. 'youtube')
+        collector: Class, or 'module:ClassName' string for a lazy import.
+            Instances need stream(hashtag, **options) yielding DataFrames;
+            the constructor may accept rate_limiter= and credentials.
+    """
+    COLLECTORS[name.lower()] = collector
+
+
+def available_platforms():
+    return sorted(COLLECTORS)
+
+
+def get_collector_class(name):
+    """Resolve a registered collector, importing its module if needed"""
+    try:
+        collector = COLLECTORS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown platform '{name}' (available: {', '.join(available_platforms())})") from None
+    if isinstance(collector, str):
+        module_name, class_name = collector.split(':')
+        collector = getattr(importlib.import_module(module_name), class_name)
+        COLLECTORS[name.lower()] = collector
+    return collector
+
+
+def split_options(collector_class, options):
+    """Split options into constructor and stream() keyword arguments by signature"""
+    init_names = set(inspect.signature(collector_class.__init__).parameters) - {'self'}
+    init = {key: value for key, value in options.items() if key in init_names}
+    stream = {key: value for key, value in options.items() if key not in init_names}
+    return init, stream
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket
+
+    Allows `rate` requests per second on average and bursts of up to
+    `burst` requests; acquire() blocks until a token is available. A request
+    can cost several tokens, e.g. API quota units.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_delay(cls, delay):
+        """Limiter allowing one request per `delay` seconds (None for no delay)"""
+        return cls(1.0 / delay) if delay and delay > 0 else None
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        if tokens > self.burst:
+            raise ValueError(f"cannot acquire {tokens} tokens with a burst of {self.burst}")
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if they are available now; returns False instead of waiting"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def available(self):
+        with self.lock:
+            self._refill()
+            return self.tokens
+
+    def pause(self, seconds):
+        """Hold all requests for `seconds`, e.g. until a server-side rate window resets"""
+        with self.lock:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+def collect_concurrently(hashtag, platforms, options=None, rate_limiters=None, stop=None):
+    """
+    Stream batches from several platforms at once
+
+    Each platform runs in its own thread; batches are yielded in arrival
+    order, so a slow platform doesn't hold up the others.
+
+    Args:
+        hashtag: Hashtag to search for (without #)
+        platforms: Registered platform names
+        options: {platform: keyword arguments}; names in the collector's
+            constructor signature go to the constructor, the rest to stream()
+        rate_limiters: {platform: RateLimiter}; platforms without one use
+            their collector's default pacing
+        stop: Optional threading.Event that ends collection early
+
+    Yields:
+        Tuples (platform, DataFrame batch), then (platform, None) once that
+        platform is finished. A platform that fails yields (platform,
+        exception) instead and the others carry on.
+    """
+    options = options or {}
+    rate_limiters = rate_limiters or {}
+    stop = stop or threading.Event()
+    batches = queue.Queue(maxsize=QUEUE_BATCHES)
+
+    def run(platform):
+        try:
+            collector_class = get_collector_class(platform)
+            init, stream = split_options(collector_class, dict(options.get(platform, {})))
+            if platform in rate_limiters and 'rate_limiter' in inspect.signature(collector_class.__init__).parameters:
+                init['rate_limiter'] = rate_limiters[platform]
+            collector = collector_class(**init)
+            for batch in collector.stream(hashtag, **stream):
+                if stop.is_set():
+                    break
+                if batch is not None and len(batch):
+                    batches.put((platform, batch))
+            batches.put((platform, None))
+        except Exception as e:
+            batches.put((platform, e))
+
+    running = len(platforms)
+    with ThreadPoolExecutor(max_workers=max(1, len(platforms)), thread_name_prefix='collector') as pool:
+        for platform in platforms:
+            pool.submit(run, platform)
+        try:
+            while running:
+                platform, item = batches.get()
+                if item is None or isinstance(item, Exception):
+                    running -= 1
+                yield platform, item
+        finally:
+            # Let the threads finish if the consumer stopped early
+            stop.set()
+            while running:
+                try:
+                    platform, item = batches.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is None or isinstance(item, Exception):
+                    running -= 1
+
+
+class CollectionStore:
+    """
+    Appends batches to one CSV per platform as they arrive
+
+    Files are named {platform}_{hashtag}_{timestamp}.csv in output_dir. With
+    combined=True the per-platform parts are merged into
+    social_media_{hashtag}_{timestamp}.csv on close().
+    """
+
+    def __init__(self, output_dir, hashtag, timestamp, combined=False):
+        self.output_dir = output_dir
+        self.hashtag = hashtag
+        self.timestamp = timestamp
+        self.combined = combined
+        self.paths = {}
+        self.columns = {}
+        self.rows = {}
+
+    def path_for(self, platform):
+        return os.path.join(self.output_dir, f"{platform}_{self.hashtag}_{self.timestamp}.csv")
+
+    def write(self, platform, batch):
+        """Append one batch; the first batch of a platform fixes its columns"""
+        path = self.paths.get(platform)
+        with profiling.stage('store_write', rows=len(batch)):
+            if path is None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                path = self.paths[platform] = self.path_for(platform)
+                self.columns[platform] = list(batch.columns)
+                batch.to_csv(path, index=False, encoding='utf-8')
+            else:
+                batch.reindex(columns=self.columns[platform]).to_csv(
+                    path, index=False, header=False, mode='a', encoding='utf-8'
+                )
+        self.rows[platform] = self.rows.get(platform, 0) + len(batch)
+
+    def close(self):
+        """
+        Finish writing
+
+        Returns:
+            List of the files written
+        """
+        if not self.combined or not self.paths:
+            return list(self.paths.values())
+        import pandas as pd
+
+        path = os.path.join(self.output_dir, f"social_media_{self.hashtag}_{self.timestamp}.csv")
+        combined = pd.concat([pd.read_csv(part, encoding='utf-8') for part in self.paths.values()],
+                             ignore_index=True)
+        combined.to_csv(path, index=False, encoding='utf-8')
+        for part in self.paths.values():
+            os.remove(part)
+        return [path]
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Manifest-backed loader for collected comment CSVs
+Keeps a manifest of every input file (path, size, mtime, row count, schema
+and the byte offset read up to) so runs can tell new files and rows appended
+to known files from ones already processed, and reads them with a fixed
+schema instead of per-file dtype inference. pandas is imported on first
+use, so commands that only need the constants start quickly.
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import memory
+
+DEFAULT_DATA_DIR = "collected_data"
+MANIFEST_NAME = ".youtube_manifest.json"
+MANIFEST_VERSION = 1
+FINGERPRINT_BYTES = 64 * 1024
+# Bytes scanned per step when looking for the last complete record
+SCAN_BYTES = 1024 * 1024
+
+# Columns written by YouTubeCollector.get_video_comments, with fixed dtypes
+COMMENT_DTYPES = {
+    'platform': str,
+    'video_id': str,
+    'video_title': str,
+    'video_views': 'Int64',
+    'channel_title': str,
+    'comment_id': str,
+    'parent_id': str,
+    'author': str,
+    'text': str,
+    'likes': 'Int64',
+    'published_at': str,
+    'updated_at': str,
+    'is_reply': 'boolean',
+    'collected_at': str,
+    'hashtag_query': str,
+}
+
+# Files produced by later pipeline stages that also match youtube_*.csv
+DERIVED_OUTPUT_PATTERNS = (
+    'youtube_sentiment_results*.csv',
+)
+
+
+def is_derived_output(path):
+    """Return True for files written by analysis stages rather than collectors"""
+    name = Path(path).name
+    return any(fnmatch.fnmatch(name, pattern) for pattern in DERIVED_OUTPUT_PATTERNS)
+
+
+class BoundedReader:
+    """File wrapper that stops at a byte limit, so a half-written last record is left for next time"""
+
+    def __init__(self, f, limit):
+        self.f = f
+        self.remaining = limit
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        return iter(self.read().splitlines(keepends=True))
+
+
+def file_fingerprint(path, offset):
+    """Hash of the header and the bytes just before offset, to detect rewritten files"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        h.update(f.readline())
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        h.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    return h.hexdigest()
+
+
+def complete_lines_end(path, size, start=0):
+    """
+    Byte position just past the last complete CSV record at or before size
+
+    Quoted fields may contain newlines, so a newline only ends a record
+    where the quotes since start are balanced ("" escapes count twice).
+    start must be a record boundary, such as the end of the header or an
+    offset returned earlier; only the bytes after it are scanned.
+    """
+    import numpy as np
+
+    end = position = start
+    quoted = 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while position < size:
+            block = np.frombuffer(f.read(min(SCAN_BYTES, size - position)), dtype=np.uint8)
+            if not len(block):
+                break
+            # 1 after each byte that leaves a quoted field open
+            open_quote = (np.cumsum(block == ord('"')) + quoted) % 2
+            boundaries = np.flatnonzero((block == ord('\n')) & (open_quote == 0))
+            if len(boundaries):
+                end = position + int(boundaries[-1]) + 1
+            quoted = int(open_quote[-1])
+            position += len(block)
+    return end
+
+
+def read_comments_csv(path, chunksize=None, names=None):
+    """
+    Read a collected comments CSV with the fixed schema
+
+    Unknown columns are skipped and missing ones are simply absent. With
+    chunksize, returns an iterator of chunks; under a memory budget their
+    size adapts and chunksize is the upper limit. Pass the header as names
+    to read a file object positioned past it.
+    """
+    import pandas as pd
+
+    options = dict(usecols=lambda column: column in COMMENT_DTYPES, dtype=COMMENT_DTYPES, encoding='utf-8')
+    if names is not None:
+        options.update(header=None, names=names)
+    if chunksize is None:
+        return pd.read_csv(path, **options)
+    return memory.read_csv_chunks(path, chunksize, **options)
+
+
+class CommentDataset:
+    """Lazily concatenated view over a list of manifest entries"""
+
+    def __init__(self, entries, manifest=None):
+        self.entries = list(entries)
+        self.manifest = manifest
+
+    @property
+    def files(self):
+        return [entry['path'] for entry in self.entries]
+
+    @property
+    def known_rows(self):
+        """Row count from the manifest, or None if some file hasn't been read yet"""
+        if any(entry.get('rows') is None for entry in self.entries):
+            return None
+        return sum(entry['rows'] for entry in self.entries)
+
+    def iter_chunks(self, chunksize=None):
+        """
+        Yield DataFrames file by file (and chunk by chunk if chunksize is set,
+        see read_comments_csv())
+
+        Files are read up to the last complete record at scan time; entries of
+        grown files start at the offset already processed. Each frame carries
+        a 'source_file' column. Row counts and offsets are recorded in the
+        entries once a file has been read completely.
+        """
+        for entry in self.entries:
+            rows = 0
+            with open(entry['path'], 'rb') as f:
+                start = entry.get('start') or len(f.readline())
+                end = complete_lines_end(entry['path'], entry['size'], start)
+                if end > start:
+                    f.seek(start)
+                    reader = read_comments_csv(BoundedReader(f, end - start), chunksize=chunksize,
+                                               names=entry['columns'])
+                    for chunk in ([reader] if chunksize is None else reader):
+                        chunk['source_file'] = entry['path']
+                        rows += len(chunk)
+                        yield chunk
+            entry['rows'] = entry.pop('rows_before', 0) + rows
+            entry.pop('start', None)
+            entry['offset'] = max(end, start)
+            entry['fingerprint'] = file_fingerprint(entry['path'], entry['offset'])
+
+    def to_frame(self):
+        """Materialize the whole view as one DataFrame"""
+        import pandas as pd
+
+        frames = list(self.iter_chunks())
+        if not frames:
+            return pd.DataFrame(columns=list(COMMENT_DTYPES) + ['source_file'])
+        return pd.concat(frames, ignore_index=True)
+
+    def commit(self):
+        """Mark every file in this view as processed"""
+        if self.manifest is not None:
+            self.manifest.record(self.entries)
+            self.manifest.save()
+
+
+class DatasetManifest:
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, pattern='youtube_*.csv', path=None):
+        """
+        Load (or start) the manifest for a data directory
+
+        Args:
+            data_dir: Directory holding collected CSV files
+            pattern: Glob for collector output files
+            path: Manifest file (default: <data_dir>/.youtube_manifest.json)
+        """
+        self.data_dir = Path(data_dir)
+        self.pattern = pattern
+        self.path = Path(path) if path else self.data_dir / MANIFEST_NAME
+        self.files = {}
+
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('version') == MANIFEST_VERSION:
+                self.files = stored.get('files', {})
+
+    def scan(self):
+        """
+        Stat the input files and compare them with the manifest
+
+        Only new or changed files have their header read; nothing else is parsed.
+        A changed file whose already processed bytes are intact (it was only
+        appended to) appears in new_entries starting at the processed offset.
+
+        Returns:
+            Tuple (all_entries, new_entries)
+        """
+        import pandas as pd
+
+        all_entries, new_entries = [], []
+
+        for path in sorted(self.data_dir.glob(self.pattern)):
+            if is_derived_output(path):
+                continue
+
+            stat = path.stat()
+            known = self.files.get(str(path))
+            if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                all_entries.append(dict(known))
+                continue
+
+            columns = list(pd.read_csv(path, nrows=0, encoding='utf-8').columns)
+            if 'text' not in columns:
+                print(f"⚠️  Skipping {path}: no 'text' column")
+                continue
+
+            entry = {
+                'path': str(path),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'rows': None,
+                'columns': columns,
+            }
+            all_entries.append(entry)
+            if known and known.get('offset') and columns == known['columns'] and \
+                    stat.st_size >= known['offset'] and \
+                    file_fingerprint(path, known['offset']) == known['fingerprint']:
+                entry = dict(entry, start=known['offset'], rows_before=known['rows'])
+            new_entries.append(entry)
+
+        return all_entries, new_entries
+
+    def dataset(self, only_new=False):
+        """
+        Return a CommentDataset over all input files, or with only_new over
+        new files and the rows appended to known ones
+
+        Raises:
+            ValueError: With only_new, if a processed file was changed other
+                than by appending rows
+        """
+        all_entries, new_entries = self.scan()
+        if not only_new:
+            return CommentDataset(all_entries, manifest=self)
+        for entry in new_entries:
+            if entry['path'] in self.files and 'start' not in entry:
+                raise ValueError(f"{entry['path']} was changed, not just appended to, since it was processed; "
+                                 f"process all files instead of only new ones")
+        return CommentDataset(new_entries, manifest=self)
+
+    def record(self, entries):
+        for entry in entries:
+            self.files[entry['path']] = dict(entry)
+
+    def save(self):
+        """Write the manifest atomically"""
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        return self.path
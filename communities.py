@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Community detection on sparse graphs
+Multi-level Louvain where each local-moving sweep is computed for all nodes
+at once with sparse products (a random share of the improving nodes moves
+per sweep so neighbours don't swap back and forth), then communities are
+collapsed into super-nodes and the next level runs on the smaller graph.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from engagement_graph import sentiment_labels
+
+DEFAULT_RESOLUTION = 1.0
+DEFAULT_SEED = 42
+MAX_LEVELS = 10
+MAX_SWEEPS = 30
+MOVE_FRACTION = 0.5
+MIN_GAIN = 1e-7
+TOP_INFLUENCERS = 3
+
+
+def _one_hot(labels, k):
+    n = len(labels)
+    return sparse.csr_matrix((np.ones(n), (np.arange(n), labels)), shape=(n, k))
+
+
+def modularity(W, labels, resolution=DEFAULT_RESOLUTION):
+    """Modularity of a partition of the symmetric weighted graph W"""
+    W = W.tocoo()
+    m2 = W.data.sum()
+    if m2 == 0:
+        return 0.0
+    k = len(labels) and labels.max() + 1
+    same = labels[W.row] == labels[W.col]
+    internal = np.bincount(labels[W.row[same]], weights=W.data[same], minlength=k)
+    total = np.bincount(labels, weights=np.asarray(W.sum(axis=1)).ravel(), minlength=k)
+    return float((internal / m2 - resolution * (total / m2) ** 2).sum())
+
+
+def _local_moving(W, resolution, rng, max_sweeps):
+    """
+    Move nodes to the neighbouring community with the best modularity gain
+
+    Returns:
+        Tuple (labels, sweeps)
+    """
+    n = W.shape[0]
+    degree = np.asarray(W.sum(axis=1)).ravel()
+    self_loops = W.diagonal()
+    m2 = degree.sum()
+    labels = np.arange(n)
+    if m2 == 0:
+        return labels, 0
+    quality = modularity(W, labels, resolution)
+
+    for sweep in range(1, max_sweeps + 1):
+        total = np.bincount(labels, weights=degree, minlength=n)
+        # Weight from each node into each neighbouring community, row by row
+        links = (W @ _one_hot(labels, n)).tocsr()
+        counts = np.diff(links.indptr)
+        rows = np.repeat(np.arange(n), counts)
+        communities, weights = links.indices, links.data.copy()
+        own = communities == labels[rows]
+        weights[own] -= self_loops[rows[own]]
+
+        gain = weights - resolution * degree[rows] * total[communities] / m2
+        stay = -resolution * degree * (total[labels] - degree) / m2
+        stay[rows[own]] += weights[own]
+        gain[own] = stay[rows[own]]
+
+        # Best community per node (ties go to the lowest community id)
+        linked = np.flatnonzero(counts)
+        starts = links.indptr[linked]
+        best_gain = np.maximum.reduceat(gain, starts)
+        is_best = gain == np.repeat(best_gain, counts[linked])
+        best = np.minimum.reduceat(np.where(is_best, communities, n), starts)
+        improves = (best != labels[linked]) & (best_gain > stay[linked] + MIN_GAIN * m2)
+        candidates, targets = linked[improves], best[improves]
+        if len(candidates) == 0:
+            break
+
+        chosen = rng.random(len(candidates)) < MOVE_FRACTION
+        if not chosen.any():
+            chosen[0] = True
+        previous = labels.copy()
+        labels[candidates[chosen]] = targets[chosen]
+        new_quality = modularity(W, labels, resolution)
+        if new_quality < quality + MIN_GAIN:
+            labels = previous.copy()
+            # Simultaneous moves cancelled out; settle for the single best one
+            margin = best_gain[improves] - stay[candidates]
+            single = np.argmax(margin)
+            labels[candidates[single]] = targets[single]
+            new_quality = modularity(W, labels, resolution)
+            if new_quality < quality + MIN_GAIN:
+                labels = previous
+                break
+        quality = new_quality
+    return labels, sweep
+
+
+def louvain(A, resolution=DEFAULT_RESOLUTION, seed=DEFAULT_SEED, max_levels=MAX_LEVELS,
+            max_sweeps=MAX_SWEEPS):
+    """
+    Multi-level Louvain community detection
+
+    Args:
+        A: Sparse adjacency matrix; direction is ignored (A + A^T)
+        resolution: Higher values give smaller communities
+        seed: Random seed for which improving nodes move in each sweep
+        max_levels: Aggregation levels
+        max_sweeps: Local-moving sweeps per level
+
+    Returns:
+        Tuple (membership array of community ids numbered by size,
+        diagnostics dict with levels, sweeps, communities and modularity)
+    """
+    n = A.shape[0]
+    W = (A + A.T).tocsr().astype(np.float64)
+    rng = np.random.default_rng(seed)
+    membership = np.arange(n)
+    if W.data.sum() == 0:
+        # No edges: every node is its own community and there is no gain to divide by 2m
+        return membership, {'levels': 0, 'sweeps': [], 'communities': n, 'modularity': 0.0}
+    graph = W
+    sweeps = []
+
+    for _ in range(max_levels):
+        labels, level_sweeps = _local_moving(graph, resolution, rng, max_sweeps)
+        codes, uniques = pd.factorize(labels)
+        if len(uniques) == graph.shape[0]:
+            break
+        sweeps.append(level_sweeps)
+        membership = codes[membership]
+        C = _one_hot(codes, len(uniques))
+        graph = (C.T @ graph @ C).tocsr()
+
+    # Number communities from largest to smallest
+    sizes = np.bincount(membership, minlength=membership.max() + 1 if n else 0)
+    rank = np.empty_like(sizes)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+    membership = rank[membership] if n else membership
+    return membership, {
+        'levels': len(sweeps),
+        'sweeps': sweeps,
+        'communities': int(len(np.unique(membership))),
+        'modularity': modularity(W, membership, resolution) if n else 0.0,
+    }
+
+
+def community_summary(profile, edges, top_n=TOP_INFLUENCERS, rank_by='prestige_influence'):
+    """
+    Per-community size, sentiment and top influencers
+
+    Args:
+        profile: Author influence profile with author, community and rank_by columns
+        edges: Author -> video edges (aggregate_edges format)
+        top_n: Influencers listed per community
+        rank_by: Column that orders the influencers
+
+    Returns:
+        DataFrame with community, authors, videos, comments, mean_sentiment,
+        sentiment and top_influencers, largest community first
+    """
+    community_of = profile.set_index('author')['community']
+    members = edges.assign(community=edges['author'].map(community_of))
+    scored = members['mean_sentiment'].notna()
+    members['score_weight'] = members['weight'].where(scored, 0)
+    members['score_sum'] = (members['mean_sentiment'] * members['weight']).where(scored, 0)
+    totals = members.groupby('community').agg(
+        videos=('video', 'nunique'),
+        comments=('weight', 'sum'),
+        score_sum=('score_sum', 'sum'),
+        score_weight=('score_weight', 'sum'),
+    )
+
+    top = profile.sort_values(rank_by, ascending=False, kind='stable').groupby('community')['author'] \
+        .agg(lambda authors: '; '.join(authors.astype(str).head(top_n)))
+    summary = pd.DataFrame({
+        'authors': profile.groupby('community').size(),
+        'videos': totals['videos'],
+        'comments': totals['comments'],
+        'mean_sentiment': totals['score_sum'] / totals['score_weight'].where(totals['score_weight'] > 0),
+        'top_influencers': top,
+    })
+    summary['sentiment'] = sentiment_labels(summary['mean_sentiment'])
+    summary = summary.rename_axis('community').reset_index()
+    summary = summary.sort_values(['authors', 'community'], ascending=[False, True])
+    return summary[['community', 'authors', 'videos', 'comments', 'mean_sentiment', 'sentiment', 'top_influencers']]
+
+
+def print_diagnostics(info):
+    print(f"  communities: {info['communities']:,} found in {info['levels']} levels "
+          f"(modularity {info['modularity']:.3f})")
@@ -2,37 +2,88 @@
 """
 Configuration loader for Social Media Collector
 Simplified for YouTube testing
+
+Settings are read from the environment when first used, after loading the
+.env file once, so importing this module stays cheap and side-effect free.
 """
 
 import os
 from pathlib import Path
 from typing import Dict, Any
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
 env_path = Path('.') / '.env'
-load_dotenv(dotenv_path=env_path)
+_env_loaded = False
 
 
-class Config:
-    """Application configuration - Simplified for YouTube testing"""
-    
+def load_env(path=None):
+    """
+    Load the .env file into os.environ once (variables already set win)
+
+    Returns:
+        True if a file was read
+    """
+    global _env_loaded
+    if _env_loaded:
+        return False
+    _env_loaded = True
+    path = Path(path) if path else env_path
+    if not path.exists():
+        return False
+    from dotenv import load_dotenv
+    return load_dotenv(dotenv_path=path)
+
+
+def _flag(value):
+    return value.lower() == 'true'
+
+
+def _names(value):
+    return [p.strip().lower() for p in value.split(',') if p.strip()]
+
+
+# Setting -> (default, parser); each is read from the environment variable of the same name
+SETTINGS = {
     # YouTube API (Required for testing)
-    YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY', '')
-    
-    # Twitter API (Optional - will be used later)
-    TWITTER_BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN', '')
-    
+    'YOUTUBE_API_KEY': ('', str),
+
+    # Twitter API
+    'TWITTER_BEARER_TOKEN': ('', str),
+    'TWITTER_API_URL': ('https://api.twitter.com', str),
+
     # Application settings
-    DEFAULT_MAX_RESULTS = int(os.getenv('DEFAULT_MAX_RESULTS', '50'))  # Lower for testing
-    OUTPUT_DIR = os.getenv('OUTPUT_DIR', 'collected_data')
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-    
+    'DEFAULT_MAX_RESULTS': ('50', int),  # Lower for testing
+    'OUTPUT_DIR': ('collected_data', str),
+    'LOG_LEVEL': ('INFO', str),
+    'DEFAULT_PLATFORMS': ('youtube', _names),
+
     # Rate limiting
-    YOUTUBE_REQUEST_DELAY = float(os.getenv('YOUTUBE_REQUEST_DELAY', '0.2'))  # Slower for testing
-    
+    'YOUTUBE_REQUEST_DELAY': ('0.2', float),  # Slower for testing
+    'YOUTUBE_DAILY_QUOTA': ('10000', int),  # API units per day
+
     # Data preferences
-    INCLUDE_REPLIES = os.getenv('INCLUDE_REPLIES', 'true').lower() == 'true'
+    'INCLUDE_REPLIES': ('true', _flag),
+}
+
+
+class _Settings(type):
+    """Resolves Config.<SETTING> from the environment on access"""
+
+    def __getattr__(cls, name):
+        if name not in SETTINGS:
+            raise AttributeError(name)
+        load_env()
+        default, parse = SETTINGS[name]
+        return parse(os.getenv(name, default))
+
+    def __dir__(cls):
+        return list(super().__dir__()) + list(SETTINGS)
+
+
+class Config(metaclass=_Settings):
+    """Application configuration - Simplified for YouTube testing"""
+
+    def __getattr__(self, name):
+        return getattr(type(self), name)
     
     @classmethod
     def validate(cls) -> Dict[str, str]:
@@ -94,4 +145,18 @@ class Config:
 
 
 # Create a global config instance
-config = Config()
\ No newline at end of file
+config = Config()
+
+def main(argv=None):
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Show the configuration and check the API keys")
+    parser.parse_args(argv)
+    config.print_config_summary()
+    if not config.YOUTUBE_API_KEY:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Author -> video engagement graph builder
+Aggregates comments into weighted edges (and per-author sentiment profiles)
+with one groupby of additive totals, so chunks of a large file combine by
+summing, and bulk-loads them into networkx or a sparse adjacency matrix.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+EDGE_COLUMNS = ['author', 'video', 'weight', 'mean_sentiment', 'positive', 'negative', 'likes', 'sentiment']
+AUTHOR_PROFILE_COLUMNS = ['author', 'comments', 'likes', 'sentiment_score', 'positive', 'neutral', 'negative',
+                          'sentiment']
+# Additive per-comment sums; chunks are combined by adding these up
+TOTAL_COLUMNS = ['weight', 'score_sum', 'scored', 'positive', 'neutral', 'negative', 'likes']
+LABELS = ['Positive', 'Neutral', 'Negative']
+
+
+def video_labels(df):
+    """Readable video node names: 'title (first 6 chars of id)'"""
+    return df['video_title'].astype(str) + ' (' + df['video_id'].astype(str).str[:6] + ')'
+
+
+def sentiment_labels(scores):
+    """Label mean scores with the get_sentiment_label thresholds"""
+    scores = np.asarray(scores, dtype=np.float64)
+    return np.select([scores >= 0.05, scores <= -0.05], ['Positive', 'Negative'], 'Neutral')
+
+
+def _comment_frame(df, keys):
+    """Per-comment contributions (counts and sums) keyed by the given columns"""
+    score = pd.to_numeric(df['sentiment_score'], errors='coerce') \
+        if 'sentiment_score' in df.columns else pd.Series(np.nan, index=df.index)
+    label = df['sentiment'] if 'sentiment' in df.columns else pd.Series(np.nan, index=df.index)
+    return pd.DataFrame(keys | {
+        'weight': np.ones(len(df), dtype=np.int64),
+        'score_sum': score.fillna(0).to_numpy(dtype=np.float64),
+        'scored': score.notna().to_numpy(dtype=np.int64),
+        'positive': label.eq('Positive').to_numpy(dtype=np.int64),
+        'neutral': label.eq('Neutral').to_numpy(dtype=np.int64),
+        'negative': label.eq('Negative').to_numpy(dtype=np.int64),
+        'likes': pd.to_numeric(df['likes'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+                 if 'likes' in df.columns else 0,
+    })
+
+
+def edge_totals(df):
+    """
+    Additive per-edge totals of a comments frame (or one chunk of it)
+
+    Totals of separate chunks combine with combine_totals(), so edges can
+    be built from input that doesn't fit in memory.
+
+    Returns:
+        DataFrame indexed by (author, video) with TOTAL_COLUMNS
+    """
+    frame = _comment_frame(df, {'author': df['author'].to_numpy(), 'video': video_labels(df).to_numpy()})
+    return frame.groupby(['author', 'video'], sort=False)[TOTAL_COLUMNS].sum()
+
+
+def author_totals(df):
+    """
+    Additive per-author totals of a comments frame (or one chunk of it)
+
+    Returns:
+        DataFrame indexed by author with TOTAL_COLUMNS
+    """
+    frame = _comment_frame(df, {'author': df['author'].to_numpy()})
+    return frame.groupby('author', sort=False)[TOTAL_COLUMNS].sum()
+
+
+def combine_totals(parts):
+    """Add up totals from several chunks (same index levels)"""
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return None
+    if len(parts) == 1:
+        return parts[0]
+    combined = pd.concat(parts)
+    return combined.groupby(level=list(range(combined.index.nlevels)), sort=False).sum()
+
+
+def finish_edges(totals):
+    """Turn edge_totals() into the aggregate_edges() format"""
+    if totals is None:
+        return pd.DataFrame(columns=EDGE_COLUMNS)
+    edges = totals.reset_index()
+    edges['mean_sentiment'] = edges['score_sum'] / edges['scored'].where(edges['scored'] > 0)
+    edges['sentiment'] = sentiment_labels(edges['mean_sentiment'])
+    return edges[EDGE_COLUMNS]
+
+
+def modal_labels(counts):
+    """
+    Most frequent label per row of Positive/Neutral/Negative counts
+
+    Ties go to Positive, then Neutral, then Negative; rows with no labels
+    get NaN.
+
+    Args:
+        counts: Array of shape (n, 3) in LABELS order
+    """
+    counts = np.asarray(counts).reshape(-1, len(LABELS))
+    choice = np.where(counts.sum(axis=1) > 0, counts.argmax(axis=1), len(LABELS))
+    return np.array(LABELS + [np.nan], dtype=object)[choice]
+
+
+def author_profile(totals):
+    """
+    Per-author sentiment profile from author_totals()
+
+    Returns:
+        DataFrame with AUTHOR_PROFILE_COLUMNS: comments (volume), likes,
+        sentiment_score (mean score), positive/neutral/negative label counts
+        and sentiment (most frequent label, see modal_labels())
+    """
+    if totals is None:
+        return pd.DataFrame(columns=AUTHOR_PROFILE_COLUMNS)
+    profile = totals.reset_index().rename(columns={'weight': 'comments'})
+    profile['sentiment_score'] = profile['score_sum'] / profile['scored'].where(profile['scored'] > 0)
+    profile['sentiment'] = modal_labels(profile[['positive', 'neutral', 'negative']].to_numpy())
+    return profile[AUTHOR_PROFILE_COLUMNS]
+
+
+def aggregate_edges(df):
+    """
+    Aggregate comments into author -> video edges
+
+    Args:
+        df: Comments with author, video_id, video_title and optionally
+            sentiment_score, sentiment and likes columns
+
+    Returns:
+        DataFrame with one row per edge: author, video, weight (comment count),
+        mean_sentiment, positive, negative, likes and sentiment (label of the
+        mean score, same thresholds as get_sentiment_label)
+    """
+    return finish_edges(edge_totals(df))
+
+
+def build_digraph(edges):
+    """
+    Bulk-load aggregated edges into a networkx DiGraph
+
+    Nodes get a 'type' attribute ('author' or 'video'); edges carry every
+    aggregate column as attributes.
+    """
+    import networkx as nx
+
+    G = nx.DiGraph()
+    G.add_nodes_from(edges['author'].unique(), type='author')
+    G.add_nodes_from(edges['video'].unique(), type='video')
+
+    attrs = [column for column in EDGE_COLUMNS if column not in ('author', 'video')]
+    records = edges[attrs].to_dict('records')
+    G.add_edges_from(zip(edges['author'], edges['video'], records))
+    return G
+
+
+def build_sparse(edges, weight='weight'):
+    """
+    Build the bipartite author x video adjacency matrix
+
+    Returns:
+        Tuple (authors, videos, matrix) where authors/videos are pandas Index
+        objects giving the row/column order of the CSR matrix
+    """
+    author_codes, authors = pd.factorize(edges['author'])
+    video_codes, videos = pd.factorize(edges['video'])
+    matrix = sparse.csr_matrix(
+        (edges[weight].to_numpy(dtype=np.float64), (author_codes, video_codes)),
+        shape=(len(authors), len(videos)),
+    )
+    return pd.Index(authors), pd.Index(videos), matrix
+
+
+def build_engagement_graph(df):
+    """Aggregate comments and return the author -> video DiGraph"""
+    return build_digraph(aggregate_edges(df))
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Twitter/X v2 recent search endpoint
+Serves synthetic tweets from /2/tweets/search/recent with the real
+response shape (data, includes.users, meta.next_token), start_time/end_time
+filtering, bearer-token auth, optional per-page latency and x-rate-limit-*
+headers with 429 responses, so the Twitter collector's pagination,
+concurrency and throughput can be tested offline.
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+SEARCH_PATH = "/2/tweets/search/recent"
+DEFAULT_TOKEN = "test-token"
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def _epoch(value):
+    return datetime.strptime(value.replace('.000', ''), '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp()
+
+
+class FakeTwitterAPI:
+    def __init__(self, tweets=1000, days=7, authors=200, seed=0, latency=0.0, rate_limit=None, window=900,
+                 token=DEFAULT_TOKEN, host='127.0.0.1', port=0):
+        """
+        Build the synthetic timeline (newest first, like the real API)
+
+        Args:
+            tweets: Number of tweets, spread evenly over the last `days` days
+            authors: Distinct authors
+            latency: Seconds added to every response
+            rate_limit: Requests allowed per window (None = unlimited)
+            window: Rate-limit window in seconds
+            token: Bearer token the server accepts
+            port: 0 picks a free port
+        """
+        rng = np.random.default_rng(seed)
+        self.now = math.floor(time.time())
+        self.created = np.sort(rng.uniform(self.now - days * 86400, self.now - 30, tweets))[::-1]
+        self.ids = np.arange(10**15 + tweets, 10**15, -1)
+        self.author_ids = rng.integers(0, authors, tweets)
+        self.likes = rng.geometric(0.2, tweets) - 1
+        self.retweets = rng.geometric(0.5, tweets) - 1
+        self.replies_to = np.where(rng.random(tweets) < 0.3, rng.integers(0, tweets, tweets), -1)
+
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.token = token
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttled = 0
+        self.queries = []
+        self.window_reset = None
+        self.window_used = 0
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _rate_headers(self):
+        """Count this request against the window; returns (allowed, headers)"""
+        if self.rate_limit is None:
+            return True, {}
+        with self.lock:
+            now = time.time()
+            if self.window_reset is None or now >= self.window_reset:
+                self.window_reset = math.ceil(now + self.window)
+                self.window_used = 0
+            allowed = self.window_used < self.rate_limit
+            if allowed:
+                self.window_used += 1
+            else:
+                self.throttled += 1
+            return allowed, {
+                'x-rate-limit-limit': str(self.rate_limit),
+                'x-rate-limit-remaining': str(max(0, self.rate_limit - self.window_used)),
+                'x-rate-limit-reset': str(self.window_reset),
+            }
+
+    def _send(self, handler, status, body, headers):
+        payload = json.dumps(body).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _handle(self, handler):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            url = urlparse(handler.path)
+            if url.path != SEARCH_PATH:
+                return self._send(handler, 404, {'title': 'Not Found'}, {})
+            if handler.headers.get('Authorization') != f'Bearer {self.token}':
+                return self._send(handler, 401, {'title': 'Unauthorized'}, {})
+            allowed, headers = self._rate_headers()
+            if not allowed:
+                return self._send(handler, 429, {'title': 'Too Many Requests'}, headers)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            with self.lock:
+                self.queries.append(params)
+            self._send(handler, 200, self.search(params), headers)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def search(self, params):
+        """Response body for one page of a recent-search query"""
+        page_size = min(100, max(10, int(params.get('max_results', 10))))
+        start = _epoch(params['start_time']) if 'start_time' in params else -np.inf
+        end = _epoch(params['end_time']) if 'end_time' in params else np.inf
+        matches = np.flatnonzero((self.created >= start) & (self.created < end))
+        offset = int(params.get('next_token') or params.get('pagination_token') or 0)
+        page = matches[offset:offset + page_size]
+
+        data = []
+        for i in page:
+            tweet = {
+                'id': str(self.ids[i]),
+                'text': f"Tweet {self.ids[i]} about #{params.get('query', '').lstrip('#')}",
+                'author_id': str(self.author_ids[i]),
+                'created_at': _iso(self.created[i]),
+                'conversation_id': str(self.ids[self.replies_to[i]] if self.replies_to[i] >= 0 else self.ids[i]),
+                'lang': 'en',
+                'public_metrics': {'retweet_count': int(self.retweets[i]), 'reply_count': 0,
+                                   'like_count': int(self.likes[i]), 'quote_count': 0},
+            }
+            if self.replies_to[i] >= 0:
+                tweet['referenced_tweets'] = [{'type': 'replied_to', 'id': str(self.ids[self.replies_to[i]])}]
+            data.append(tweet)
+
+        users = [{'id': str(a), 'username': f'user{a}', 'name': f'User {a}'}
+                 for a in np.unique(self.author_ids[page])]
+        meta = {'result_count': len(data)}
+        if data:
+            meta.update(newest_id=data[0]['id'], oldest_id=data[-1]['id'])
+        if offset + page_size < len(matches):
+            meta['next_token'] = str(offset + page_size)
+        body = {'meta': meta}
+        if data:
+            body.update(data=data, includes={'users': users})
+        return body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake Twitter recent-search API for offline testing")
+    parser.add_argument("--tweets", type=int, default=10000, help="Synthetic tweets to serve")
+    parser.add_argument("--days", type=int, default=7, help="Days the tweets are spread over")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--rate-limit", type=int, default=None, help="Requests per window (default: unlimited)")
+    parser.add_argument("--window", type=int, default=900, help="Rate-limit window in seconds")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    api = FakeTwitterAPI(tweets=args.tweets, days=args.days, latency=args.latency, rate_limit=args.rate_limit,
+                         window=args.window, port=args.port)
+    print(f"✅ Fake Twitter API on {api.url} (bearer token '{api.token}'); Ctrl-C to stop")
+    print(f"   python social_collector.py python --platforms twitter --twitter-base-url {api.url} "
+          f"--twitter-bearer-token {api.token}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
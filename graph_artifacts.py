@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for the built engagement graph
+Persists the aggregated author -> video graph as uncompressed .npy arrays
+(CSR index arrays, per-edge aggregates and UTF-8 node names) under a key
+derived from the input file's hash and the build parameters, so analysis
+scripts memory-map it instead of re-reading the CSV and regrouping.
+numpy, pandas, scipy and the graph builders are imported on first use, so
+commands that only hash inputs or read the default paths start quickly.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import memory
+
+ARTIFACT_VERSION = 2
+DEFAULT_INPUT = "collected_data/youtube_sentiment_results.csv"
+DEFAULT_CACHE_DIR = "collected_data/graph_cache"
+DIGESTS_NAME = "input_digests.json"
+KEEP_ARTIFACTS = 3
+DEFAULT_CHUNK_ROWS = 200_000
+
+# Columns the graph build reads from the sentiment results
+INPUT_COLUMNS = ['author', 'video_id', 'video_title', 'sentiment_score', 'sentiment', 'likes', 'dup_cluster']
+# Per-author counts stored as author_<name>.npy
+PROFILE_ARRAYS = ['comments', 'likes', 'positive', 'neutral', 'negative']
+
+
+def file_digest(path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    BLAKE2b digest of a file's contents
+
+    Digests are remembered by (size, mtime) in the cache directory, so an
+    unchanged input is only hashed once.
+    """
+    path = Path(path)
+    stat = path.stat()
+    digests_path = Path(cache_dir) / DIGESTS_NAME
+    digests = {}
+    if digests_path.exists():
+        with open(digests_path, 'r', encoding='utf-8') as f:
+            digests = json.load(f)
+
+    known = digests.get(str(path.resolve()))
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        return known['digest']
+
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    digest = h.hexdigest()
+
+    digests[str(path.resolve())] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+    digests_path.parent.mkdir(exist_ok=True, parents=True)
+    tmp_path = digests_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(digests, f, indent=2)
+    os.replace(tmp_path, digests_path)
+    return digest
+
+
+def artifact_key(digest, params):
+    """Cache key for an input digest plus build parameters"""
+    payload = json.dumps({'version': ARTIFACT_VERSION, 'input': digest, 'params': params}, sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _encode_names(names):
+    import numpy as np
+
+    encoded = [str(name).encode('utf-8') for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_names(blob, offsets):
+    import pandas as pd
+
+    data = blob.tobytes()
+    return pd.Index([data[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])])
+
+
+class GraphArtifact:
+    """Read-only, memory-mapped view of a stored engagement graph"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / 'meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.key = self.meta['key']
+        self._arrays = {}
+        self._names = {}
+
+    def array(self, name):
+        if name not in self._arrays:
+            import numpy as np
+
+            self._arrays[name] = np.load(self.path / f'{name}.npy', mmap_mode='r')
+        return self._arrays[name]
+
+    def _index(self, name):
+        if name not in self._names:
+            self._names[name] = _decode_names(self.array(f'{name}_names'), self.array(f'{name}_offsets'))
+        return self._names[name]
+
+    @property
+    def authors(self):
+        return self._index('author')
+
+    @property
+    def videos(self):
+        return self._index('video')
+
+    @property
+    def matrix(self):
+        """Author x video CSR matrix of comment counts"""
+        from scipy import sparse
+
+        return sparse.csr_matrix(
+            (self.array('weight'), self.array('indices'), self.array('indptr')),
+            shape=(self.meta['authors'], self.meta['videos']),
+        )
+
+    def edges(self):
+        """Edge list in the aggregate_edges() format"""
+        import numpy as np
+        import pandas as pd
+
+        from engagement_graph import EDGE_COLUMNS, sentiment_labels
+
+        indptr = self.array('indptr')
+        author_codes = np.repeat(np.arange(self.meta['authors']), np.diff(indptr))
+        mean = np.asarray(self.array('mean_sentiment'))
+        frame = pd.DataFrame({
+            'author': self.authors.take(author_codes),
+            'video': self.videos.take(np.asarray(self.array('indices'))),
+            'weight': np.asarray(self.array('weight')).astype(np.int64),
+            'mean_sentiment': mean,
+            'positive': np.asarray(self.array('positive')),
+            'negative': np.asarray(self.array('negative')),
+            'likes': np.asarray(self.array('likes')),
+            'sentiment': sentiment_labels(mean),
+        })
+        return frame[EDGE_COLUMNS]
+
+    def adjacency(self):
+        """
+        Square adjacency over authors then videos
+
+        Returns:
+            Tuple (nodes, matrix) like centrality.build_adjacency()
+        """
+        import numpy as np
+        from scipy import sparse
+
+        B = self.matrix
+        n_authors, n_videos = B.shape
+        matrix = sparse.bmat([[None, B], [sparse.csr_matrix((n_videos, n_authors)), None]],
+                             format='csr', dtype=np.float64)
+        return self.authors.append(self.videos), matrix
+
+    def author_profile(self):
+        """Per-author comment volume, likes, mean score, label counts and most frequent label"""
+        import numpy as np
+        import pandas as pd
+
+        from engagement_graph import AUTHOR_PROFILE_COLUMNS, modal_labels
+
+        counts = {column: np.asarray(self.array(f'author_{column}')) for column in PROFILE_ARRAYS}
+        profile = pd.DataFrame({'author': self.authors, **counts,
+                                'sentiment_score': np.asarray(self.array('author_sentiment'))})
+        profile['sentiment'] = modal_labels(profile[['positive', 'neutral', 'negative']].to_numpy())
+        return profile[AUTHOR_PROFILE_COLUMNS]
+
+    def author_sentiment(self):
+        """Per-author mean sentiment score and most frequent label"""
+        return self.author_profile()[['author', 'sentiment_score', 'sentiment']]
+
+
+def read_totals(input_path, collapse_near_duplicates=True, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Edge and author totals of a sentiment results file in one chunked pass
+
+    Under a memory budget chunks are sized to fit, and the per-chunk totals
+    are merged whenever they outgrow a share of the budget.
+
+    Returns:
+        Tuple (edge_totals, author_totals), see engagement_graph
+    """
+    from engagement_graph import author_totals, combine_totals, edge_totals
+    from near_duplicates import duplicate_keys, first_duplicates
+
+    reader = memory.read_csv_chunks(input_path, chunk_rows, usecols=lambda column: column in INPUT_COLUMNS,
+                                    dtype={'author': str, 'video_id': str}, encoding='utf-8')
+    edge_parts, author_parts = [], []
+    parts_bytes = 0
+    seen = set()
+    collapsed = 0
+    for chunk in reader:
+        # Count each near-duplicate (template spam) cluster once per author and video,
+        # so bot floods don't dominate edge weights or sentiment profiles
+        if collapse_near_duplicates and 'dup_cluster' in chunk.columns:
+            first = first_duplicates(duplicate_keys(chunk), seen)
+            collapsed += int((~first).sum())
+            chunk = chunk[first]
+        chunk = chunk[chunk['author'].notna()]
+        edge_parts.append(edge_totals(chunk))
+        author_parts.append(author_totals(chunk))
+        if memory.budget():
+            parts_bytes += sum(part.memory_usage(deep=True).sum() for part in (edge_parts[-1], author_parts[-1]))
+            if parts_bytes > memory.budget() * memory.CHUNK_SHARE:
+                edge_parts, author_parts = [combine_totals(edge_parts)], [combine_totals(author_parts)]
+                parts_bytes = sum(part.memory_usage(deep=True).sum() for part in edge_parts + author_parts)
+
+    if collapsed:
+        print(f"Collapsed {collapsed:,} near-duplicate comments")
+    return combine_totals(edge_parts), combine_totals(author_parts)
+
+
+def write_artifact(path, edges, profile, meta):
+    """
+    Write an edge list and author profile to a new artifact directory
+
+    The directory is written under a temporary name and renamed into place,
+    so readers never see a partial artifact.
+
+    Args:
+        path: Artifact directory
+        edges: Edges in the aggregate_edges() format
+        profile: Author profile in the author_profile() format
+        meta: Extra entries for meta.json
+    """
+    import numpy as np
+    import pandas as pd
+
+    path = Path(path)
+    author_codes, authors = pd.factorize(edges['author'])
+    video_codes, videos = pd.factorize(edges['video'])
+    order = np.lexsort((video_codes, author_codes))
+
+    arrays = {
+        'indptr': np.concatenate([[0], np.cumsum(np.bincount(author_codes, minlength=len(authors)))]),
+        'indices': video_codes[order].astype(np.int32),
+        'weight': edges['weight'].to_numpy(dtype=np.float64)[order],
+        'mean_sentiment': edges['mean_sentiment'].to_numpy(dtype=np.float64)[order],
+        'positive': edges['positive'].to_numpy(dtype=np.int64)[order],
+        'negative': edges['negative'].to_numpy(dtype=np.int64)[order],
+        'likes': edges['likes'].to_numpy(dtype=np.int64)[order],
+    }
+    arrays['author_names'], arrays['author_offsets'] = _encode_names(authors)
+    arrays['video_names'], arrays['video_offsets'] = _encode_names(videos)
+
+    # This creates a "Sentiment Profile" for each consumer, in author order
+    profile = profile.set_index('author').reindex(authors)
+    for column in PROFILE_ARRAYS:
+        arrays[f'author_{column}'] = profile[column].fillna(0).to_numpy(dtype=np.int64)
+    arrays['author_sentiment'] = profile['sentiment_score'].to_numpy(dtype=np.float64)
+
+    meta = dict(meta, authors=len(authors), videos=len(videos), edges=len(edges),
+                created_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    for name, values in arrays.items():
+        np.save(tmp_path / f'{name}.npy', np.ascontiguousarray(values))
+    with open(tmp_path / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, path)
+    return GraphArtifact(path)
+
+
+def prune_artifacts(cache_dir=DEFAULT_CACHE_DIR, keep=KEEP_ARTIFACTS):
+    """Delete all but the most recently used artifacts"""
+    artifacts = [p for p in Path(cache_dir).iterdir() if (p / 'meta.json').exists()]
+    artifacts.sort(key=lambda p: (p / 'meta.json').stat().st_mtime, reverse=True)
+    for stale in artifacts[keep:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def load_graph(input_path=DEFAULT_INPUT, cache_dir=DEFAULT_CACHE_DIR, collapse_near_duplicates=True,
+               rebuild=False):
+    """
+    Return the engagement graph for a sentiment results file, building it
+    only if no artifact exists for this input and these parameters
+
+    Args:
+        input_path: Sentiment results CSV
+        cache_dir: Directory holding artifacts
+        collapse_near_duplicates: Count each dup_cluster once per author and video
+        rebuild: Ignore any cached artifact
+
+    Returns:
+        GraphArtifact
+    """
+    from engagement_graph import author_profile, finish_edges
+
+    params = {'collapse_near_duplicates': bool(collapse_near_duplicates)}
+    digest = file_digest(input_path, cache_dir)
+    key = artifact_key(digest, params)
+    path = Path(cache_dir) / key
+
+    if (path / 'meta.json').exists() and not rebuild:
+        # Touch so pruning keeps artifacts that are still in use
+        os.utime(path / 'meta.json')
+        print(f"✅ Loaded cached graph {key[:12]} from {cache_dir}")
+        return GraphArtifact(path)
+
+    print(f"Building graph artifact {key[:12]} from {input_path}...")
+    edges, authors = read_totals(input_path, collapse_near_duplicates=collapse_near_duplicates)
+    shutil.rmtree(path, ignore_errors=True)
+    artifact = write_artifact(path, finish_edges(edges), author_profile(authors), {
+        'key': key, 'version': ARTIFACT_VERSION, 'input': str(input_path),
+        'input_digest': digest, 'params': params,
+    })
+    prune_artifacts(cache_dir)
+    print(f"✅ Graph artifact saved to: {path}")
+    return artifact
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build (or reuse) the cached engagement graph for a results file")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="Sentiment results CSV")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Graph artifact cache directory")
+    parser.add_argument("--keep-near-duplicates", action="store_true",
+                        help="Count every near-duplicate comment instead of one per dup_cluster")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore any cached artifact")
+    memory.add_arguments(parser)
+    args = parser.parse_args(argv)
+    memory.apply(args, parser)
+
+    graph = load_graph(args.input, cache_dir=args.cache_dir,
+                       collapse_near_duplicates=not args.keep_near_duplicates, rebuild=args.rebuild)
+    print(f"  {graph.meta['authors']:,} authors, {graph.meta['videos']:,} videos, {graph.meta['edges']:,} edges")
+    return graph
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Incremental engagement and reply graph state
+Keeps the graphs as per-day edge buckets in SQLite and, on each run, reads
+only the rows appended to the sentiment results since the last one. New
+rows are added to the buckets of the days they fall on, so a run reads and
+writes only those days (plus the new parent comments, stored per comment).
+A sliding window on published_at deletes buckets, parents, reply counts and
+counted near-duplicates older than the window, so daily rankings cost time
+in proportion to the new data and the window, not all history.
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import memory
+from comment_dataset import BoundedReader, complete_lines_end, file_fingerprint
+from engagement_graph import EDGE_COLUMNS, TOTAL_COLUMNS, author_profile, sentiment_labels, video_labels
+from near_duplicates import duplicate_keys, first_duplicates
+from reply_graph import REPLY_EDGE_COLUMNS
+
+STATE_VERSION = 5
+DEFAULT_STATE_PATH = "collected_data/graph_state.sqlite"
+DEFAULT_CHUNK_ROWS = 200_000
+
+INPUT_COLUMNS = ['video_id', 'video_title', 'comment_id', 'parent_id', 'author', 'likes',
+                 'published_at', 'sentiment_score', 'sentiment', 'dup_cluster']
+BUCKET_SUMS = TOTAL_COLUMNS
+# Undated comments are kept under this day; it sorts before every date, so a window expires them
+UNDATED = ''
+
+_SUMS_SQL = ', '.join(f'{column} REAL NOT NULL' for column in BUCKET_SUMS)
+SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS buckets (
+        kind TEXT NOT NULL,
+        day TEXT NOT NULL,
+        frame BLOB NOT NULL,
+        PRIMARY KEY (day, kind)
+    );
+    CREATE TABLE IF NOT EXISTS parents (
+        comment_id TEXT PRIMARY KEY,
+        author TEXT NOT NULL,
+        day TEXT NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS parents_day ON parents (day);
+    CREATE TABLE IF NOT EXISTS pending_replies (
+        day TEXT NOT NULL, parent_id TEXT NOT NULL, source TEXT NOT NULL, {_SUMS_SQL}
+    );
+    CREATE TABLE IF NOT EXISTS seen_duplicates (
+        key INTEGER PRIMARY KEY,
+        day TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS seen_duplicates_day ON seen_duplicates (day);
+    CREATE TABLE IF NOT EXISTS reply_days (
+        day TEXT PRIMARY KEY,
+        replies INTEGER NOT NULL,
+        self_replies INTEGER NOT NULL
+    ) WITHOUT ROWID;
+"""
+TABLES = ['meta', 'buckets', 'parents', 'pending_replies', 'seen_duplicates', 'reply_days']
+# Bucket kind -> the keys its per-day frames are indexed by
+BUCKET_KEYS = {'edges': ['author', 'video'], 'replies': ['source', 'target']}
+
+
+def _upsert(conn, table, keys, frame):
+    """Add the sums (or counts) of frame, indexed by keys, to the matching rows of table"""
+    columns = keys + list(frame.columns)
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+        + ', '.join(f'{column} = {column} + excluded.{column}' for column in frame.columns),
+        frame.reset_index()[columns].to_numpy(dtype=object).tolist(),
+    )
+
+
+class IncrementalGraph:
+    def __init__(self, path=DEFAULT_STATE_PATH, window_days=None):
+        """
+        Open (or start) the incremental graph state
+
+        State saved with a different window, or by another state version,
+        is discarded so the next update() rebuilds from the start of the file.
+        Changes made by update() are written by save() in one transaction.
+
+        Args:
+            path: SQLite database holding the state
+            window_days: Keep only comments published in the last N days
+                before the newest one (None = all history)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self.window_days = window_days
+        self.conn = sqlite3.connect(str(self.path), timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'state'").fetchone()
+        stored = json.loads(row[0]) if row else {}
+        if stored.get('version') == STATE_VERSION and stored.get('window_days') == window_days:
+            self.source, self.offset, self.fingerprint = stored['source'], stored['offset'], stored['fingerprint']
+            self.header, self.latest_day = stored['header'], stored['latest_day']
+        else:
+            with self.conn:
+                for table in TABLES:
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.executescript(SCHEMA)
+            self.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the database; changes not saved are discarded"""
+        self.conn.close()
+
+    def reset(self):
+        self.source = None
+        self.offset = 0
+        self.fingerprint = None
+        self.header = None
+        # Newest day seen, as 'YYYY-MM-DD'
+        self.latest_day = None
+        for table in TABLES[1:]:
+            self.conn.execute(f"DELETE FROM {table}")
+
+    def _is_continuation(self, path):
+        if self.source != str(Path(path).resolve()) or self.fingerprint is None:
+            return False
+        if os.path.getsize(path) < self.offset:
+            return False
+        return file_fingerprint(path, self.offset) == self.fingerprint
+
+    def update(self, path, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Fold rows appended to a sentiment results CSV into the state
+
+        If the file is not a continuation of the one last read (different
+        path, truncated or rewritten), the state is rebuilt from scratch.
+
+        Returns:
+            Number of new rows read
+        """
+        if not self._is_continuation(path):
+            if self.fingerprint is not None:
+                print("⚠️  Results file was rewritten; rebuilding graph state from the start")
+            self.reset()
+            self.source = str(Path(path).resolve())
+            self.header = list(pd.read_csv(path, nrows=0, encoding='utf-8').columns)
+            with open(path, 'rb') as f:
+                self.offset = len(f.readline())
+
+        end = complete_lines_end(path, os.path.getsize(path), self.offset)
+        rows = 0
+        if end > self.offset:
+            with open(path, 'rb') as f:
+                f.seek(self.offset)
+                reader = memory.read_csv_chunks(
+                    BoundedReader(f, end - self.offset), chunk_rows, header=None, names=self.header,
+                    usecols=lambda column: column in INPUT_COLUMNS,
+                    dtype={'comment_id': str, 'parent_id': str, 'author': str, 'video_id': str},
+                    encoding='utf-8',
+                )
+                for chunk in reader:
+                    self._add(chunk)
+                    rows += len(chunk)
+            self.offset = end
+
+        self.fingerprint = file_fingerprint(path, self.offset)
+        self.expire()
+        return rows
+
+    def _add(self, chunk):
+        day = pd.to_datetime(chunk['published_at'].str[:10], format='%Y-%m-%d', errors='coerce') \
+            if 'published_at' in chunk.columns else pd.Series(pd.NaT, index=chunk.index)
+        # Count each near-duplicate (template spam) cluster once per author and
+        # video, across chunks and runs, like the full build
+        if 'dup_cluster' in chunk.columns:
+            keys = duplicate_keys(chunk)
+            first = first_duplicates(keys, self._seen_among(keys))
+            chunk, day = chunk[first], day[first]
+            self.conn.executemany("INSERT INTO seen_duplicates VALUES (?, ?)", zip(
+                keys[first].tolist(), day.dt.strftime('%Y-%m-%d').fillna(UNDATED).tolist()))
+        known_author = chunk['author'].notna()
+        chunk, day = chunk[known_author], day[known_author]
+
+        score = pd.to_numeric(chunk['sentiment_score'], errors='coerce') \
+            if 'sentiment_score' in chunk.columns else pd.Series(np.nan, index=chunk.index)
+        label = chunk['sentiment'] if 'sentiment' in chunk.columns else pd.Series(np.nan, index=chunk.index)
+        contributions = pd.DataFrame({
+            'day': day.dt.strftime('%Y-%m-%d').fillna(UNDATED),
+            'weight': 1.0,
+            'score_sum': score.fillna(0).to_numpy(),
+            'scored': score.notna().to_numpy(dtype=np.float64),
+            'positive': label.eq('Positive').to_numpy(dtype=np.float64),
+            'neutral': label.eq('Neutral').to_numpy(dtype=np.float64),
+            'negative': label.eq('Negative').to_numpy(dtype=np.float64),
+            'likes': pd.to_numeric(chunk['likes'], errors='coerce').fillna(0).to_numpy()
+                     if 'likes' in chunk.columns else 0.0,
+        }, index=chunk.index)
+        if day.notna().any():
+            newest = day.max().strftime('%Y-%m-%d')
+            self.latest_day = newest if self.latest_day is None else max(self.latest_day, newest)
+
+        edges = contributions.assign(author=chunk['author'], video=video_labels(chunk))
+        edges = edges[edges['video'].notna()]
+        self._merge('edges', edges)
+
+        # Parents first, so replies to comments in the same chunk resolve
+        known = chunk['comment_id'].notna()
+        self.conn.executemany("INSERT OR IGNORE INTO parents VALUES (?, ?, ?)", zip(
+            chunk.loc[known, 'comment_id'].tolist(), chunk.loc[known, 'author'].tolist(),
+            contributions.loc[known, 'day'].tolist()))
+
+        is_reply = chunk['parent_id'].notna() & (chunk['parent_id'] != '')
+        replies = contributions[is_reply].assign(source=chunk.loc[is_reply, 'author'],
+                                                 parent_id=chunk.loc[is_reply, 'parent_id'])
+        _upsert(self.conn, 'reply_days', ['day'],
+                replies.groupby('day').size().to_frame('replies').assign(self_replies=0))
+        # Replies whose parent hadn't been read yet are retried with every chunk
+        pending = pd.read_sql_query("SELECT * FROM pending_replies", self.conn)
+        self.conn.execute("DELETE FROM pending_replies")
+        replies = pd.concat([pending, replies], ignore_index=True)
+        targets = self._authors_of(replies['parent_id'].unique())
+        replies['target'] = replies['parent_id'].map(targets)
+
+        resolved = replies['target'].notna()
+        own = resolved & (replies['source'] == replies['target'])
+        _upsert(self.conn, 'reply_days', ['day'],
+                replies[own].groupby('day').size().to_frame('self_replies').assign(replies=0))
+        unresolved = replies.loc[~resolved, ['day', 'parent_id', 'source'] + BUCKET_SUMS]
+        self.conn.executemany(
+            f"INSERT INTO pending_replies VALUES ({', '.join('?' * unresolved.shape[1])})",
+            unresolved.to_numpy(dtype=object).tolist(),
+        )
+        replies = replies[resolved & ~own]
+        self._merge('replies', replies)
+
+    def _merge(self, kind, contributions):
+        """Sum per-comment contributions into the stored buckets of the days they fall on"""
+        keys = BUCKET_KEYS[kind]
+        for day, group in contributions.groupby('day', sort=False):
+            row = self.conn.execute("SELECT frame FROM buckets WHERE day = ? AND kind = ?", (day, kind)).fetchone()
+            if row:
+                group = pd.concat([pickle.loads(row[0]), group[keys + BUCKET_SUMS]], ignore_index=True)
+            # Kept with plain key columns: concatenating many MultiIndex frames is far slower
+            frame = group.groupby(keys, sort=False)[BUCKET_SUMS].sum().reset_index()
+            self.conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                              (kind, day, pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    def _authors_of(self, comment_ids):
+        """comment_id -> author of the known comments among comment_ids"""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_ids (comment_id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM lookup_ids")
+        self.conn.executemany("INSERT OR IGNORE INTO lookup_ids VALUES (?)", ((cid,) for cid in comment_ids.tolist()))
+        # CROSS JOIN keeps the lookup ids as the outer loop instead of scanning every parent
+        return dict(self.conn.execute(
+            "SELECT l.comment_id, p.author FROM lookup_ids l CROSS JOIN parents p ON p.comment_id = l.comment_id"
+        ))
+
+    def _seen_among(self, keys):
+        """The near-duplicate keys among keys already counted (within the window)"""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_keys (key INTEGER PRIMARY KEY)")
+        self.conn.execute("DELETE FROM lookup_keys")
+        self.conn.executemany("INSERT OR IGNORE INTO lookup_keys VALUES (?)", ((key,) for key in keys.tolist()))
+        return {key for key, in self.conn.execute(
+            "SELECT l.key FROM lookup_keys l CROSS JOIN seen_duplicates s ON s.key = l.key")}
+
+    def expire(self):
+        """
+        Delete everything outside the window (and undated comments when windowed)
+
+        Parents go too, so later replies to comments older than the window
+        stay unresolved, and so do the counted near-duplicate keys, so a
+        copy inside the window counts once again.
+        """
+        if self.window_days is None or self.latest_day is None:
+            return
+        cutoff = (pd.Timestamp(self.latest_day) - pd.Timedelta(days=self.window_days - 1)).strftime('%Y-%m-%d')
+        for table in TABLES[1:]:
+            self.conn.execute(f"DELETE FROM {table} WHERE day < ?", (cutoff,))
+
+    def save(self):
+        """Commit the changes of update() together with the read position"""
+        state = {'version': STATE_VERSION, 'window_days': self.window_days, 'source': self.source,
+                 'offset': self.offset, 'fingerprint': self.fingerprint, 'header': self.header,
+                 'latest_day': self.latest_day}
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('state', ?)", (json.dumps(state),))
+        return self.path
+
+    @property
+    def reply_stats(self):
+        """Replies, self-replies and still unresolved replies within the window"""
+        replies, self_replies = self.conn.execute(
+            "SELECT COALESCE(SUM(replies), 0), COALESCE(SUM(self_replies), 0) FROM reply_days").fetchone()
+        unresolved = self.conn.execute("SELECT COUNT(*) FROM pending_replies").fetchone()[0]
+        return {'replies': replies, 'unresolved': unresolved, 'self_replies': self_replies}
+
+    def days(self, kind='edges'):
+        """Days that have buckets of a kind, oldest first ('' for undated comments)"""
+        return [day for day, in self.conn.execute("SELECT day FROM buckets WHERE kind = ? ORDER BY day", (kind,))]
+
+    def _totals(self, kind, by):
+        """Sums across the day buckets of a kind, grouped by the key columns in by"""
+        frames = [pickle.loads(frame) for frame, in self.conn.execute(
+            "SELECT frame FROM buckets WHERE kind = ?", (kind,))]
+        if not frames:
+            frames = [pd.DataFrame({column: pd.Series(dtype=object) for column in BUCKET_KEYS[kind]}
+                                   | {column: pd.Series(dtype=np.float64) for column in BUCKET_SUMS})]
+        return pd.concat(frames, ignore_index=True).groupby(by, sort=False)[BUCKET_SUMS].sum().reset_index()
+
+    def edges(self):
+        """Current author -> video edges in the aggregate_edges() format"""
+        edges = self._totals('edges', ['author', 'video'])
+        edges['mean_sentiment'] = edges['score_sum'] / edges['scored'].where(edges['scored'] > 0)
+        for column in ('weight', 'positive', 'negative', 'likes'):
+            edges[column] = edges[column].astype(np.int64)
+        edges['sentiment'] = sentiment_labels(edges['mean_sentiment'])
+        return edges[EDGE_COLUMNS]
+
+    def reply_edges(self):
+        """Current replier -> parent author edges in the reply_graph format"""
+        edges = self._totals('replies', ['source', 'target'])
+        edges['mean_sentiment'] = edges['score_sum'] / edges['scored'].where(edges['scored'] > 0)
+        for column in ('weight', 'positive', 'negative', 'likes'):
+            edges[column] = edges[column].astype(np.int64)
+        edges['sentiment'] = sentiment_labels(edges['mean_sentiment'])
+        return edges[REPLY_EDGE_COLUMNS]
+
+    def author_profile(self):
+        """Per-author volume, likes, mean score and label counts within the window (see author_profile())"""
+        totals = self._totals('edges', ['author']).set_index('author')
+        for column in ('weight', 'scored', 'positive', 'neutral', 'negative', 'likes'):
+            totals[column] = totals[column].astype(np.int64)
+        return author_profile(totals)
+
+    def author_sentiment(self):
+        """Per-author mean score and most frequent label within the window"""
+        return self.author_profile()[['author', 'sentiment_score', 'sentiment']]
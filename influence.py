@@ -1,104 +1,429 @@
-import pandas as pd
-import networkx as nx
-
-# 1. Load your existing sentiment results
-df = pd.read_csv("collected_data/youtube_sentiment_results.csv")
-
-# 2. Reconstruct the graph (as per your existing logic)
-G = nx.DiGraph()
-for _, row in df.iterrows():
-    commenter = row["author"]
-    video = f"{row['video_title']} ({row['video_id'][:6]})"
-    G.add_node(commenter, type='author')
-    G.add_node(video, type='video')
-    
-    if G.has_edge(commenter, video):
-        G[commenter][video]['weight'] += 1
-    else:
-        G.add_edge(commenter, video, weight=1, sentiment=row['sentiment'])
-
-# 3. Calculate Influence Metrics
-print("Calculating influence scores...")
-
-# Degree Centrality: Who is the most active/connected?
-degree_cent = nx.degree_centrality(G)
-
-# Eigenvector Centrality: Who is connected to the most important videos?
-# (Note: Use max_iter=1000 to ensure convergence on larger datasets)
-eigen_cent = nx.eigenvector_centrality(G, weight='weight', max_iter=1000)
-
-# Betweenness Centrality: Who acts as a bridge between different video topics?
-between_cent = nx.betweenness_centrality(G)
-
-# 4. Aggregate Sentiment by Author
-# This creates a "Sentiment Profile" for each consumer
-author_sentiment = df.groupby('author').agg({
-    'sentiment_score': 'mean',
-    'sentiment': lambda x: x.value_counts().index[0] # Most frequent label
-}).reset_index()
-
-# 5. Combine Network and Sentiment Data
-influence_df = pd.DataFrame({
-    'author': [n for n in G.nodes() if G.nodes[n]['type'] == 'author']
-})
-
-influence_df['degree_influence'] = influence_df['author'].map(degree_cent)
-influence_df['prestige_influence'] = influence_df['author'].map(eigen_cent)
-influence_df['bridge_score'] = influence_df['author'].map(between_cent)
-
-# Merge with the sentiment profile
-final_analysis = pd.merge(influence_df, author_sentiment, on='author', how='inner')
-
-# Sort by Influence to see the top "Opinion Leaders"
-final_analysis = final_analysis.sort_values(by='prestige_influence', ascending=False)
-
-# Save for your project report
-final_analysis.to_csv("collected_data/author_influence_profile.csv", index=False)
-print("✅ Influence profiles saved to: collected_data/author_influence_profile.csv")
-print(final_analysis.head(10))
-
-
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Create the visualization
-plt.figure(figsize=(10, 6))
-sns.scatterplot(
-    data=final_analysis, 
-    x='prestige_influence', 
-    y='sentiment_score', 
-    size='degree_influence', 
-    hue='sentiment',
-    palette={'Positive': 'green', 'Negative': 'red', 'Neutral': 'gray'},
-    alpha=0.6
-)
-
-plt.title('Consumer Influence vs. Emotional Sentiment')
-plt.xlabel('Influence Score (Prestige)')
-plt.ylabel('Average Sentiment Score (-1 to 1)')
-plt.axhline(0.05, color='gray', linestyle='--', alpha=0.3)
-plt.axhline(-0.05, color='gray', linestyle='--', alpha=0.3)                                        
-plt.legend(title='Sentiment Type', bbox_to_anchor=(1.05, 1), loc='upper left')
-plt.tight_layout()
-plt.savefig("collected_data/influence_sentiment_matrix.png")
-plt.show()
-
-print("✅ Behavioral matrix saved as: collected_data/influence_sentiment_matrix.png")
-
-
-# In your plotting script (at the bottom of influence.py)
-
-plt.figure(figsize=(10, 6))
-sns.scatterplot(
-    data=final_analysis, 
-    x='degree_influence',  # <--- CHANGED from 'prestige_influence'
-    y='sentiment_score', 
-    size='degree_influence', 
-    hue='sentiment',
-    palette={'Positive': 'green', 'Negative': 'red', 'Neutral': 'gray'},
-    alpha=0.6
-)
-
-plt.title('Consumer Activity vs. Emotional Sentiment') # Updated Title
-plt.xlabel('Activity Level (Degree Centrality)') # Updated Label
-# ... rest of the code remains the same
\ No newline at end of file
+#!/usr/bin/env python3
+"""
+Author influence engine
+Scores authors with network centrality on the engagement and reply graphs
+and joins the scores with per-author sentiment aggregates (comment volume,
+likes, mean score, label counts and most frequent label) that are built in
+one chunked pass over the results. compute_influence() returns the profile
+without writing any output, so other jobs can run it in-process; main() is
+the command-line wrapper that saves and plots it. The analysis modules
+(and with them numpy, pandas and scipy) are imported when a profile is
+computed rather than at import time.
+
+State carried between runs (the incremental graph state and the
+warm-start scores of the iterative metrics) is kept next to the input by
+default, so runs over different data directories don't share it; see
+--graph-state and --centrality-state.
+"""
+
+import argparse
+import os
+import sys
+
+# Add current directory to path
+sys.path.append('.')
+
+import memory
+import profiling
+from graph_artifacts import DEFAULT_CACHE_DIR, load_graph
+
+RESULTS_FILE = "collected_data/youtube_sentiment_results.csv"
+OUTPUT_FILE = "collected_data/author_influence_profile.csv"
+SUMMARY_FILE = "collected_data/community_summary.csv"
+PLOT_FILE = "collected_data/influence_sentiment_matrix.png"
+# State files, next to the input unless --graph-state/--centrality-state say otherwise
+GRAPH_STATE_NAME = "graph_state.sqlite"
+CENTRALITY_STATE_NAME = "centrality_state.csv"
+
+# Metrics that can be selected, and the profile columns each one adds
+METRIC_COLUMNS = {
+    'degree': ['degree_influence'],
+    'prestige': ['prestige_influence'],
+    'pagerank': ['pagerank'],
+    'hubs': ['hub_score'],
+    'bridge': ['bridge_score'],
+    'replies': ['reply_influence', 'replies_received', 'reply_sentiment'],
+    'communities': ['community'],
+}
+METRICS = list(METRIC_COLUMNS)
+# The profile is sorted by the first of these that was computed
+RANK_COLUMNS = ['prestige_influence', 'pagerank', 'degree_influence', 'hub_score', 'reply_influence', 'bridge_score']
+
+# Bridge score (betweenness) settings:
+#   BRIDGE_MODE     exact, approx, or auto (approx above BRIDGE_EXACT_LIMIT nodes)
+#   BRIDGE_PIVOTS   sampled sources for approx mode (0 = derive from BRIDGE_EPSILON)
+#   BRIDGE_EPSILON  target error bound on the normalized score
+#   BRIDGE_WORKERS  worker processes (1 = serial, 0 = one per CPU)
+#   BRIDGE_SEED     pivot sampling seed, so profiles are reproducible
+BRIDGE_MODE = os.getenv('BRIDGE_MODE', 'auto')
+BRIDGE_EXACT_LIMIT = int(os.getenv('BRIDGE_EXACT_LIMIT', '20000'))
+BRIDGE_PIVOTS = int(os.getenv('BRIDGE_PIVOTS', '0'))
+BRIDGE_EPSILON = float(os.getenv('BRIDGE_EPSILON', '0.05'))
+BRIDGE_WORKERS = int(os.getenv('BRIDGE_WORKERS', '1'))
+BRIDGE_SEED = int(os.getenv('BRIDGE_SEED', '42'))
+
+# Audience segments (Louvain communities):
+#   COMMUNITY_GRAPH       engagement (authors + videos), coengagement (authors
+#                         linked by shared videos) or none
+#   COMMUNITY_RESOLUTION  higher values give smaller communities
+#   COMMUNITY_SEED        seed for the Louvain move order
+COMMUNITY_GRAPH = os.getenv('COMMUNITY_GRAPH', 'engagement')
+COMMUNITY_RESOLUTION = float(os.getenv('COMMUNITY_RESOLUTION', '1.0'))
+COMMUNITY_SEED = int(os.getenv('COMMUNITY_SEED', '42'))
+
+# Incremental mode: fold only rows appended since the last run into the saved
+# graph state. INFLUENCE_WINDOW_DAYS ranks the last N days of comments
+# (by published_at) and implies incremental mode.
+INFLUENCE_WINDOW_DAYS = int(os.getenv('INFLUENCE_WINDOW_DAYS', '0')) or None
+INFLUENCE_INCREMENTAL = os.getenv('INFLUENCE_INCREMENTAL', 'false').lower() == 'true' or bool(INFLUENCE_WINDOW_DAYS)
+
+
+def windowed_path(path, window_days):
+    """State files of a sliding window are kept apart from the all-history ones"""
+    if window_days is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}_{window_days}d{ext}'
+
+
+def load_inputs(input_path=RESULTS_FILE, cache_dir=DEFAULT_CACHE_DIR, incremental=False, window_days=None,
+                graph_state=None, replies=True):
+    """
+    Load the engagement graph, author profile and reply graph for a results file
+
+    Args:
+        input_path: Sentiment results CSV
+        cache_dir: Graph artifact cache directory
+        incremental: Fold only appended rows into the saved graph state
+        window_days: Keep only the last N days of comments (implies incremental)
+        graph_state: Incremental state file, default DEFAULT_STATE_PATH of
+            incremental_graph (window_days is added to the name)
+        replies: Also load the reply graph
+
+    Returns:
+        Dict with edges (aggregate_edges() format), nodes and adjacency
+        (build_adjacency() format), authors (author_profile() format),
+        replies and reply_stats (None when replies=False)
+    """
+    from centrality import build_adjacency
+
+    if incremental or window_days:
+        from incremental_graph import DEFAULT_STATE_PATH, IncrementalGraph
+
+        with IncrementalGraph(windowed_path(graph_state or DEFAULT_STATE_PATH, window_days),
+                              window_days=window_days) as state:
+            with profiling.stage('graph_update') as update:
+                new_rows = update.rows = state.update(input_path)
+                state.save()
+            window = f"last {window_days} days" if window_days else "all history"
+            print(f"✅ Graph state updated with {new_rows:,} new comments ({window})")
+            edges = state.edges()
+            nodes, A = build_adjacency(edges)
+            return {
+                'edges': edges, 'nodes': nodes, 'adjacency': A, 'authors': state.author_profile(),
+                'replies': state.reply_edges() if replies else None,
+                'reply_stats': state.reply_stats if replies else None,
+            }
+
+    # (cached under collected_data/graph_cache and rebuilt only when they change)
+    from reply_graph import load_reply_graph
+
+    with profiling.stage('load_graph'):
+        graph = load_graph(input_path, cache_dir=cache_dir)
+        nodes, A = graph.adjacency()
+    with profiling.stage('load_replies'):
+        reply_edges, reply_stats = load_reply_graph(input_path, cache_dir=cache_dir) if replies else (None, None)
+    return {
+        'edges': graph.edges(), 'nodes': nodes, 'adjacency': A, 'authors': graph.author_profile(),
+        'replies': reply_edges, 'reply_stats': reply_stats,
+    }
+
+
+def _check_metrics(metrics):
+    metrics = list(dict.fromkeys(metrics))
+    unknown = [metric for metric in metrics if metric not in METRIC_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)} (choose from {', '.join(METRICS)})")
+    return metrics
+
+
+def score_authors(inputs, metrics=METRICS, warm_start=None, bridge_mode=BRIDGE_MODE,
+                  bridge_exact_limit=BRIDGE_EXACT_LIMIT, bridge_pivots=BRIDGE_PIVOTS, bridge_epsilon=BRIDGE_EPSILON,
+                  bridge_workers=BRIDGE_WORKERS, bridge_seed=BRIDGE_SEED, community_graph=COMMUNITY_GRAPH,
+                  community_resolution=COMMUNITY_RESOLUTION, community_seed=COMMUNITY_SEED, verbose=False):
+    """
+    Compute the selected influence metrics and join them with the author profile
+
+    Args:
+        inputs: Dict from load_inputs()
+        metrics: Names from METRICS to compute
+        warm_start: CSV of previous eigenvector/pagerank/hub/reply scores; the
+            iterative metrics start from it and it is overwritten with the new
+            scores (None = no warm start, nothing written)
+        bridge_*: Betweenness settings, see the BRIDGE_* constants
+        community_*: Louvain settings, see the COMMUNITY_* constants
+        verbose: Print convergence diagnostics
+
+    Returns:
+        DataFrame with one row per author: author, the METRIC_COLUMNS of the
+        selected metrics, then the AUTHOR_PROFILE_COLUMNS aggregates; sorted
+        by the first available RANK_COLUMNS score
+    """
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+
+    from author_projection import project_authors
+    from centrality import (betweenness_centrality, build_adjacency, degree_centrality, eigenvector_centrality, hits,
+                            load_warm_start, pagerank, pivots_for_error, print_diagnostics, save_scores)
+    from communities import louvain, print_diagnostics as print_community_diagnostics
+    from engagement_graph import AUTHOR_PROFILE_COLUMNS, build_sparse
+    from reply_graph import print_stats as print_reply_stats
+
+    metrics = _check_metrics(metrics)
+    edges, nodes, A = inputs['edges'], inputs['nodes'], inputs['adjacency']
+    warm = load_warm_start(warm_start, nodes) if warm_start else {}
+    scores, infos, saved = {}, {}, {}
+
+    # Degree Centrality: Who is the most active/connected?
+    if 'degree' in metrics:
+        with profiling.stage('degree', rows=len(nodes)):
+            scores['degree_influence'] = degree_centrality(A)
+
+    # Eigenvector Centrality: Who is connected to the most important videos?
+    # (Undirected, so authors are scored by the videos they comment on)
+    if 'prestige' in metrics:
+        with profiling.stage('prestige', rows=len(nodes)):
+            scores['prestige_influence'], infos['eigenvector'] = eigenvector_centrality(A, x0=warm.get('eigenvector'))
+        saved['eigenvector'] = scores['prestige_influence']
+
+    # PageRank: Influence that flows through the shared videos
+    if 'pagerank' in metrics:
+        with profiling.stage('pagerank', rows=len(nodes)):
+            scores['pagerank'], infos['pagerank'] = pagerank(A, x0=warm.get('pagerank'))
+        saved['pagerank'] = scores['pagerank']
+
+    # HITS hubs: Who comments on the most authoritative videos?
+    if 'hubs' in metrics:
+        with profiling.stage('hubs', rows=len(nodes)):
+            scores['hub_score'], _, infos['hits'] = hits(A, x0=warm.get('hub'))
+        saved['hub'] = scores['hub_score']
+
+    # Reply Network: Whose comments draw replies? Edges point from the replier to
+    # the author replied to, so PageRank flows to the people others answer
+    replies = inputs['replies']
+    if 'replies' in metrics:
+        if verbose:
+            print_reply_stats(replies, inputs['reply_stats'])
+        with profiling.stage('replies', rows=len(replies)):
+            reply_nodes, R = build_adjacency(replies, source='source', target='target')
+            position = nodes.get_indexer(reply_nodes)
+            # Repliers outside the engagement graph (position -1) have no saved score
+            x0 = np.where(position >= 0, warm['reply_influence'][position], 0) if 'reply_influence' in warm else None
+            reply_rank, infos['reply pagerank'] = pagerank(R, directed=True, x0=x0)
+        scores['reply_influence'] = np.zeros(len(nodes))
+        scores['reply_influence'][position[position >= 0]] = reply_rank[position >= 0]
+        saved['reply_influence'] = scores['reply_influence']
+
+    if verbose:
+        for name, info in infos.items():
+            print_diagnostics(name, info)
+    if warm_start and saved:
+        save_scores(warm_start, nodes, saved)
+
+    # Betweenness Centrality: Who acts as a bridge between different video topics?
+    # (Undirected: with edges pointing author -> video no author lies on a path)
+    if 'bridge' in metrics:
+        pivots = None
+        if bridge_mode == 'approx' or (bridge_mode == 'auto' and len(nodes) > bridge_exact_limit):
+            pivots = bridge_pivots or pivots_for_error(len(nodes), bridge_epsilon)
+        with profiling.stage('bridge', rows=len(nodes)):
+            scores['bridge_score'], between_info = betweenness_centrality(
+                A, k=pivots, seed=bridge_seed, workers=bridge_workers
+            )
+        if verbose:
+            print_diagnostics("betweenness", between_info)
+
+    # 4. Combine Network and Sentiment Data
+    profile = pd.DataFrame({'author': edges['author'].unique()})
+    profile = profile.join(pd.DataFrame(scores, index=nodes), on='author')
+
+    # Replies each author received and how those replies felt
+    if 'replies' in metrics:
+        scored = replies['mean_sentiment'].notna()
+        received = pd.DataFrame({
+            'target': replies['target'],
+            'weight': replies['weight'],
+            'score_weight': replies['weight'].where(scored, 0),
+            'score_sum': (replies['mean_sentiment'] * replies['weight']).where(scored, 0),
+        }).groupby('target').sum()
+        profile['replies_received'] = profile['author'].map(received['weight']).fillna(0).astype(int)
+        profile['reply_sentiment'] = profile['author'].map(
+            received['score_sum'] / received['score_weight'].where(received['score_weight'] > 0)
+        )
+
+    # Communities: Which audiences cluster around the same content?
+    if 'communities' in metrics and community_graph != 'none':
+        with profiling.stage('communities', rows=len(nodes)):
+            if community_graph == 'engagement':
+                membership, community_info = louvain(A, resolution=community_resolution, seed=community_seed)
+                community_of = pd.Series(membership, index=nodes)
+            elif community_graph == 'coengagement':
+                authors, _, B = build_sparse(edges)
+                source, target, weight = project_authors(B)
+                coengagement = sparse.csr_matrix((weight, (source, target)), shape=(len(authors), len(authors)))
+                membership, community_info = louvain(coengagement, resolution=community_resolution,
+                                                     seed=community_seed)
+                community_of = pd.Series(membership, index=authors)
+            else:
+                raise ValueError(f"Unknown community graph: {community_graph}")
+        if verbose:
+            print_community_diagnostics(community_info)
+        profile['community'] = profile['author'].map(community_of[~community_of.index.duplicated()])
+
+    # Merge with the sentiment profile (comment volume, likes, labels)
+    with profiling.stage('join_profile', rows=len(profile)):
+        profile = profile.merge(inputs['authors'], on='author', how='inner')
+    columns = [column for metric in metrics for column in METRIC_COLUMNS[metric] if column in profile.columns]
+    profile = profile[['author'] + columns + AUTHOR_PROFILE_COLUMNS[1:]]
+
+    # Sort by Influence to see the top "Opinion Leaders"
+    rank_by = next((column for column in RANK_COLUMNS if column in profile.columns), 'comments')
+    return profile.sort_values(rank_by, ascending=False, kind='stable').reset_index(drop=True)
+
+
+def compute_influence(input_path=RESULTS_FILE, metrics=METRICS, cache_dir=DEFAULT_CACHE_DIR, incremental=False,
+                      window_days=None, graph_state=None, **kwargs):
+    """
+    Author influence profile for a sentiment results file
+
+    Only caches (graph artifacts, incremental state and, if warm_start is
+    given, the centrality state) are written; the profile is returned.
+
+    Args:
+        input_path: Sentiment results CSV
+        metrics: Names from METRICS to compute
+        cache_dir, incremental, window_days, graph_state: See load_inputs()
+        **kwargs: Passed to score_authors()
+
+    Returns:
+        DataFrame, see score_authors()
+    """
+    metrics = _check_metrics(metrics)
+    inputs = load_inputs(input_path, cache_dir=cache_dir, incremental=incremental, window_days=window_days,
+                         graph_state=graph_state, replies='replies' in metrics)
+    return score_authors(inputs, metrics=metrics, **kwargs)
+
+
+def _metric_list(value):
+    return [metric.strip() for metric in value.split(',') if metric.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank authors by network influence and sentiment")
+    parser.add_argument("--input", default=RESULTS_FILE, help="Sentiment results CSV")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Influence profile CSV to write")
+    parser.add_argument("--summary-output", default=SUMMARY_FILE, help="Community summary CSV to write")
+    parser.add_argument("--plot", default=PLOT_FILE, help="Influence vs. sentiment figure to write")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the figure")
+    parser.add_argument("--metrics", type=_metric_list, default=METRICS,
+                        help=f"Comma-separated metrics to compute (default: {','.join(METRICS)})")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Graph artifact cache directory")
+    parser.add_argument("--incremental", action="store_true", default=INFLUENCE_INCREMENTAL,
+                        help="Fold only rows appended since the last run into the saved graph state")
+    parser.add_argument("--window-days", type=int, default=INFLUENCE_WINDOW_DAYS,
+                        help="Rank the last N days of comments (implies --incremental)")
+    parser.add_argument("--graph-state",
+                        help=f"Incremental graph state (default: {GRAPH_STATE_NAME} next to --input)")
+    parser.add_argument("--centrality-state",
+                        help=f"Warm-start scores of the iterative metrics (default: {CENTRALITY_STATE_NAME} "
+                             f"next to --input)")
+    parser.add_argument("--no-warm-start", action="store_true",
+                        help="Start the iterative metrics from scratch and don't save their scores")
+    parser.add_argument("--bridge-mode", choices=['auto', 'exact', 'approx'], default=BRIDGE_MODE,
+                        help="Exact or sampled betweenness (auto: sampled above --bridge-exact-limit nodes)")
+    parser.add_argument("--bridge-exact-limit", type=int, default=BRIDGE_EXACT_LIMIT)
+    parser.add_argument("--bridge-pivots", type=int, default=BRIDGE_PIVOTS,
+                        help="Sampled sources (0 = derive from --bridge-epsilon)")
+    parser.add_argument("--bridge-epsilon", type=float, default=BRIDGE_EPSILON,
+                        help="Target error bound of sampled betweenness")
+    parser.add_argument("--bridge-workers", type=int, default=BRIDGE_WORKERS,
+                        help="Betweenness worker processes (0 = one per CPU)")
+    parser.add_argument("--bridge-seed", type=int, default=BRIDGE_SEED)
+    parser.add_argument("--community-graph", choices=['engagement', 'coengagement', 'none'],
+                        default=COMMUNITY_GRAPH, help="Graph the audience communities are detected on")
+    parser.add_argument("--community-resolution", type=float, default=COMMUNITY_RESOLUTION,
+                        help="Higher values give smaller communities")
+    parser.add_argument("--community-seed", type=int, default=COMMUNITY_SEED)
+    profiling.add_arguments(parser)
+    memory.add_arguments(parser)
+    args = parser.parse_args(argv)
+    memory.apply(args, parser)
+
+    try:
+        metrics = _check_metrics(args.metrics)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.window_days is not None and args.window_days <= 0:
+        parser.error("--window-days must be positive")
+    state_dir = os.path.dirname(args.input)
+    args.graph_state = args.graph_state or os.path.join(state_dir, GRAPH_STATE_NAME)
+    args.centrality_state = args.centrality_state or os.path.join(state_dir, CENTRALITY_STATE_NAME)
+    with profiling.session(args, 'influence', argv):
+        return _run(args, metrics)
+
+
+def _run(args, metrics):
+    # 1. Load the engagement and reply graphs built from your existing sentiment results
+    inputs = load_inputs(args.input, cache_dir=args.cache_dir, incremental=args.incremental,
+                         window_days=args.window_days, graph_state=args.graph_state,
+                         replies='replies' in metrics)
+
+    # 2./3. Calculate Influence Metrics, warm-started from the previous run's scores
+    print("Calculating influence scores...")
+    warm_start = None if args.no_warm_start else windowed_path(args.centrality_state, args.window_days)
+    bridge_workers = args.bridge_workers
+    if memory.budget():
+        bridge_workers = memory.fit_workers(bridge_workers or os.cpu_count() or 1)
+    profile = score_authors(
+        inputs, metrics=metrics, warm_start=warm_start,
+        bridge_mode=args.bridge_mode, bridge_exact_limit=args.bridge_exact_limit,
+        bridge_pivots=args.bridge_pivots, bridge_epsilon=args.bridge_epsilon,
+        bridge_workers=bridge_workers, bridge_seed=args.bridge_seed,
+        community_graph=args.community_graph, community_resolution=args.community_resolution,
+        community_seed=args.community_seed, verbose=True,
+    )
+
+    # Save for your project report
+    with profiling.stage('write', rows=len(profile)):
+        profile.to_csv(args.output, index=False)
+    print(f"✅ Influence profiles saved to: {args.output}")
+    print(profile.head(10))
+
+    # Per-community size, sentiment and top influencers
+    if 'community' in profile.columns:
+        rank_by = next((column for column in RANK_COLUMNS if column in profile.columns), 'comments')
+        with profiling.stage('community_summary', rows=len(profile)):
+            from communities import community_summary
+
+            summary = community_summary(profile, inputs['edges'], rank_by=rank_by)
+        summary.to_csv(args.summary_output, index=False)
+        print(f"✅ Community summary saved to: {args.summary_output}")
+        print(summary.head(10))
+
+    # 5. Visualize: the figure is written to a file with the headless Agg backend
+    if not args.no_plot:
+        with profiling.stage('plot'):
+            from plots import influence_scatter
+
+            x = next(column for column in RANK_COLUMNS + ['comments'] if column in profile.columns)
+            influence_scatter(
+                profile, x, args.plot, title='Consumer Influence vs. Emotional Sentiment',
+                xlabel=f"Influence Score ({x.replace('_influence', '').replace('_', ' ').title()})",
+                size='degree_influence' if 'degree_influence' in profile.columns else 'comments',
+            )
+    return profile
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Memory budget for the analysis stages
+--memory-budget (or MEMORY_BUDGET in .env) sets the resident memory a
+command may use. Chunked readers size each chunk from the memory the
+previous chunks actually took, worker pools are shrunk to what still fits,
+and inputs too large to load whole are streamed instead. Memory is read
+from /proc (RSS for this process, PSS for worker processes) without extra
+dependencies; elsewhere the resource module's peak RSS is the fallback.
+"""
+
+import os
+import re
+import sys
+
+from config import load_env
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Share of the free budget one chunk may take, and the working set of a
+# chunk while it is processed relative to its DataFrame size
+CHUNK_SHARE = float(os.getenv('MEMORY_CHUNK_SHARE', '0.25'))
+WORKING_SET_FACTOR = float(os.getenv('MEMORY_WORKING_SET_FACTOR', '3'))
+# First chunk read under a budget, before any per-row cost is known
+PROBE_ROWS = 10_000
+MIN_CHUNK_ROWS = 1_000
+# Memory of a parsed CSV relative to its size on disk, for whole-file loads
+CSV_EXPANSION = float(os.getenv('MEMORY_CSV_EXPANSION', '4'))
+UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def parse_size(text):
+    """Bytes in a size such as '512M', '2G', '1.5GB' or '1048576'"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid memory size: '{text}' (e.g. 512M or 2G)")
+    return int(float(match[1]) * UNITS[match[2].upper()])
+
+
+def format_size(size):
+    return f"{size / (1 << 20):,.0f} MB"
+
+
+# Estimated memory of one scoring worker process until one has been measured
+WORKER_BYTES = parse_size(os.getenv('MEMORY_WORKER_ESTIMATE', '150M'))
+
+# Resolved from MEMORY_BUDGET on first use, once the .env file is loaded
+_UNSET = object()
+_budget = _UNSET
+# Process pools whose workers count toward the budget
+_pools = []
+
+
+def set_budget(size):
+    """Set the budget in bytes (or as a size string); None removes it"""
+    global _budget
+    _budget = parse_size(size) if isinstance(size, str) else size
+
+
+def budget():
+    """
+    The memory budget in bytes, or None
+
+    Unless set, it comes from MEMORY_BUDGET in the environment or .env.
+
+    Raises:
+        ValueError: If MEMORY_BUDGET is not a valid size
+    """
+    global _budget
+    if _budget is _UNSET:
+        load_env()
+        value = os.getenv('MEMORY_BUDGET')
+        try:
+            _budget = parse_size(value) if value else None
+        except ValueError as e:
+            raise ValueError(f"MEMORY_BUDGET: {e}") from None
+    return _budget
+
+
+def _status_bytes(pid, field):
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _peak_from_rusage():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def rss():
+    """Resident memory of this process in bytes"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return _peak_from_rusage()
+
+
+def peak_rss():
+    """Highest resident memory of this process so far"""
+    return _status_bytes('self', 'VmHWM') or _peak_from_rusage()
+
+
+def process_memory(pid):
+    """Proportional memory of another process (pages shared with the parent count partly), or None"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return _status_bytes(pid, 'VmRSS')
+
+
+def watch_pool(executor):
+    """Count a ProcessPoolExecutor's workers toward used() until unwatch_pool()"""
+    _pools.append(executor)
+
+
+def unwatch_pool(executor):
+    if executor in _pools:
+        _pools.remove(executor)
+
+
+def worker_pids():
+    return [pid for pool in _pools for pid in list(getattr(pool, '_processes', None) or {})]
+
+
+def worker_memory():
+    """Memory of the watched pools' worker processes"""
+    return sum(process_memory(pid) or 0 for pid in worker_pids())
+
+
+def used():
+    """Memory counted against the budget: this process plus watched workers"""
+    return rss() + worker_memory()
+
+
+def headroom():
+    """Bytes left in the budget, or None without a budget"""
+    if budget() is None:
+        return None
+    return max(budget() - used(), 0)
+
+
+def fits(size):
+    """Whether size more bytes fit in the budget (always True without one)"""
+    free = headroom()
+    return free is None or size <= free
+
+
+def fit_workers(requested, per_worker=None):
+    """
+    Worker processes that fit in the budget, at least 1 and at most requested
+
+    Args:
+        requested: Workers asked for
+        per_worker: Measured (or estimated) memory of one worker; WORKER_BYTES by default
+    """
+    free = headroom()
+    if free is None or requested <= 1:
+        return requested
+    return max(1, min(requested, int(free // (per_worker or WORKER_BYTES))))
+
+
+def pool_fit(executor, requested):
+    """
+    Workers of a running pool's measured size that fit in the budget
+
+    Returns:
+        At most requested and at least 1; requested without a budget or
+        before the workers have started
+    """
+    pids = list(getattr(executor, '_processes', None) or {})
+    sizes = [size for size in (process_memory(pid) for pid in pids) if size]
+    if budget() is None or not sizes:
+        return requested
+    own = sum(sizes) if executor in _pools else 0
+    return max(1, min(requested, int((headroom() + own) // max(sizes))))
+
+
+class ChunkSizer:
+    def __init__(self, default_rows, factor=WORKING_SET_FACTOR, min_rows=MIN_CHUNK_ROWS):
+        """
+        Rows per chunk for a chunked pass, from the memory earlier chunks took
+
+        Without a budget every chunk has default_rows. With one, the first
+        chunk is a PROBE_ROWS probe; after that a chunk may use CHUNK_SHARE
+        of the free budget, at factor times its DataFrame size per row.
+        default_rows stays the upper limit.
+
+        Args:
+            default_rows: Chunk size without a budget
+            factor: Working set of a chunk relative to its DataFrame size
+            min_rows: Smallest chunk, so a nearly full budget still progresses
+        """
+        self.default_rows = default_rows
+        self.factor = factor
+        self.min_rows = min(min_rows, default_rows)
+        self.bytes_per_row = None
+        self.sizes = []
+
+    def next_rows(self):
+        free = headroom()
+        if free is None:
+            rows = self.default_rows
+        elif self.bytes_per_row is None:
+            rows = min(self.default_rows, PROBE_ROWS)
+        else:
+            rows = int(free * CHUNK_SHARE / (self.bytes_per_row * self.factor))
+            rows = max(self.min_rows, min(self.default_rows, rows))
+        self.sizes.append(rows)
+        return rows
+
+    def observe(self, frame):
+        """Record the per-row memory of a chunk just read"""
+        if len(frame):
+            per_row = frame.memory_usage(deep=True).sum() / len(frame)
+            # Follow the average, but react to heavier rows at once
+            self.bytes_per_row = per_row if self.bytes_per_row is None else max(
+                per_row, (self.bytes_per_row + per_row) / 2)
+
+
+def read_csv_chunks(source, chunk_rows, sizer=None, **read_csv_options):
+    """
+    Read a CSV in chunks of chunk_rows rows, or adaptively sized ones under a budget
+
+    Args:
+        source: Path or file object
+        chunk_rows: Rows per chunk without a budget (the upper limit with one)
+        sizer: ChunkSizer to use (default: a new one for chunk_rows)
+        **read_csv_options: Passed to pandas.read_csv
+    """
+    import pandas as pd
+
+    if budget() is None and sizer is None:
+        yield from pd.read_csv(source, chunksize=chunk_rows, **read_csv_options)
+        return
+    sizer = sizer or ChunkSizer(chunk_rows)
+    with pd.read_csv(source, chunksize=sizer.next_rows(), **read_csv_options) as reader:
+        first = True
+        while True:
+            try:
+                chunk = reader.get_chunk(None if first else sizer.next_rows())
+            except StopIteration:
+                return
+            first = False
+            sizer.observe(chunk)
+            yield chunk
+
+
+def add_arguments(parser):
+    """Add the shared --memory-budget option to a script's parser"""
+    parser.add_argument("--memory-budget", type=parse_size, metavar="SIZE",
+                        help="Keep memory use under SIZE (e.g. 2G) by adapting chunk sizes and worker "
+                             "counts (default: MEMORY_BUDGET, else unlimited)")
+
+
+def apply(args, parser=None):
+    """
+    Set the budget from parsed add_arguments() options, if given
+
+    Otherwise MEMORY_BUDGET is read now; an invalid value is reported
+    through parser.error() when a parser is passed.
+
+    Returns:
+        The budget in bytes, or None
+    """
+    if getattr(args, 'memory_budget', None):
+        set_budget(args.memory_budget)
+    try:
+        return budget()
+    except ValueError as e:
+        if parser is None:
+            raise
+        parser.error(str(e))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate comment clustering
+MinHash signatures over character shingles, grouped with LSH banding, so
+template spam ("Check my channel!!", "first!!!", emoji floods) collapses into
+clusters that downstream aggregates can count once. numpy and pandas are
+imported on first use, like in the sentiment command that imports this.
+"""
+
+import zlib
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.7
+# Near-duplicates are counted once per author and video
+DUPLICATE_KEY_COLUMNS = ['author', 'video_id', 'dup_cluster']
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_for_matching(text):
+    """Lowercase and collapse whitespace (matching only, never used for scoring)"""
+    return ' '.join(str(text).lower().split())
+
+
+def shingle_hashes(text, k=DEFAULT_SHINGLE_SIZE):
+    """Return the distinct crc32 hashes of the text's character k-grams"""
+    import numpy as np
+
+    text = normalize_for_matching(text)
+    if len(text) <= k:
+        grams = {text}
+    else:
+        grams = {text[i:i + k] for i in range(len(text) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64)
+
+
+def minhash_signatures(texts, num_perm=DEFAULT_NUM_PERM, k=DEFAULT_SHINGLE_SIZE, seed=42):
+    """
+    Compute MinHash signatures
+
+    Args:
+        texts: Sequence of texts
+        num_perm: Number of hash permutations (signature length)
+        k: Character shingle size
+        seed: Seed for the permutation coefficients
+
+    Returns:
+        uint64 array of shape (len(texts), num_perm)
+    """
+    import numpy as np
+
+    prime = np.uint64(_MERSENNE_PRIME)
+    rng = np.random.default_rng(seed)
+    # a < 2^31 and crc32 < 2^32 keep a*h below 2^63, so uint64 never overflows
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)[:, None]
+
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashes = shingle_hashes(text, k)
+        signatures[row] = ((a * hashes + b) % prime).min(axis=1)
+    return signatures
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def lsh_clusters(signatures, bands=DEFAULT_BANDS, threshold=DEFAULT_THRESHOLD):
+    """
+    Group signatures into near-duplicate clusters
+
+    Rows that share any LSH band bucket are candidates; a candidate joins the
+    bucket's first row when their estimated Jaccard similarity reaches the
+    threshold.
+
+    Args:
+        signatures: Output of minhash_signatures()
+        bands: Number of LSH bands (must divide the signature length)
+        threshold: Minimum estimated Jaccard similarity to merge
+
+    Returns:
+        int array of cluster labels (the lowest row index in each cluster)
+    """
+    import numpy as np
+
+    n, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError(f"bands ({bands}) must divide the signature length ({num_perm})")
+    rows = num_perm // bands
+
+    parent = list(range(n))
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, bucket = np.unique(keys, return_inverse=True)
+
+        order = np.argsort(bucket, kind='stable')
+        boundaries = np.flatnonzero(np.diff(bucket[order])) + 1
+        for members in np.split(order, boundaries):
+            if len(members) < 2:
+                continue
+            head = members[0]
+            similarity = (signatures[members[1:]] == signatures[head]).mean(axis=1)
+            for member in members[1:][similarity >= threshold]:
+                root_a, root_b = _find(parent, head), _find(parent, member)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    return np.array([_find(parent, i) for i in range(n)], dtype=np.int64)
+
+
+def cluster_near_duplicates(texts, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                            threshold=DEFAULT_THRESHOLD, k=DEFAULT_SHINGLE_SIZE):
+    """
+    Assign every text to a near-duplicate cluster
+
+    Exact duplicates (after normalization) are hashed once.
+
+    Returns:
+        DataFrame aligned with texts with 'dup_cluster' and 'dup_count' columns
+    """
+    import numpy as np
+    import pandas as pd
+
+    normalized = pd.Series([normalize_for_matching(t) for t in texts], dtype=object)
+    codes, uniques = pd.factorize(normalized)
+
+    if len(uniques):
+        signatures = minhash_signatures(list(uniques), num_perm=num_perm, k=k)
+        unique_labels = lsh_clusters(signatures, bands=bands, threshold=threshold)
+    else:
+        unique_labels = np.empty(0, dtype=np.int64)
+
+    labels = unique_labels[codes]
+    counts = np.bincount(labels, minlength=len(uniques))[labels] if len(labels) else labels
+    return pd.DataFrame({'dup_cluster': labels, 'dup_count': counts})
+
+
+def duplicate_keys(frame):
+    """
+    Key of each comment's author, video and near-duplicate cluster
+
+    Returns:
+        int64 array aligned with frame (int64 so SQLite can store it)
+    """
+    import pandas as pd
+
+    return pd.util.hash_pandas_object(frame[DUPLICATE_KEY_COLUMNS], index=False).to_numpy().view('int64')
+
+
+def first_duplicates(keys, seen):
+    """
+    Mask of the comments to count: one per key, across chunks
+
+    Shared by the full and incremental graph builds so both collapse the
+    same comments.
+
+    Args:
+        keys: duplicate_keys() of a chunk
+        seen: Set of the keys counted in earlier chunks; the keys counted
+            here are added to it
+
+    Returns:
+        Boolean array, True for the first comment of each key not in seen
+    """
+    import numpy as np
+    import pandas as pd
+
+    first = ~pd.Series(keys).duplicated().to_numpy()
+    first &= np.fromiter((key not in seen for key in keys.tolist()), dtype=bool, count=len(keys))
+    seen.update(keys[first].tolist())
+    return first
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+Incremental pipeline runner
+Declares the collection and analysis scripts as a DAG of stages with typed
+inputs and outputs, wired together by the files they exchange. A stage is
+skipped when the hash of its inputs and arguments matches its last
+successful run, stages whose inputs are ready run in parallel worker
+processes, and the per-stage timings of every run are appended to a log.
+"""
+
+import argparse
+import contextlib
+import csv
+import fnmatch
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+# Add current directory to path
+sys.path.append('.')
+
+from comment_dataset import DEFAULT_DATA_DIR, is_derived_output
+from graph_artifacts import file_digest
+from influence import (CENTRALITY_STATE_NAME, GRAPH_STATE_NAME, INFLUENCE_INCREMENTAL, INFLUENCE_WINDOW_DAYS,
+                       windowed_path)
+import memory
+from sentiment_cache import CACHE_NAME
+
+STATE_VERSION = 1
+STATE_DIR_NAME = ".pipeline"
+STATE_NAME = "state.json"
+RUNS_NAME = "runs.jsonl"
+
+# Stages run at once (1 = one after another in this process)
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '1'))
+
+
+def _digest(values):
+    payload = json.dumps(values, sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class Table:
+    """CSV file whose header must contain `columns`"""
+
+    def __init__(self, path, columns=()):
+        self.path = os.path.normpath(path)
+        self.columns = list(columns)
+
+    def __repr__(self):
+        return f"Table({self.path!r})"
+
+    @property
+    def anchor(self):
+        return self.path
+
+    def covers(self, path):
+        return os.path.normpath(path) == self.path
+
+    def check(self):
+        """Return a problem description, or None if the file is usable"""
+        if not os.path.isfile(self.path):
+            return f"{self.path} is missing"
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            header = next(csv.reader(f), [])
+        missing = [column for column in self.columns if column not in header]
+        if missing:
+            return f"{self.path} lacks column(s) {', '.join(missing)}"
+        return None
+
+    def digest(self, state_dir):
+        return file_digest(self.path, state_dir)
+
+
+class Figure(Table):
+    """Image or other opaque file that must exist and be non-empty"""
+
+    def __init__(self, path):
+        super().__init__(path)
+
+    def __repr__(self):
+        return f"Figure({self.path!r})"
+
+    def check(self):
+        if not os.path.isfile(self.path) or os.path.getsize(self.path) == 0:
+            return f"{self.path} is missing or empty"
+        return None
+
+
+class FileSet:
+    """Files in `directory` matching `pattern`, minus those `exclude(path)` rejects"""
+
+    def __init__(self, directory, pattern, exclude=None):
+        self.directory = os.path.normpath(directory)
+        self.pattern = pattern
+        self.exclude = exclude
+
+    def __repr__(self):
+        return f"FileSet({self.anchor!r})"
+
+    @property
+    def anchor(self):
+        return os.path.join(self.directory, self.pattern)
+
+    def covers(self, path):
+        path = os.path.normpath(path)
+        return (os.path.dirname(path) == self.directory
+                and fnmatch.fnmatch(os.path.basename(path), self.pattern)
+                and not (self.exclude and self.exclude(path)))
+
+    def files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(str(path) for path in Path(self.directory).glob(self.pattern)
+                      if path.is_file() and self.covers(str(path)))
+
+    def check(self):
+        if not self.files():
+            return f"no files match {self.anchor}"
+        return None
+
+    def digest(self, state_dir):
+        return _digest([[os.path.basename(path), file_digest(path, state_dir)] for path in self.files()])
+
+
+class Directory:
+    """
+    Directory shared between stages, such as a content-addressed cache
+
+    It orders the stages that write and read it, but its contents are not
+    hashed: entries in it are keyed by their own inputs already.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.normpath(path)
+
+    def __repr__(self):
+        return f"Directory({self.path!r})"
+
+    @property
+    def anchor(self):
+        return self.path
+
+    def covers(self, path):
+        return os.path.normpath(path) == self.path
+
+    def check(self):
+        return None if os.path.isdir(self.path) else f"{self.path} is missing"
+
+    def digest(self, state_dir):
+        return None
+
+
+def overlaps(a, b):
+    """True if two typed files refer to the same data"""
+    return a.covers(b.anchor) or b.covers(a.anchor)
+
+
+class Stage:
+    def __init__(self, name, target, args=(), inputs=(), outputs=(), options=(), always_run=False, version=1):
+        """
+        One step of the pipeline
+
+        Args:
+            name: Stage name
+            target: 'module:function' called with an argv list, like the scripts' main(argv)
+            args: Command-line arguments that affect the outputs; part of the stage hash
+            inputs: Typed files (Table, Figure, FileSet, Directory) the stage reads
+            outputs: Typed files the stage writes
+            options: Arguments that don't affect the outputs, e.g. worker counts; not hashed
+            always_run: Never skip, e.g. collection from a live API
+            version: Bump to invalidate earlier runs after changing what the stage does
+        """
+        self.name = name
+        self.target = target
+        self.args = [str(arg) for arg in args]
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.options = [str(option) for option in options]
+        self.always_run = always_run
+        self.version = version
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+    @property
+    def argv(self):
+        return self.args + self.options
+
+    def key(self, input_digests):
+        """Hash of everything that determines this stage's outputs"""
+        return _digest({'version': self.version, 'target': self.target, 'args': self.args,
+                        'inputs': input_digests})
+
+
+def _execute(target, argv, log_path):
+    """
+    Run a stage's target with its output captured in log_path
+
+    Returns:
+        Dict with wall and CPU seconds and the error message, if any
+    """
+    module_name, function_name = target.split(':')
+    start, cpu_start = time.perf_counter(), time.process_time()
+    error = None
+    with open(log_path, 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            getattr(importlib.import_module(module_name), function_name)(list(argv))
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                error = f"exited with status {e.code}"
+        except Exception as e:
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+    return {'seconds': time.perf_counter() - start, 'cpu_seconds': time.process_time() - cpu_start,
+            'error': error}
+
+
+class Pipeline:
+    def __init__(self, stages, state_dir):
+        """
+        Wire stages into a DAG by matching outputs to inputs
+
+        Args:
+            stages: Stage objects; a stage depends on every stage that writes one of its inputs
+            state_dir: Directory for the run state, stage logs and timing history
+
+        Raises:
+            ValueError: On duplicate names, two stages writing the same file, or a cycle
+        """
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage '{stage.name}'")
+            self.stages[stage.name] = stage
+        self.state_dir = Path(state_dir)
+
+        self.dependencies = {name: set() for name in self.stages}
+        for stage in stages:
+            for other in stages:
+                if other is stage:
+                    continue
+                if any(overlaps(a, b) for a in stage.outputs for b in other.outputs):
+                    if stage.name < other.name:
+                        raise ValueError(f"Stages '{stage.name}' and '{other.name}' write the same output")
+                if any(overlaps(i, o) for i in stage.inputs for o in other.outputs):
+                    self.dependencies[stage.name].add(other.name)
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order = []
+        remaining = dict(self.dependencies)
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps - set(order)]
+            if not ready:
+                raise ValueError(f"Stages form a cycle: {', '.join(sorted(remaining))}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+        return order
+
+    def upstream(self, names):
+        """The named stages plus everything they depend on, in run order"""
+        unknown = [name for name in names if name not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s) {', '.join(unknown)} (available: {', '.join(self.order)})")
+        selected = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies[name])
+        return [name for name in self.order if name in selected]
+
+    def load_state(self):
+        path = self.state_dir / STATE_NAME
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state
+        return {'version': STATE_VERSION, 'stages': {}}
+
+    def _save_state(self, state):
+        path = self.state_dir / STATE_NAME
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def history(self):
+        """Timing records of earlier runs, oldest first"""
+        path = self.state_dir / RUNS_NAME
+        if not path.exists():
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _digests(self, files):
+        return {item.anchor: item.digest(str(self.state_dir)) for item in files}
+
+    def _up_to_date(self, stage, key, state):
+        previous = state['stages'].get(stage.name)
+        if stage.always_run or not previous or previous['key'] != key:
+            return False
+        if any(output.check() for output in stage.outputs):
+            return False
+        # Outputs edited or replaced since the last run are rebuilt
+        return self._digests(stage.outputs) == previous['outputs']
+
+    def run(self, targets=None, force=(), workers=PIPELINE_WORKERS, dry_run=False):
+        """
+        Run the stages that are out of date
+
+        Args:
+            targets: Stage names to bring up to date, with their upstream
+                stages (default: all)
+            force: Stage names to run even if their hash is unchanged
+            workers: Stages run at once; 1 runs them one after another in
+                this process
+            dry_run: Report what would run without running anything
+
+        Returns:
+            {stage name: {'status': ran|skipped|failed|blocked|would run,
+            'seconds': ..., ...}} in run order
+        """
+        selected = self.upstream(targets) if targets else list(self.order)
+        force = set(force)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        (self.state_dir / 'logs').mkdir(exist_ok=True)
+        state = self.load_state()
+        results = {}
+        running = {}
+        pending = list(selected)
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and not dry_run else None
+        started_at = datetime.now().isoformat(timespec='seconds')
+        start = time.perf_counter()
+
+        def finish(name, key, outcome):
+            stage = self.stages[name]
+            error = outcome['error'] or next(filter(None, (output.check() for output in stage.outputs)), None)
+            results[name] = {'status': 'failed' if error else 'ran', 'seconds': round(outcome['seconds'], 3),
+                             'cpu_seconds': round(outcome['cpu_seconds'], 3)}
+            if error:
+                results[name]['error'] = error
+                state['stages'].pop(name, None)
+            else:
+                state['stages'][name] = {'key': key, 'outputs': self._digests(stage.outputs),
+                                         'seconds': results[name]['seconds'],
+                                         'finished_at': datetime.now().isoformat(timespec='seconds')}
+            self._save_state(state)
+
+        try:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.dependencies[name] & set(selected)
+                    statuses = [results[dep]['status'] for dep in deps if dep in results]
+                    if any(status in ('failed', 'blocked') for status in statuses):
+                        results[name] = {'status': 'blocked', 'seconds': 0.0}
+                        pending.remove(name)
+                        continue
+                    if len(statuses) < len(deps):
+                        continue
+                    pending.remove(name)
+                    stage = self.stages[name]
+
+                    if dry_run and 'would run' in statuses:
+                        results[name] = {'status': 'would run', 'seconds': 0.0}
+                        continue
+                    problem = next(filter(None, (item.check() for item in stage.inputs)), None)
+                    if problem:
+                        results[name] = {'status': 'failed', 'seconds': 0.0, 'error': problem}
+                        continue
+                    key = stage.key(self._digests(stage.inputs))
+                    if name not in force and self._up_to_date(stage, key, state):
+                        results[name] = {'status': 'skipped', 'seconds': 0.0}
+                        continue
+                    if dry_run:
+                        results[name] = {'status': 'would run', 'seconds': 0.0}
+                        continue
+
+                    log_path = str(self.state_dir / 'logs' / f'{name}.log')
+                    if pool is None:
+                        finish(name, key, _execute(stage.target, stage.argv, log_path))
+                    else:
+                        running[pool.submit(_execute, stage.target, stage.argv, log_path)] = (name, key)
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, key = running.pop(future)
+                        finish(name, key, future.result())
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        results = {name: results[name] for name in selected}
+        if not dry_run:
+            record = {'started_at': started_at, 'seconds': round(time.perf_counter() - start, 3),
+                      'workers': workers, 'stages': results}
+            with open(self.state_dir / RUNS_NAME, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        return results
+
+
+def default_pipeline(data_dir=DEFAULT_DATA_DIR, hashtag=None, max_comments=None, engine='vader',
+                     near_duplicates=False, sentiment_workers=1, metrics=None, state_dir=None):
+    """
+    The collection and analysis scripts as one pipeline
+
+    Args:
+        data_dir: Directory the scripts read from and write to
+        hashtag: Collect new YouTube comments for this hashtag first
+            (a live API, so collection always runs)
+        max_comments: Collection cap (default: the collector's)
+        engine: Sentiment scoring engine
+        near_duplicates: Cluster near-duplicate comments during scoring
+        sentiment_workers: Scoring worker processes
+        metrics: Influence metrics (default: all)
+        state_dir: Run state directory (default: {data_dir}/.pipeline)
+
+    The sentiment score cache and the influence state files (warm-start
+    scores, incremental graph state) are kept in data_dir and declared as
+    outputs of the stages that write them.
+    """
+    path = lambda name: os.path.join(data_dir, name)
+    comments = FileSet(data_dir, 'youtube_*.csv', exclude=is_derived_output)
+    results = Table(path('youtube_sentiment_results.csv'), ['author', 'video_id', 'text', 'sentiment_score',
+                                                            'sentiment'])
+    cache = Directory(path('graph_cache'))
+    metrics = list(metrics) if metrics else None
+
+    stages = []
+    if hashtag:
+        collect_args = [hashtag, '--output-dir', data_dir]
+        if max_comments:
+            collect_args += ['--max-comments', max_comments]
+        stages.append(Stage('collect', 'youtube_collector:main', collect_args, outputs=[comments], always_run=True))
+
+    sentiment_args = ['--data-dir', data_dir, '--output', results.path, '--engine', engine,
+                      '--cache', path(CACHE_NAME)]
+    if near_duplicates:
+        sentiment_args.append('--near-duplicates')
+    influence_args = ['--input', results.path, '--cache-dir', cache.path, '--output', path('author_influence_profile.csv'),
+                      '--summary-output', path('community_summary.csv'),
+                      '--plot', path('influence_sentiment_matrix.png'),
+                      '--graph-state', path(GRAPH_STATE_NAME), '--centrality-state', path(CENTRALITY_STATE_NAME)]
+    influence_outputs = [Table(path('author_influence_profile.csv'), ['author']),
+                         Figure(path('influence_sentiment_matrix.png'))]
+    if metrics:
+        influence_args += ['--metrics', ','.join(metrics)]
+    if metrics is None or 'communities' in metrics:
+        influence_outputs.append(Table(path('community_summary.csv'), ['community']))
+    # The .env defaults decide which state files influence keeps, so they are part of the stage hash
+    if INFLUENCE_INCREMENTAL:
+        influence_args.append('--incremental')
+        influence_outputs.append(Figure(windowed_path(path(GRAPH_STATE_NAME), INFLUENCE_WINDOW_DAYS)))
+    if INFLUENCE_WINDOW_DAYS:
+        influence_args += ['--window-days', INFLUENCE_WINDOW_DAYS]
+    if metrics is None or {'prestige', 'pagerank', 'hubs', 'replies'} & set(metrics):
+        influence_outputs.append(Table(windowed_path(path(CENTRALITY_STATE_NAME), INFLUENCE_WINDOW_DAYS), ['node']))
+
+    stages += [
+        Stage('sentiment', 'youtube_sentiment_analysis:main', sentiment_args,
+              inputs=[comments], outputs=[results, Figure(path(CACHE_NAME))], options=['--workers', sentiment_workers]),
+        # Built once here so the stages below only read the cached graph
+        Stage('graph', 'graph_artifacts:main', ['--input', results.path, '--cache-dir', cache.path],
+              inputs=[results], outputs=[cache]),
+        Stage('network', 'youtube_network_analysis:main',
+              ['--input', results.path, '--cache-dir', cache.path, '--output-dir', data_dir],
+              inputs=[results, cache],
+              outputs=[Figure(path(name)) for name in
+                       ('network_top_commenters.png', 'network_sentiment.png', 'network_density.png')]),
+        Stage('influence', 'influence:main', influence_args, inputs=[results, cache], outputs=influence_outputs),
+        Stage('projection', 'author_projection:main',
+              ['--input', results.path, '--cache-dir', cache.path, '--output', path('author_coengagement_edges.csv')],
+              inputs=[results, cache],
+              outputs=[Table(path('author_coengagement_edges.csv'), ['author_a', 'author_b', 'weight'])]),
+        Stage('replies', 'reply_graph:main', ['--input', results.path, '--output', path('reply_edges.csv')],
+              inputs=[results], outputs=[Table(path('reply_edges.csv'), ['source', 'target'])]),
+    ]
+    return Pipeline(stages, state_dir or os.path.join(data_dir, STATE_DIR_NAME))
+
+
+def print_results(results):
+    print(f"\n{'Stage':<12} {'Status':<10} {'Seconds':>9}")
+    for name, result in results.items():
+        print(f"{name:<12} {result['status']:<10} {result['seconds']:>9.2f}")
+        if 'error' in result:
+            print(f"  ❌ {result['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the collection and analysis stages that are out of date",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s                         # refresh everything whose inputs changed
+  %(prog)s influence --workers 2   # bring influence and its inputs up to date
+  %(prog)s --collect python        # collect new comments first
+  %(prog)s network --force         # redraw the figures even if nothing changed
+        """
+    )
+    parser.add_argument("stages", nargs='*', help="Stages to bring up to date (default: all)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Directory the stages read and write")
+    parser.add_argument("--collect", metavar="HASHTAG", help="Collect YouTube comments for this hashtag first")
+    parser.add_argument("--max-comments", type=int, help="Collection cap")
+    parser.add_argument("--engine", choices=['vader', 'vectorized'], default='vader', help="Sentiment engine")
+    parser.add_argument("--near-duplicates", action="store_true", help="Cluster near-duplicate comments")
+    parser.add_argument("--sentiment-workers", type=int, default=1, help="Sentiment scoring processes")
+    parser.add_argument("--metrics", help="Comma-separated influence metrics (default: all)")
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS, help="Stages run at once")
+    parser.add_argument("--force", action="store_true",
+                        help="Rerun the named stages (or all stages) even if unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would run")
+    memory.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be a positive integer")
+    if memory.apply(args, parser):
+        # Stages running at once share the budget; worker processes inherit it through the environment
+        memory.set_budget(memory.budget() // args.workers)
+        os.environ['MEMORY_BUDGET'] = str(memory.budget())
+
+    try:
+        pipeline = default_pipeline(
+            args.data_dir, hashtag=args.collect, max_comments=args.max_comments, engine=args.engine,
+            near_duplicates=args.near_duplicates, sentiment_workers=args.sentiment_workers,
+            metrics=args.metrics.split(',') if args.metrics else None,
+        )
+        force = (args.stages or pipeline.order) if args.force else ()
+        results = pipeline.run(args.stages or None, force=force, workers=args.workers, dry_run=args.dry_run)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print_results(results)
+    if any(result['status'] in ('failed', 'blocked') for result in results.values()):
+        print(f"\n❌ Pipeline failed; stage logs are in {pipeline.state_dir / 'logs'}")
+        sys.exit(1)
+    if not args.dry_run:
+        print(f"\n✅ Pipeline up to date (timings appended to {pipeline.state_dir / RUNS_NAME})")
+
+
+if __name__ == "__main__":
+    main()
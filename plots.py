@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Headless figure rendering for the network and influence scripts
+Renders with the Agg backend straight to files (never plt.show), caches
+graph layouts on disk keyed by the graph's content, and switches to
+density (hexbin) plots for large point sets instead of one marker per node.
+"""
+
+import hashlib
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import eigsh
+
+LAYOUT_DIR = "collected_data/graph_cache/layouts"
+# Above this many points scatter plots become hexbin density plots
+LARGE_POINTS = 20000
+GRIDSIZE = 150
+DPI = 150
+SENTIMENT_PALETTE = {'Positive': 'green', 'Negative': 'red', 'Neutral': 'gray'}
+
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(repr(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def cached_layout(key, compute, cache_dir=LAYOUT_DIR):
+    """
+    Load a layout saved under key, or compute and save it
+
+    Args:
+        key: Content digest identifying the graph and layout parameters
+        compute: Callable returning (names, positions array of shape (n, 2))
+
+    Returns:
+        Tuple (names, positions)
+    """
+    path = Path(cache_dir) / f'{key}.npz'
+    if path.exists():
+        stored = np.load(path, allow_pickle=True)
+        return list(stored['names']), stored['positions']
+
+    names, positions = compute()
+    path.parent.mkdir(exist_ok=True, parents=True)
+    tmp_path = path.with_name(path.stem + '.tmp.npz')
+    np.savez(tmp_path, names=np.array(names, dtype=object), positions=positions)
+    tmp_path.replace(path)
+    return names, positions
+
+
+def spring_layout(G, k=0.5, seed=42, cache_dir=LAYOUT_DIR):
+    """networkx spring layout of a (small) graph, cached by its node and edge lists"""
+    nodes = sorted(map(str, G.nodes()))
+    edges = sorted((str(u), str(v)) for u, v in G.edges())
+    key = _digest('spring', k, seed, nodes, edges)
+
+    def compute():
+        pos = nx.spring_layout(G, k=k, seed=seed)
+        names = list(pos)
+        return names, np.array([pos[name] for name in names])
+
+    names, positions = cached_layout(key, compute, cache_dir)
+    return dict(zip(names, positions))
+
+
+def spectral_layout(A, cache_dir=LAYOUT_DIR):
+    """
+    Layout for large graphs from the 2nd and 3rd eigenvectors of the
+    normalized adjacency matrix (sparse Lanczos, no O(n^2) force model)
+
+    Returns:
+        Positions array of shape (n, 2) in the matrix's node order
+    """
+    A = sparse.csr_matrix(A)
+    key = _digest('spectral', A.shape, A.indptr, A.indices, A.data)
+
+    def compute():
+        W = (A + A.T).astype(np.float64)
+        n = W.shape[0]
+        if n < 4:
+            return list(range(n)), np.zeros((n, 2))
+        degree = np.asarray(W.sum(axis=1)).ravel()
+        scale = sparse.diags(np.divide(1.0, np.sqrt(degree), out=np.zeros(n), where=degree > 0))
+        _, vectors = eigsh(scale @ W @ scale, k=3, which='LA', v0=np.ones(n))
+        return list(range(n)), vectors[:, :2]
+
+    _, positions = cached_layout(key, compute, cache_dir)
+    return positions
+
+
+def save_figure(fig, path):
+    """Write a figure to path and release it"""
+    Path(path).parent.mkdir(exist_ok=True, parents=True)
+    fig.savefig(path, dpi=DPI, bbox_inches='tight')
+    plt.close(fig)
+    print(f"✅ Figure saved as: {path}")
+    return path
+
+
+def draw_network(G, pos, path, title, edge_colors='gray', arrows=False):
+    """Draw a small graph with labels"""
+    fig, ax = plt.subplots(figsize=(12, 8))
+    nx.draw_networkx_nodes(G, pos, ax=ax, node_color='skyblue', node_size=500)
+    nx.draw_networkx_edges(G, pos, ax=ax, edge_color=edge_colors, arrows=arrows)
+    nx.draw_networkx_labels(G, pos, ax=ax, font_size=8)
+    ax.set_title(title)
+    ax.axis('off')
+    return save_figure(fig, path)
+
+
+def draw_density(positions, path, title, values=None, label='Nodes per cell'):
+    """
+    Hexbin density plot of many points
+
+    Args:
+        positions: Array of shape (n, 2)
+        values: Optional per-point values; cells are colored by their mean
+        label: Colorbar label
+    """
+    fig, ax = plt.subplots(figsize=(10, 8))
+    if values is None:
+        image = ax.hexbin(positions[:, 0], positions[:, 1], gridsize=GRIDSIZE, bins='log', cmap='viridis',
+                          mincnt=1)
+    else:
+        image = ax.hexbin(positions[:, 0], positions[:, 1], C=values, gridsize=GRIDSIZE, cmap='RdYlGn',
+                          reduce_C_function=np.mean, mincnt=1)
+    fig.colorbar(image, ax=ax, label=label)
+    ax.set_title(title)
+    ax.set_xticks([])
+    ax.set_yticks([])
+    return save_figure(fig, path)
+
+
+def influence_scatter(df, x, path, title, xlabel, size='degree_influence'):
+    """
+    Influence metric against average sentiment, one point per author
+
+    Small profiles are drawn as a seaborn scatter colored by sentiment label;
+    above LARGE_POINTS authors, a hexbin of author counts is drawn instead.
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    if len(df) > LARGE_POINTS:
+        image = ax.hexbin(df[x], df['sentiment_score'], gridsize=GRIDSIZE, bins='log', cmap='viridis', mincnt=1)
+        fig.colorbar(image, ax=ax, label='Authors per cell')
+    else:
+        import seaborn as sns
+
+        sns.scatterplot(data=df, x=x, y='sentiment_score', size=size, hue='sentiment',
+                        palette=SENTIMENT_PALETTE, alpha=0.6, ax=ax)
+        ax.legend(title='Sentiment Type', bbox_to_anchor=(1.05, 1), loc='upper left')
+
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Average Sentiment Score (-1 to 1)')
+    ax.axhline(0.05, color='gray', linestyle='--', alpha=0.3)
+    ax.axhline(-0.05, color='gray', linestyle='--', alpha=0.3)
+    return save_figure(fig, path)
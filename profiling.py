@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Profiling hooks shared by the command-line scripts
+Code marks named stages with `with profiling.stage('name', rows=n):`, which
+costs next to nothing unless a script runs with --profile. Then each
+stage's calls, wall time, CPU time, rows and peak memory are accumulated,
+optionally with cProfile or a sampling profiler running alongside, and
+written as a JSON report that `python profiling.py compare` can diff
+against an earlier run. Under a memory budget (memory.py) the peak memory
+per stage is printed even without --profile.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import memory
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODES = ('timers', 'cprofile', 'sample')
+DEFAULT_PROFILE_DIR = "collected_data/profiles"
+REPORT_VERSION = 1
+# Sampling profiler settings
+SAMPLE_INTERVAL = 0.005
+MAX_STACK_DEPTH = 64
+# Seconds between memory samples attributed to the open stages
+MEMORY_INTERVAL = 0.01
+# Functions listed in a report's hotspots
+TOP_FUNCTIONS = 25
+
+# The profiler of the running command, if any
+_active = None
+
+
+class _StageRun:
+    """Handle yielded by stage(); set .rows (or call add()) to record rows processed"""
+
+    __slots__ = ('profiler', 'name', 'rows', 'wall', 'cpu')
+
+    def __init__(self, profiler, name, rows):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+
+    def add(self, rows):
+        self.rows = (self.rows or 0) + rows
+
+    def __enter__(self):
+        if self.profiler is not None:
+            self.profiler._push(self.name)
+            self.wall, self.cpu = time.perf_counter(), time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is not None:
+            self.profiler._record(self.name, time.perf_counter() - self.wall, time.thread_time() - self.cpu,
+                                  self.rows)
+            self.profiler._pop()
+        return False
+
+
+def stage(name, rows=None):
+    """
+    Time a named stage of the running command
+
+    Stages may nest and may run in several threads at once; times are
+    inclusive and accumulate over every call with the same name. CPU time
+    is that of the calling thread (worker processes are counted once, in
+    the report's children_cpu_seconds).
+
+    Args:
+        name: Stage name, e.g. 'api_request' or 'score'
+        rows: Rows processed, if known up front (or set .rows on the handle)
+    """
+    return _StageRun(_active, name, rows)
+
+
+def timed_iter(name, iterable):
+    """Yield from iterable, timing each next() as stage `name` and counting len() of items as rows"""
+    iterator = iter(iterable)
+    while True:
+        with stage(name) as run:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            run.rows = len(item) if hasattr(item, '__len__') else 1
+        yield item
+
+
+class Profiler:
+    def __init__(self, command, mode='timers', output=None, argv=None, sample_interval=SAMPLE_INTERVAL, save=True):
+        """
+        Collect stage timings (and optionally function-level profiles) for one run
+
+        Args:
+            command: Name of the profiled command, used in the report name
+            mode: 'timers' (stages only), 'cprofile' (deterministic profile of
+                the main thread) or 'sample' (statistical profile of every
+                thread inside a stage)
+            output: Report path (default: DEFAULT_PROFILE_DIR/<command>_<timestamp>.json);
+                cProfile data goes next to it as .prof, sampled stacks as .folded
+            argv: Command-line arguments, recorded in the report
+            save: Write the report on exit; otherwise only print peak memory per stage
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (choose from {', '.join(MODES)})")
+        self.command = command
+        self.mode = mode
+        self.started_at = datetime.now()
+        self.output = output or os.path.join(
+            DEFAULT_PROFILE_DIR, f"{command}_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        self.argv = list(sys.argv[1:] if argv is None else argv)
+        self.sample_interval = sample_interval
+        self.save = save
+        self.stages = {}
+        self.peaks = {}
+        self.peak = 0
+        self.order = []
+        self.lock = threading.Lock()
+        self.open_stages = {}
+        self.samples = Counter()
+        # Extra fields for the report, e.g. the workload a benchmark ran
+        self.metadata = {}
+        self._profile = None
+        self._sampler = None
+        self._memory_watch = None
+        self._stop = threading.Event()
+
+    def _push(self, name):
+        self.open_stages.setdefault(threading.get_ident(), []).append(name)
+
+    def _pop(self):
+        stack = self.open_stages.get(threading.get_ident())
+        if stack:
+            stack.pop()
+
+    def _record(self, name, wall, cpu, rows):
+        self._sample_memory(name)
+        with self.lock:
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = self.stages[name] = {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': None}
+                self.order.append(name)
+            totals['calls'] += 1
+            totals['wall_seconds'] += wall
+            totals['cpu_seconds'] += cpu
+            if rows is not None:
+                totals['rows'] = (totals['rows'] or 0) + rows
+
+    def _sample_memory(self, *names):
+        """Attribute current memory use to the named stages and every open one"""
+        used = memory.used()
+        open_names = {name for stack in list(self.open_stages.values()) for name in list(stack)}
+        with self.lock:
+            self.peak = max(self.peak, used)
+            for name in open_names.union(names):
+                self.peaks[name] = max(self.peaks.get(name, 0), used)
+
+    def _watch_memory(self):
+        while not self._stop.wait(MEMORY_INTERVAL):
+            self._sample_memory()
+
+    def _sample(self):
+        own = threading.get_ident()
+        main = threading.main_thread().ident
+        while not self._stop.wait(self.sample_interval):
+            for thread_id, frame in sys._current_frames().items():
+                open_stages = self.open_stages.get(thread_id)
+                if thread_id == own or not (open_stages or thread_id == main):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                label = open_stages[-1] if open_stages else '(no stage)'
+                self.samples[(label, tuple(reversed(stack)))] += 1
+
+    def start(self):
+        global _active
+        _active = self
+        self.wall, self.cpu = time.perf_counter(), time.process_time()
+        self.children = _children_cpu()
+        if self.mode == 'cprofile':
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.mode == 'sample':
+            self._sampler = threading.Thread(target=self._sample, name='profiler-sampler', daemon=True)
+            self._sampler.start()
+        self._memory_watch = threading.Thread(target=self._watch_memory, name='profiler-memory', daemon=True)
+        self._memory_watch.start()
+        return self
+
+    def stop(self):
+        global _active
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        self.children = _children_cpu() - self.children
+        if self._profile is not None:
+            self._profile.disable()
+        self._stop.set()
+        for thread in (self._sampler, self._memory_watch):
+            if thread is not None:
+                thread.join()
+        if _active is self:
+            _active = None
+
+    def _hotspots(self):
+        if self._profile is not None:
+            import pstats
+            stats = pstats.Stats(self._profile).stats
+            top = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+            return [{'function': f"{os.path.basename(file)}:{line}({function})", 'calls': calls,
+                     'self_seconds': round(own, 6), 'cumulative_seconds': round(cumulative, 6)}
+                    for (file, line, function), (_, calls, own, cumulative, _) in top]
+        if self.samples:
+            total = sum(self.samples.values())
+            own = Counter()
+            for (_, stack), n in self.samples.items():
+                own[stack[-1] if stack else '(idle)'] += n
+            return [{'function': function, 'samples': n, 'share': round(n / total, 4)}
+                    for function, n in own.most_common(TOP_FUNCTIONS)]
+        return []
+
+    def report(self):
+        """The run's report as a JSON-serializable dict"""
+        stages = []
+        for name in self.order:
+            totals = self.stages[name]
+            entry = {'name': name, 'calls': totals['calls'], 'wall_seconds': round(totals['wall_seconds'], 6),
+                     'cpu_seconds': round(totals['cpu_seconds'], 6), 'rows': totals['rows']}
+            if totals['rows'] and totals['wall_seconds'] > 0:
+                entry['rows_per_second'] = round(totals['rows'] / totals['wall_seconds'], 1)
+            if name in self.peaks:
+                entry['peak_memory_mb'] = _mb(self.peaks[name])
+            stages.append(entry)
+        report = {
+            'version': REPORT_VERSION, 'command': self.command, 'argv': self.argv, 'mode': self.mode,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_seconds': round(self.wall, 6), 'cpu_seconds': round(self.cpu, 6),
+            'children_cpu_seconds': round(self.children, 6), 'max_rss_mb': _mb(memory.peak_rss()),
+            'peak_memory_mb': _mb(self.peak), 'memory_budget_mb': _mb(memory.budget()) if memory.budget() else None,
+            'stages': stages, 'hotspots': self._hotspots(),
+        }
+        if self.metadata:
+            report['metadata'] = self.metadata
+        if self.samples:
+            report['sample_interval'] = self.sample_interval
+        return report
+
+    def write(self):
+        """Write the report (plus .prof/.folded profile data); returns the report path"""
+        os.makedirs(os.path.dirname(self.output) or '.', exist_ok=True)
+        root = os.path.splitext(self.output)[0]
+        with open(self.output, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        if self._profile is not None:
+            self._profile.dump_stats(root + '.prof')
+        if self.samples:
+            # One line per stack in the folded format flamegraph tools read
+            with open(root + '.folded', 'w', encoding='utf-8') as f:
+                for (label, stack), n in sorted(self.samples.items()):
+                    f.write(';'.join((label,) + stack) + f" {n}\n")
+        return self.output
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        if self.save:
+            path = self.write()
+            print(f"⏱️  Profile report saved to: {path}")
+        else:
+            print_memory(self.report())
+        return False
+
+
+class _NoProfile:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _mb(size):
+    return round(size / (1 << 20), 1)
+
+
+def add_arguments(parser):
+    """Add the shared --profile/--profile-output options to a script's parser"""
+    parser.add_argument("--profile", nargs='?', const='timers', choices=MODES, metavar="MODE",
+                        help="Write a per-stage timing report; MODE adds 'cprofile' or 'sample' "
+                             "function profiles (default: timers)")
+    parser.add_argument("--profile-output",
+                        help=f"Profile report path (default: {DEFAULT_PROFILE_DIR}/<command>_<timestamp>.json)")
+
+
+def session(args, command, argv=None):
+    """
+    Context manager profiling a command run with the parsed add_arguments() options
+
+    Without --profile but under a memory budget it only tracks and prints
+    the peak memory per stage.
+    """
+    if not getattr(args, 'profile', None):
+        return Profiler(command, argv=argv, save=False) if memory.budget() else _NoProfile()
+    return Profiler(command, mode=args.profile, output=args.profile_output, argv=argv)
+
+
+def load_report(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_report(report):
+    print(f"{report['command']} ({report['started_at']}, {report['mode']}): "
+          f"{report['wall_seconds']:.2f}s wall, {report['cpu_seconds']:.2f}s CPU, "
+          f"{report['children_cpu_seconds']:.2f}s in worker processes")
+    print(f"\n{'Stage':<24} {'Calls':>7} {'Wall s':>9} {'CPU s':>9} {'Rows':>11} {'Rows/s':>11} {'Peak MB':>9}")
+    for entry in report['stages']:
+        rows = f"{entry['rows']:,}" if entry['rows'] is not None else '-'
+        rate = f"{entry['rows_per_second']:,.0f}" if 'rows_per_second' in entry else '-'
+        peak = f"{entry['peak_memory_mb']:,.0f}" if 'peak_memory_mb' in entry else '-'
+        print(f"{entry['name']:<24} {entry['calls']:>7} {entry['wall_seconds']:>9.3f} {entry['cpu_seconds']:>9.3f} "
+              f"{rows:>11} {rate:>11} {peak:>9}")
+    if report['hotspots']:
+        print("\nHotspots:")
+        for spot in report['hotspots'][:10]:
+            detail = (f"{spot['self_seconds']:.3f}s self" if 'self_seconds' in spot
+                      else f"{spot['share']:.1%} of samples")
+            print(f"  {spot['function']}: {detail}")
+
+
+def print_memory(report):
+    budget = f" of the {report['memory_budget_mb']:,.0f} MB budget" if report.get('memory_budget_mb') else ""
+    print(f"\nPeak memory {report['peak_memory_mb']:,.0f} MB{budget}; by stage:")
+    for entry in report['stages']:
+        if 'peak_memory_mb' in entry:
+            print(f"  {entry['name']:<24} {entry['peak_memory_mb']:>9,.0f} MB")
+
+
+def compare_reports(old, new):
+    """
+    Per-stage wall time change between two reports
+
+    Returns:
+        List of (stage, old seconds, new seconds, ratio) for stages in either
+        report; seconds are None where a stage is missing
+    """
+    before = {entry['name']: entry['wall_seconds'] for entry in old['stages']}
+    after = {entry['name']: entry['wall_seconds'] for entry in new['stages']}
+    names = list(before) + [name for name in after if name not in before]
+    rows = [('(total)', old['wall_seconds'], new['wall_seconds'])]
+    rows += [(name, before.get(name), after.get(name)) for name in names]
+    return [(name, a, b, b / a if a and b is not None else None) for name, a, b in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or compare profile reports")
+    commands = parser.add_subparsers(dest="action", required=True)
+    show = commands.add_parser("show", help="Print a report")
+    show.add_argument("report")
+    compare = commands.add_parser("compare", help="Per-stage wall time change from OLD to NEW")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    args = parser.parse_args(argv)
+
+    if args.action == "show":
+        print_report(load_report(args.report))
+        return
+    print(f"{'Stage':<24} {'Old s':>9} {'New s':>9} {'Change':>8}")
+    for name, before, after, ratio in compare_reports(load_report(args.old), load_report(args.new)):
+        fmt = lambda seconds: f"{seconds:>9.3f}" if seconds is not None else f"{'-':>9}"
+        change = f"{ratio - 1:>+8.0%}" if ratio is not None else f"{'-':>8}"
+        print(f"{name:<24} {fmt(before)} {fmt(after)} {change}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,713 @@
+#!/usr/bin/env python3
+"""
+Local query service over the influence and sentiment results
+Loads author_influence_profile.csv and youtube_sentiment_results.csv once,
+indexes the comments by author, video, hashtag and date, and answers top-k
+influencer, author profile and sentiment breakdown queries over HTTP from
+an LRU result cache. When new files are published the next snapshot is
+built in the background and swapped in between requests, so the service
+never stops answering; while a pipeline run is still writing its stages
+the swap waits for the run to finish. numpy and pandas are imported by
+the snapshot code, so `serve --help` doesn't load them.
+
+    GET /health
+    GET /top?metric=pagerank&k=10[&hashtag=python][&video=ID][&community=3]
+    GET /authors/<author>
+    GET /sentiment[?author=&video=&hashtag=&since=YYYY-MM-DD&until=YYYY-MM-DD][&by=date|video|hashtag|author]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+# Add current directory to path
+sys.path.append('.')
+
+from comment_dataset import DEFAULT_DATA_DIR
+from pipeline import RUNS_NAME, STATE_DIR_NAME, STATE_NAME
+
+PROFILE_NAME = "author_influence_profile.csv"
+RESULTS_NAME = "youtube_sentiment_results.csv"
+RESULT_COLUMNS = ['author', 'video_id', 'video_title', 'published_at', 'hashtag_query', 'sentiment',
+                  'sentiment_score']
+SENTIMENT_LABELS = ['Positive', 'Neutral', 'Negative']
+GROUP_KEYS = ('date', 'video', 'hashtag', 'author')
+
+QUERY_HOST = os.getenv('QUERY_HOST', '127.0.0.1')
+QUERY_PORT = int(os.getenv('QUERY_PORT', '8780'))
+# Query results kept per snapshot
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '1024'))
+# Seconds between checks for newly published artifacts
+QUERY_POLL_SECONDS = float(os.getenv('QUERY_POLL_SECONDS', '2'))
+# Longest wait for a pipeline run that has stopped updating its state (e.g. a crashed one)
+QUERY_PIPELINE_WAIT = float(os.getenv('QUERY_PIPELINE_WAIT', '600'))
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 1000
+# Groups returned by a grouped sentiment breakdown (largest or latest first), by default and at most
+DEFAULT_GROUPS = 100
+MAX_GROUPS = 1000
+# Videos listed in an author profile
+PROFILE_VIDEOS = 10
+# Recent requests the latency percentiles in /health cover
+LATENCY_WINDOW = 1000
+# Largest request head accepted
+MAX_HEAD_BYTES = 16 * 1024
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+class QueryError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _signature(paths):
+    """(mtime, size) of each file; None for a missing file"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def pipeline_running(state_dir, wait=QUERY_PIPELINE_WAIT):
+    """
+    Whether a pipeline run is part way through
+
+    A run saves its state after every stage and appends to the run log at
+    the end, so a state file newer than the log means a run in progress,
+    unless it has not changed for `wait` seconds.
+    """
+    try:
+        state = os.stat(os.path.join(state_dir, STATE_NAME)).st_mtime
+    except OSError:
+        return False
+    try:
+        runs = os.stat(os.path.join(state_dir, RUNS_NAME)).st_mtime
+    except OSError:
+        runs = 0
+    return state > runs and time.time() - state < wait
+
+
+def _json_value(value):
+    import numpy as np
+
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class LRUCache:
+    def __init__(self, size=QUERY_CACHE_SIZE):
+        """Least recently used mapping of at most size entries (0 disables it)"""
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class Snapshot:
+    def __init__(self, profile, results, signature=None, version=1, cache_size=QUERY_CACHE_SIZE):
+        """
+        Indexed, read-only view of one version of the published artifacts
+
+        Everything a query needs is computed here, off the event loop, so
+        answering a query is a few array lookups.
+
+        Args:
+            profile: Influence profile DataFrame (one row per author)
+            results: Sentiment results DataFrame (one row per comment)
+            signature: File signature the frames were loaded from
+            version: Snapshot number, increased on every swap
+            cache_size: Query results cached for this snapshot
+        """
+        import numpy as np
+        import pandas as pd
+
+        self.signature = signature
+        self.version = version
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        self.cache = LRUCache(cache_size)
+
+        # Authors: one record per profile row, and every numeric column ranked
+        profile = profile.drop_duplicates('author').reset_index(drop=True)
+        self.authors = profile['author'].astype(str).to_numpy()
+        self.author_rows = {author: i for i, author in enumerate(self.authors)}
+        self.records = profile.astype(object).where(profile.notna(), None).to_dict('records')
+        self.metrics = [column for column in profile.columns
+                        if column != 'community' and pd.api.types.is_numeric_dtype(profile[column])
+                        and not pd.api.types.is_bool_dtype(profile[column])]
+        self.order_by = {}
+        self.ranks = {}
+        for metric in self.metrics:
+            values = profile[metric].to_numpy(dtype=float)
+            # Highest first, missing scores last, ties by profile order
+            order = np.lexsort((np.arange(len(values)), -np.nan_to_num(values, nan=-np.inf)))
+            self.order_by[metric] = order
+            ranks = np.empty(len(order), dtype=np.int64)
+            ranks[order] = np.arange(1, len(order) + 1)
+            self.ranks[metric] = ranks
+        self.communities = (profile['community'].to_numpy() if 'community' in profile.columns else None)
+
+        # Comments: each indexed key (author, video, hashtag, date) keeps its
+        # values, the comments ordered by value and then date, and the label,
+        # score and date columns in that order, so one value over a date range
+        # is a contiguous slice; totals per value are precomputed
+        self.comments = len(results)
+        labels = results['sentiment'] if 'sentiment' in results.columns else pd.Series(np.nan, index=results.index)
+        extra = sorted(set(labels.dropna().astype(str)) - set(SENTIMENT_LABELS))
+        self.labels = SENTIMENT_LABELS + extra
+        # Label codes shifted by one: unlabeled comments land in slot 0, which is dropped
+        slots = (pd.Categorical(labels, categories=self.labels).codes + 1).astype(np.int16)
+        scores = pd.to_numeric(results.get('sentiment_score', pd.Series(np.nan, index=results.index)),
+                               errors='coerce').to_numpy(dtype=float)
+        scored = (~np.isnan(scores)).astype(np.int8)
+        scores = np.nan_to_num(scores).astype(np.float32)
+        keys = {
+            'author': results['author'],
+            'video': results.get('video_id'),
+            'hashtag': (results['hashtag_query'].str.lstrip('#').str.lower()
+                        if 'hashtag_query' in results.columns else None),
+            'date': results['published_at'].str[:10] if 'published_at' in results.columns else None,
+        }
+        self.codes, self.values, self.code_of = {}, {}, {}
+        for key, column in keys.items():
+            if column is None:
+                column = pd.Series(np.nan, index=results.index, dtype=object)
+            # Dates are factorized in order, so a date range is a range of codes
+            codes, values = pd.factorize(column.astype(object), sort=key == 'date')
+            self.codes[key] = codes.astype(np.int32)
+            self.values[key] = np.asarray(values, dtype=object)
+            self.code_of[key] = {value: code for code, value in enumerate(values)}
+
+        dates = self.codes['date']
+        self.order, self.bounds, self.sorted, self.stats, self.busiest = {}, {}, {}, {}, {}
+        for key, codes in self.codes.items():
+            order = np.lexsort((dates, codes)).astype(np.int32)
+            self.order[key] = order
+            self.bounds[key] = np.searchsorted(codes[order], np.arange(len(self.values[key]) + 1))
+            self.sorted[key] = (slots[order], scores[order], scored[order], dates[order])
+            self.stats[key] = self._group_stats(codes, slots, scores, scored, len(self.values[key]))
+            self.busiest[key] = (np.arange(len(self.values[key])) if key == 'date' else
+                                 np.argsort(-self.stats[key][0].sum(axis=1), kind='stable'))
+        self.totals = self._totals(slots, scores, scored)
+        # Distinct (video, author), (hashtag, author) and (author, video) pairs with their comment counts,
+        # so commenters and an author's videos are looked up without scanning comments
+        self.pairs = {(key, other): self._pairs(key, other)
+                      for key, other in (('video', 'author'), ('hashtag', 'author'), ('author', 'video'))}
+        # Profile row of each commenting author (-1 = not in the profile)
+        self.profile_rows = np.array([self.author_rows.get(name, -1) for name in self.values['author']],
+                                     dtype=np.int64)
+        titles = (results.drop_duplicates('video_id').set_index('video_id')['video_title']
+                  if {'video_id', 'video_title'} <= set(results.columns) else pd.Series(dtype=object))
+        self.video_titles = titles.where(titles.notna(), None).to_dict()
+
+    @classmethod
+    def load(cls, profile_path, results_path, version=1, cache_size=QUERY_CACHE_SIZE):
+        """Read and index the two artifacts (raises on missing or malformed files)"""
+        import pandas as pd
+
+        signature = _signature([profile_path, results_path])
+        profile = pd.read_csv(profile_path, dtype={'author': str}, encoding='utf-8')
+        results = pd.read_csv(results_path, usecols=lambda column: column in RESULT_COLUMNS,
+                              dtype={'author': str, 'video_id': str, 'video_title': str, 'published_at': str,
+                                     'hashtag_query': str, 'sentiment': str}, encoding='utf-8')
+        missing = [f"{path} has no 'author' column" for path, frame in ((profile_path, profile), (results_path, results))
+                   if 'author' not in frame.columns]
+        if missing:
+            raise ValueError('; '.join(missing))
+        return cls(profile, results, signature=signature, version=version, cache_size=cache_size)
+
+    def _group_stats(self, codes, slots, scores, scored, groups):
+        """
+        Label counts (groups x labels), score sums and scored comments per group code
+
+        Comments without a group (code -1) count in a row that is dropped.
+        """
+        import numpy as np
+
+        width = len(self.labels) + 1
+        shifted = codes.astype(np.int64) + 1
+        counts = np.bincount(shifted * width + slots, minlength=(groups + 1) * width)
+        counts = counts.reshape(groups + 1, width)[1:, 1:]
+        sums = np.bincount(shifted, weights=scores, minlength=groups + 1)[1:]
+        scored = np.bincount(shifted, weights=scored, minlength=groups + 1)[1:].astype(np.int64)
+        return counts, sums, scored
+
+    def _pairs(self, key, other):
+        import numpy as np
+
+        codes, others = self.codes[key].astype(np.int64), self.codes[other].astype(np.int64)
+        keep = (codes >= 0) & (others >= 0)
+        pairs, counts = np.unique(codes[keep] * len(self.values[other]) + others[keep], return_counts=True)
+        return pairs, counts
+
+    def _paired(self, key, code, other):
+        """Codes of the `other` values occurring with one value of key, and their comment counts"""
+        import numpy as np
+
+        pairs, counts = self.pairs[key, other]
+        width = len(self.values[other])
+        start, stop = np.searchsorted(pairs, [code * width, (code + 1) * width])
+        return pairs[start:stop] - code * width, counts[start:stop]
+
+    def _totals(self, slots, scores, scored):
+        """Label counts, score sum and scored comments of a selection"""
+        import numpy as np
+
+        counts = np.bincount(slots, minlength=len(self.labels) + 1)[1:]
+        return counts, float(scores.sum(dtype=np.float64)), int(scored.sum(dtype=np.int64))
+
+    def _summary(self, counts, score_sum, scored):
+        total = int(counts.sum())
+        return {
+            'comments': total,
+            'mean_score': round(float(score_sum / scored), 4) if scored else None,
+            'counts': {label: int(n) for label, n in zip(self.labels, counts)},
+            'shares': {label: round(int(n) / total, 4) if total else 0.0 for label, n in zip(self.labels, counts)},
+        }
+
+    # Queries
+
+    def _metric(self, metric):
+        metric = metric or ('pagerank' if 'pagerank' in self.metrics else (self.metrics or [None])[0])
+        if metric not in self.order_by:
+            raise QueryError(400, f"Unknown metric '{metric}' (choose from {', '.join(self.metrics)})")
+        return metric
+
+    def _select(self, author=None, video=None, hashtag=None, since=None, until=None):
+        """
+        The comments matching every filter, as a slice of one key's ordered columns
+
+        Returns:
+            Tuple (key, start, stop, mask): rows start:stop of self.sorted[key]
+            and self.order[key], with mask (or None) picking the matches
+            within them; key is None without filters and the whole
+            selection is None when a filter value never occurs
+        """
+        import numpy as np
+
+        conditions = []
+        for key, value in (('author', author), ('video', video), ('hashtag', hashtag)):
+            if value is not None:
+                code = self.code_of[key].get(value.lstrip('#').lower() if key == 'hashtag' else value)
+                if code is None:
+                    return None
+                conditions.append((key, code))
+        dated = since is not None or until is not None
+        if not conditions and not dated:
+            return None, 0, self.comments, None
+        if dated:
+            values = self.values['date']
+            first = np.searchsorted(values, since, 'left') if since is not None else 0
+            last = np.searchsorted(values, until, 'right') if until is not None else len(values)
+            last = max(first, last)
+
+        if conditions:
+            # The rarest value's run, narrowed to the date range (runs are ordered by date)
+            key, code = min(conditions, key=lambda c: self.bounds[c[0]][c[1] + 1] - self.bounds[c[0]][c[1]])
+            start, stop = self.bounds[key][code], self.bounds[key][code + 1]
+            if dated:
+                run = self.sorted[key][3][start:stop]
+                start, stop = start + np.searchsorted(run, first), start + np.searchsorted(run, last)
+        else:
+            key, start, stop = 'date', self.bounds['date'][first], self.bounds['date'][last]
+        mask = None
+        for other, code in conditions:
+            if other != key:
+                matches = self.codes[other][self.order[key][start:stop]] == code
+                mask = matches if mask is None else mask & matches
+        return key, start, stop, mask
+
+    def _columns(self, selection, by=None):
+        """Label slots, scores, scored flags and (with by) group codes of a selection"""
+        key, start, stop, mask = selection
+        if key is None:
+            key = 'date'
+        columns = [column[start:stop] for column in self.sorted[key][:3]]
+        if by == 'date':
+            columns.append(self.sorted[key][3][start:stop])
+        elif by == key:
+            columns.append(self.codes[key][self.order[key][start:stop]])
+        elif by is not None:
+            columns.append(self.codes[by][self.order[key][start:stop]])
+        if mask is not None:
+            columns = [column[mask] for column in columns]
+        return columns
+
+    def top(self, metric=None, k=DEFAULT_TOP_K, video=None, hashtag=None, community=None):
+        """Top k authors by a metric, optionally among the commenters of a video or hashtag or one community"""
+        import numpy as np
+
+        metric = self._metric(metric)
+        order = self.order_by[metric]
+        if video is not None or hashtag is not None:
+            commenters = None
+            for key, value in (('video', video), ('hashtag', hashtag)):
+                if value is not None:
+                    code = self.code_of[key].get(value.lstrip('#').lower() if key == 'hashtag' else value, -1)
+                    authors = self._paired(key, code, 'author')[0] if code >= 0 else np.empty(0, dtype=np.int64)
+                    commenters = authors if commenters is None else np.intersect1d(commenters, authors)
+            rows = self.profile_rows[commenters]
+            mask = np.zeros(len(self.authors), dtype=bool)
+            mask[rows[rows >= 0]] = True
+            order = order[mask[order]]
+        if community is not None:
+            if self.communities is None:
+                raise QueryError(400, "The influence profile has no community column")
+            order = order[self.communities[order] == community]
+        authors = []
+        for row in order[:k]:
+            record = self.records[row]
+            authors.append({'rank': int(self.ranks[metric][row]), 'author': record['author'],
+                            metric: _json_value(record[metric]), 'community': _json_value(record.get('community')),
+                            'sentiment': record.get('sentiment')})
+        return {'metric': metric, 'k': k, 'authors': authors}
+
+    def author(self, name):
+        """An author's influence profile, ranks, sentiment breakdown and most commented videos"""
+        import numpy as np
+
+        row = self.author_rows.get(name)
+        code = self.code_of['author'].get(name)
+        if row is None and code is None:
+            raise QueryError(404, f"Unknown author '{name}'")
+        body = {'author': name}
+        if row is not None:
+            body['profile'] = {column: _json_value(value) for column, value in self.records[row].items()}
+            body['ranks'] = {metric: int(self.ranks[metric][row]) for metric in self.metrics}
+        if code is None:
+            body['sentiment'] = self._summary(np.zeros(len(self.labels), dtype=np.int64), 0.0, 0)
+            body['videos'] = []
+            return body
+        counts, sums, scored = self.stats['author']
+        body['sentiment'] = self._summary(counts[code], sums[code], scored[code])
+        videos, per_video = self._paired('author', code, 'video')
+        top = np.lexsort((videos, -per_video))[:PROFILE_VIDEOS]
+        body['videos'] = [{'video_id': self.values['video'][videos[i]],
+                           'title': self.video_titles.get(self.values['video'][videos[i]]),
+                           'comments': int(per_video[i])} for i in top]
+        return body
+
+    def sentiment(self, by=None, limit=DEFAULT_GROUPS, **filters):
+        """Sentiment counts, shares and mean score of the matching comments, optionally per group"""
+        import numpy as np
+
+        if by is not None and by not in GROUP_KEYS:
+            raise QueryError(400, f"Unknown grouping '{by}' (choose from {', '.join(GROUP_KEYS)})")
+        body = {'filters': {key: value for key, value in filters.items() if value is not None}}
+        selection = self._select(**filters)
+        if selection is None:
+            selection = ('date', 0, 0, None)
+        if selection[0] is None:
+            body.update(self._summary(*self.totals))
+        else:
+            body.update(self._summary(*self._totals(*self._columns(selection)[:3])))
+        if by is None:
+            return body
+
+        groups = len(self.values[by])
+        if selection[0] is None:
+            (counts, sums, scored), busiest = self.stats[by], self.busiest[by]
+        else:
+            slots, scores, scored, codes = self._columns(selection, by)
+            counts, sums, scored = self._group_stats(codes, slots, scores, scored, groups)
+            busiest = np.arange(groups) if by == 'date' else np.argsort(-counts.sum(axis=1), kind='stable')
+        totals = counts.sum(axis=1)
+        chosen = busiest[totals[busiest] > 0]
+        chosen = chosen[-limit:] if by == 'date' else chosen[:limit]
+        body['by'] = by
+        body['groups'] = [{
+            by: self.values[by][g], 'comments': int(totals[g]),
+            'mean_score': round(float(sums[g] / scored[g]), 4) if scored[g] else None,
+            'counts': {label: int(n) for label, n in zip(self.labels, counts[g])},
+        } for g in chosen]
+        return body
+
+
+class QueryService:
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, profile_path=None, results_path=None,
+                 cache_size=QUERY_CACHE_SIZE):
+        """
+        Answer queries from the latest loaded Snapshot
+
+        Args:
+            data_dir: Directory the pipeline publishes to
+            profile_path: Influence profile CSV (default: {data_dir}/author_influence_profile.csv)
+            results_path: Sentiment results CSV (default: {data_dir}/youtube_sentiment_results.csv)
+            cache_size: Query results cached per snapshot
+        """
+        self.profile_path = profile_path or os.path.join(data_dir, PROFILE_NAME)
+        self.results_path = results_path or os.path.join(data_dir, RESULTS_NAME)
+        self.cache_size = cache_size
+        self.snapshot = Snapshot.load(self.profile_path, self.results_path, cache_size=cache_size)
+        self.seen = self.snapshot.signature
+        self.rejected = None
+        self.state_dir = os.path.join(os.path.dirname(self.profile_path) or '.', STATE_DIR_NAME)
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.last_error = None
+
+    @property
+    def paths(self):
+        return [self.profile_path, self.results_path]
+
+    async def refresh(self):
+        """
+        Swap in newly published artifacts
+
+        Files are loaded once their signature has been the same for two
+        checks in a row and no pipeline run is part way through, so a file
+        still being written is not read. A failed load keeps the current
+        snapshot.
+
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        signature = _signature(self.paths)
+        previous, self.seen = self.seen, signature
+        if signature in (self.snapshot.signature, self.rejected) or signature != previous or None in signature:
+            return False
+        if pipeline_running(self.state_dir):
+            return False
+        try:
+            snapshot = await asyncio.to_thread(Snapshot.load, self.profile_path, self.results_path,
+                                               self.snapshot.version + 1, self.cache_size)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️  Keeping snapshot {self.snapshot.version}: could not load the new artifacts ({self.last_error})")
+            # Don't retry until the files change again
+            self.rejected = signature
+            return False
+        if snapshot.signature != _signature(self.paths):
+            # Rewritten while loading: the next checks pick up the final version
+            return False
+        self.snapshot = snapshot
+        self.last_error = None
+        print(f"✅ Loaded snapshot {snapshot.version}: {len(snapshot.authors):,} authors, "
+              f"{snapshot.comments:,} comments")
+        return True
+
+    async def watch(self, poll_seconds=QUERY_POLL_SECONDS):
+        while True:
+            await asyncio.sleep(poll_seconds)
+            await self.refresh()
+
+    def health(self, snapshot):
+        latencies = sorted(self.latencies)
+        percentile = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+        return {
+            'status': 'ok', 'version': snapshot.version, 'loaded_at': snapshot.loaded_at,
+            'authors': len(snapshot.authors), 'comments': snapshot.comments, 'metrics': snapshot.metrics,
+            'requests': self.requests, 'cache': {'entries': len(snapshot.cache.entries), 'hits': snapshot.cache.hits,
+                                                 'misses': snapshot.cache.misses},
+            'latency_ms': {'p50': percentile(0.5), 'p99': percentile(0.99)} if latencies else None,
+            'last_error': self.last_error,
+        }
+
+    def query(self, target):
+        """
+        Answer one GET request target such as '/top?k=5'
+
+        Returns:
+            Tuple (status, JSON body bytes, snapshot version)
+        """
+        snapshot = self.snapshot
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        params = dict(parse_qsl(url.query))
+        if path == '/health':
+            return 200, json.dumps(self.health(snapshot)).encode('utf-8'), snapshot.version
+
+        key = (path, tuple(sorted(params.items())))
+        cached = snapshot.cache.get(key)
+        if cached is not None:
+            return 200, cached, snapshot.version
+        try:
+            body = self._answer(snapshot, path, params)
+        except QueryError as e:
+            return e.status, json.dumps({'error': str(e)}).encode('utf-8'), snapshot.version
+        payload = json.dumps(body, default=_json_value).encode('utf-8')
+        snapshot.cache.put(key, payload)
+        return 200, payload, snapshot.version
+
+    def _answer(self, snapshot, path, params):
+        unknown = set(params) - {'metric', 'k', 'video', 'hashtag', 'community', 'author', 'since', 'until', 'by',
+                                 'limit'}
+        if unknown:
+            raise QueryError(400, f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+        if path == '/top':
+            return snapshot.top(params.get('metric'), k=_int(params, 'k', DEFAULT_TOP_K, 1, MAX_TOP_K),
+                                video=params.get('video'), hashtag=params.get('hashtag'),
+                                community=_int(params, 'community', None))
+        if path.startswith('/authors/'):
+            return snapshot.author(unquote(path[len('/authors/'):]))
+        if path == '/sentiment':
+            for key in ('since', 'until'):
+                if key in params and not _is_date(params[key]):
+                    raise QueryError(400, f"{key} must be a date like 2026-01-31")
+            return snapshot.sentiment(by=params.get('by'), limit=_int(params, 'limit', DEFAULT_GROUPS, 1, MAX_GROUPS),
+                                      author=params.get('author'), video=params.get('video'),
+                                      hashtag=params.get('hashtag'), since=params.get('since'),
+                                      until=params.get('until'))
+        raise QueryError(404, f"Unknown endpoint '{path}' (use /top, /authors/<author>, /sentiment or /health)")
+
+    async def handle_client(self, reader, writer):
+        """Serve the requests of one (keep-alive) connection"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 400, json.dumps({'error': 'Request head too large'}).encode(), 0,
+                                        keep_alive=False)
+                    return
+                started = time.perf_counter()
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, protocol = lines[0].split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, json.dumps({'error': 'Malformed request line'}).encode(), 0,
+                                        keep_alive=False)
+                    return
+                headers = {name.strip().lower(): value.strip()
+                           for name, _, value in (line.partition(':') for line in lines[1:] if line)}
+                keep_alive = (headers.get('connection', '').lower() != 'close' and protocol == 'HTTP/1.1') or \
+                    headers.get('connection', '').lower() == 'keep-alive'
+
+                if method not in ('GET', 'HEAD'):
+                    status, payload, version = 405, json.dumps({'error': 'Only GET is supported'}).encode(), \
+                        self.snapshot.version
+                else:
+                    try:
+                        status, payload, version = self.query(target)
+                    except Exception as e:
+                        status, payload, version = 500, json.dumps({'error': str(e)}).encode(), self.snapshot.version
+                self.requests += 1
+                self.latencies.append(time.perf_counter() - started)
+                await self._respond(writer, status, payload, version, keep_alive, send_body=method != 'HEAD')
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, version, keep_alive, send_body=True):
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"X-Snapshot-Version: {version}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + (payload if send_body else b''))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def start(self, host=QUERY_HOST, port=QUERY_PORT):
+        """Start listening; returns the asyncio server (port 0 picks a free port)"""
+        return await asyncio.start_server(self.handle_client, host, port, limit=MAX_HEAD_BYTES)
+
+    async def serve(self, host=QUERY_HOST, port=QUERY_PORT, poll_seconds=QUERY_POLL_SECONDS):
+        server = await self.start(host, port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"✅ Serving {len(self.snapshot.authors):,} authors and {self.snapshot.comments:,} comments "
+              f"on http://{host}:{port}")
+        watcher = asyncio.create_task(self.watch(poll_seconds))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def _int(params, key, default, low=None, high=None):
+    if key not in params:
+        return default
+    try:
+        value = int(params[key])
+    except ValueError:
+        raise QueryError(400, f"{key} must be an integer")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise QueryError(400, f"{key} must be between {low} and {high}")
+    return value
+
+
+def _is_date(value):
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve influence and sentiment queries over HTTP",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --port 8780
+  curl 'http://127.0.0.1:8780/top?metric=pagerank&k=5&hashtag=python'
+  curl 'http://127.0.0.1:8780/authors/some_author'
+  curl 'http://127.0.0.1:8780/sentiment?hashtag=python&since=2026-01-01&by=date'
+        """
+    )
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Directory the pipeline publishes to")
+    parser.add_argument("--profile", help=f"Influence profile CSV (default: <data-dir>/{PROFILE_NAME})")
+    parser.add_argument("--results", help=f"Sentiment results CSV (default: <data-dir>/{RESULTS_NAME})")
+    parser.add_argument("--host", default=QUERY_HOST, help=f"Address to listen on (default: {QUERY_HOST})")
+    parser.add_argument("--port", type=int, default=QUERY_PORT, help=f"Port to listen on (default: {QUERY_PORT})")
+    parser.add_argument("--cache-size", type=int, default=QUERY_CACHE_SIZE,
+                        help=f"Query results cached per snapshot (default: {QUERY_CACHE_SIZE})")
+    parser.add_argument("--poll-seconds", type=float, default=QUERY_POLL_SECONDS,
+                        help=f"Seconds between checks for new artifacts (default: {QUERY_POLL_SECONDS:g})")
+    args = parser.parse_args(argv)
+
+    try:
+        service = QueryService(args.data_dir, profile_path=args.profile, results_path=args.results,
+                               cache_size=args.cache_size)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load the artifacts: {e}")
+        print("Run the pipeline first: python pipeline.py")
+        sys.exit(1)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.poll_seconds))
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Author -> author reply graph
+Resolves each reply's parent_id to the parent comment's author with a hash
+join and aggregates the replies into weighted, sentiment-annotated edges.
+Large inputs are read in chunks and joined partition by partition (a grace
+hash join spilled to disk), so memory is bounded by one partition.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append('.')
+
+import memory
+from engagement_graph import sentiment_labels
+from graph_artifacts import (DEFAULT_CACHE_DIR, DEFAULT_INPUT, artifact_key, file_digest,
+                             prune_artifacts)
+
+REPLY_EDGE_COLUMNS = ['source', 'target', 'weight', 'mean_sentiment', 'positive', 'negative', 'likes', 'sentiment']
+INPUT_COLUMNS = ['comment_id', 'parent_id', 'author', 'sentiment_score', 'sentiment', 'likes']
+DEFAULT_CHUNK_ROWS = 200_000
+# Input bytes per join partition when joining out of core
+PARTITION_BYTES = 256 * 1024 * 1024
+# Smallest partition a memory budget may ask for, bounding the number of spill files
+MIN_PARTITION_BYTES = 32 * 1024 * 1024
+OUTPUT_FILE = "collected_data/reply_edges.csv"
+
+
+def _split(chunk):
+    """Parent side (comment_id -> author) and reply side of one chunk"""
+    # Results collected without reply threading simply have no replies
+    for column in ('comment_id', 'parent_id'):
+        if column not in chunk.columns:
+            chunk = chunk.assign(**{column: pd.Series(np.nan, index=chunk.index, dtype=object)})
+    parents = chunk.loc[chunk['comment_id'].notna() & chunk['author'].notna(), ['comment_id', 'author']]
+    is_reply = chunk['parent_id'].notna() & (chunk['parent_id'] != '') & chunk['author'].notna()
+    replies = pd.DataFrame({
+        'comment_id': chunk.loc[is_reply, 'comment_id'],
+        'parent_id': chunk.loc[is_reply, 'parent_id'],
+        'source': chunk.loc[is_reply, 'author'],
+        'sentiment_score': pd.to_numeric(chunk.loc[is_reply, 'sentiment_score'], errors='coerce')
+                           if 'sentiment_score' in chunk.columns else np.nan,
+        'positive': chunk.loc[is_reply, 'sentiment'].eq('Positive')
+                    if 'sentiment' in chunk.columns else False,
+        'negative': chunk.loc[is_reply, 'sentiment'].eq('Negative')
+                    if 'sentiment' in chunk.columns else False,
+        'likes': pd.to_numeric(chunk.loc[is_reply, 'likes'], errors='coerce').fillna(0)
+                 if 'likes' in chunk.columns else 0,
+    })
+    return parents, replies
+
+
+def _join(parents, replies, stats):
+    """
+    Hash-join replies to their parent's author and aggregate partial edges
+
+    A comment or reply collected twice is counted once, and replies to
+    one's own comment are dropped.
+    """
+    parents = parents.drop_duplicates('comment_id').rename(columns={'comment_id': 'parent_id', 'author': 'target'})
+    replies = replies.drop_duplicates('comment_id')
+    joined = replies.merge(parents, on='parent_id', how='inner')
+    own = joined['source'] == joined['target']
+
+    stats['replies'] += len(replies)
+    stats['unresolved'] += len(replies) - len(joined)
+    stats['self_replies'] += int(own.sum())
+    joined = joined[~own]
+
+    return joined.groupby(['source', 'target'], sort=False).agg(
+        weight=('source', 'size'),
+        score_sum=('sentiment_score', 'sum'),
+        scored=('sentiment_score', 'count'),
+        positive=('positive', 'sum'),
+        negative=('negative', 'sum'),
+        likes=('likes', 'sum'),
+    ).reset_index()
+
+
+def _finish(partials):
+    """Combine partial aggregates into the final edge list"""
+    if not partials:
+        return pd.DataFrame(columns=REPLY_EDGE_COLUMNS)
+    edges = pd.concat(partials, ignore_index=True).groupby(['source', 'target'], sort=False).sum().reset_index()
+    edges['mean_sentiment'] = edges['score_sum'] / edges['scored'].where(edges['scored'] > 0)
+    for column in ('weight', 'positive', 'negative', 'likes'):
+        edges[column] = edges[column].astype(np.int64)
+    edges['sentiment'] = sentiment_labels(edges['mean_sentiment'])
+    return edges[REPLY_EDGE_COLUMNS]
+
+
+def _new_stats():
+    return {'replies': 0, 'unresolved': 0, 'self_replies': 0}
+
+
+def reply_edges(df):
+    """
+    Build reply edges from an in-memory comments frame
+
+    Args:
+        df: Comments with comment_id, parent_id, author and optionally
+            sentiment_score, sentiment and likes
+
+    Returns:
+        Tuple (edges, stats): edges has one row per replier -> parent author
+        pair (weight = replies, mean_sentiment/positive/negative of those
+        replies, likes they got); stats counts replies, unresolved parents
+        and self-replies
+    """
+    stats = _new_stats()
+    parents, replies = _split(df)
+    return _finish([_join(parents, replies, stats)]), stats
+
+
+def _partition_of(keys, partitions):
+    return pd.util.hash_array(keys.to_numpy(dtype=object)) % partitions
+
+
+def reply_edges_from_csv(path, chunk_rows=DEFAULT_CHUNK_ROWS, partitions=None, work_dir=None):
+    """
+    Build reply edges from a comments CSV without loading it whole
+
+    Chunks are split into partitions by the hash of the join key
+    (comment_id on the parent side, parent_id on the reply side) and
+    spilled to disk; each partition is then joined on its own.
+
+    Args:
+        path: Comments or sentiment results CSV
+        chunk_rows: Rows read per chunk
+        partitions: Join partitions (default: one per PARTITION_BYTES of input, or
+            smaller partitions when a memory budget leaves less room)
+        work_dir: Directory for spill files (default: a temporary directory)
+
+    Returns:
+        Tuple (edges, stats), see reply_edges()
+    """
+    if partitions is None:
+        partition_bytes = PARTITION_BYTES
+        if memory.budget():
+            partition_bytes = max(MIN_PARTITION_BYTES, min(partition_bytes, int(
+                memory.headroom() * memory.CHUNK_SHARE / memory.CSV_EXPANSION)))
+        partitions = max(1, -(-os.path.getsize(path) // partition_bytes))
+    reader = memory.read_csv_chunks(path, chunk_rows, usecols=lambda column: column in INPUT_COLUMNS,
+                                    dtype={'comment_id': str, 'parent_id': str, 'author': str}, encoding='utf-8')
+    stats = _new_stats()
+
+    if partitions == 1:
+        sides = [_split(chunk) for chunk in reader]
+        if not sides:
+            return _finish([]), stats
+        parents = pd.concat([p for p, _ in sides], ignore_index=True)
+        replies = pd.concat([r for _, r in sides], ignore_index=True)
+        return _finish([_join(parents, replies, stats)]), stats
+
+    spill_dir = Path(tempfile.mkdtemp(prefix='reply_join_', dir=work_dir))
+    try:
+        files = {(side, p): open(spill_dir / f'{side}_{p}.pkl', 'wb')
+                 for side in ('parents', 'replies') for p in range(partitions)}
+        try:
+            for chunk in reader:
+                parents, replies = _split(chunk)
+                for side, frame, key in (('parents', parents, 'comment_id'), ('replies', replies, 'parent_id')):
+                    owner = _partition_of(frame[key], partitions)
+                    for p in np.unique(owner):
+                        pickle.dump(frame[owner == p], files[(side, p)], protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            for f in files.values():
+                f.close()
+
+        partials = []
+        for p in range(partitions):
+            sides = {}
+            for side in ('parents', 'replies'):
+                frames = []
+                with open(spill_dir / f'{side}_{p}.pkl', 'rb') as f:
+                    while True:
+                        try:
+                            frames.append(pickle.load(f))
+                        except EOFError:
+                            break
+                sides[side] = pd.concat(frames, ignore_index=True) if frames else None
+            if sides['parents'] is not None and sides['replies'] is not None:
+                partials.append(_join(sides['parents'], sides['replies'], stats))
+            elif sides['replies'] is not None:
+                replies = sides['replies'].drop_duplicates('comment_id')
+                stats['replies'] += len(replies)
+                stats['unresolved'] += len(replies)
+        return _finish(partials), stats
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def load_reply_graph(input_path=DEFAULT_INPUT, cache_dir=DEFAULT_CACHE_DIR, chunk_rows=DEFAULT_CHUNK_ROWS,
+                     rebuild=False):
+    """
+    Return reply edges for a results file, cached like the engagement graph
+
+    Returns:
+        Tuple (edges, stats)
+    """
+    digest = file_digest(input_path, cache_dir)
+    key = artifact_key(digest, {'graph': 'replies'})
+    path = Path(cache_dir) / key
+
+    if (path / 'meta.json').exists() and not rebuild:
+        os.utime(path / 'meta.json')
+        with open(path / 'meta.json', 'r', encoding='utf-8') as f:
+            stats = json.load(f)['stats']
+        print(f"✅ Loaded cached reply graph {key[:12]} from {cache_dir}")
+        return pd.read_pickle(path / 'reply_edges.pkl'), stats
+
+    print(f"Building reply graph {key[:12]} from {input_path}...")
+    edges, stats = reply_edges_from_csv(input_path, chunk_rows=chunk_rows)
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    edges.to_pickle(tmp_path / 'reply_edges.pkl')
+    with open(tmp_path / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'input': str(input_path), 'input_digest': digest,
+                   'edges': len(edges), 'stats': stats}, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    prune_artifacts(cache_dir)
+    return edges, stats
+
+
+def print_stats(edges, stats):
+    resolved = stats['replies'] - stats['unresolved']
+    print(f"  Replies: {stats['replies']:,} ({resolved:,} resolved, {stats['unresolved']:,} with parent "
+          f"not collected, {stats['self_replies']:,} self-replies)")
+    print(f"  Reply edges: {len(edges):,} between "
+          f"{len(pd.unique(np.concatenate([edges['source'], edges['target']]))):,} authors")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the author -> author reply graph")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="Comments or sentiment results CSV")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Edge list CSV to write")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows read per chunk")
+    parser.add_argument("--partitions", type=int, default=None,
+                        help="Join partitions spilled to disk (default: one per 256 MB of input)")
+    memory.add_arguments(parser)
+    args = parser.parse_args(argv)
+    memory.apply(args, parser)
+
+    if args.chunk_rows <= 0:
+        parser.error("--chunk-rows must be positive")
+    if args.partitions is not None and args.partitions <= 0:
+        parser.error("--partitions must be positive")
+
+    edges, stats = reply_edges_from_csv(args.input, chunk_rows=args.chunk_rows, partitions=args.partitions)
+    print_stats(edges, stats)
+    edges.to_csv(args.output, index=False, encoding='utf-8')
+    print(f"✅ Reply graph saved to: {args.output}")
+    return edges
+
+
+if __name__ == "__main__":
+    main()
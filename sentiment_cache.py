@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Persistent sentiment score cache
+Scores are keyed by comment_id, a hash of the comment text and the analyzer
+version, so edited comments and analyzer upgrades are rescored automatically.
+"""
+
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = "collected_data/sentiment_cache.sqlite"
+CACHE_NAME = os.path.basename(DEFAULT_CACHE_PATH)
+
+
+def text_hash(text):
+    """Return a signed 64-bit hash of the text (fits SQLite INTEGER)"""
+    digest = hashlib.blake2b(str(text).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class SentimentCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, analyzer_version='vader'):
+        """
+        Open (or create) a score cache
+
+        Args:
+            path: SQLite database file
+            analyzer_version: Identifies the scorer; scores from other versions are ignored
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+
+        # WAL lets concurrent runs read while one of them writes; busy_timeout
+        # makes writers wait for each other instead of failing
+        self.conn = sqlite3.connect(str(self.path), timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=60000")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analyzers (
+                analyzer_id INTEGER PRIMARY KEY,
+                version TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS scores (
+                comment_id TEXT NOT NULL,
+                text_hash INTEGER NOT NULL,
+                analyzer_id INTEGER NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (comment_id, text_hash, analyzer_id)
+            ) WITHOUT ROWID;
+        """)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO analyzers (version) VALUES (?)", (analyzer_version,)
+            )
+        self.analyzer_version = analyzer_version
+        self.analyzer_id = self.conn.execute(
+            "SELECT analyzer_id FROM analyzers WHERE version = ?", (analyzer_version,)
+        ).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _keys(comment_ids, texts):
+        return [
+            ('' if cid is None or cid != cid else str(cid), text_hash(text))
+            for cid, text in zip(comment_ids, texts)
+        ]
+
+    def lookup(self, comment_ids, texts):
+        """
+        Look up cached scores
+
+        Args:
+            comment_ids: Comment IDs, aligned with texts
+            texts: Comment texts
+
+        Returns:
+            List of scores aligned with the input, None where not cached
+        """
+        keys = self._keys(comment_ids, texts)
+        scores = [None] * len(keys)
+
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS lookup_keys "
+            "(pos INTEGER PRIMARY KEY, comment_id TEXT, text_hash INTEGER)"
+        )
+        self.conn.execute("DELETE FROM lookup_keys")
+        self.conn.executemany(
+            "INSERT INTO lookup_keys VALUES (?, ?, ?)",
+            ((pos, cid, h) for pos, (cid, h) in enumerate(keys))
+        )
+        rows = self.conn.execute(
+            "SELECT k.pos, s.score FROM lookup_keys k "
+            "JOIN scores s ON s.comment_id = k.comment_id "
+            "AND s.text_hash = k.text_hash AND s.analyzer_id = ?",
+            (self.analyzer_id,)
+        )
+        for pos, score in rows:
+            scores[pos] = score
+
+        self.conn.execute("DELETE FROM lookup_keys")
+        self.conn.commit()
+        return scores
+
+    def store(self, comment_ids, texts, scores):
+        """Store scores for the given comments"""
+        keys = self._keys(comment_ids, texts)
+        rows = [(cid, h, self.analyzer_id, float(score)) for (cid, h), score in zip(keys, scores)]
+
+        # One transaction per call keeps concurrent writers from interleaving
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def __len__(self):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM scores WHERE analyzer_id = ?", (self.analyzer_id,)
+        ).fetchone()[0]
@@ -1,123 +1,133 @@
 #!/usr/bin/env python3
 """
 Social Media Collector - Main Orchestrator
-Twitter functionality temporarily disabled for YouTube testing
+Runs the registered platform collectors (see collectors.py) concurrently and
+merges their output into the output files as it arrives.
 """
 
 import os
 import sys
 import argparse
-import pandas as pd
+import threading
 from datetime import datetime
 from pathlib import Path
 
 # Import configuration
 from config import config
 
-# Import individual collectors
-try:
-    from youtube_collector import YouTubeCollector
-    # Twitter collector temporarily disabled
-    # from twitter_collector import TwitterCollector
-except ImportError as e:
-    print(f"Error importing collectors: {e}")
-    print("Make sure youtube_collector.py is in the same directory.")
-    sys.exit(1)
+# Collector registry; individual collectors are imported when first used
+from collectors import CollectionStore, RateLimiter, available_platforms, collect_concurrently
+import profiling
 
 
 class SocialMediaOrchestrator:
     def __init__(self):
         """Initialize the orchestrator with settings from config"""
-        self.collectors = {}
+        # One rate limiter per platform, shared by every collect() call
+        self.rate_limiters = {}
         
         # Ensure output directory exists
         config.ensure_output_dir()
         
         print("\n" + "="*60)
         print("INITIALIZING SOCIAL MEDIA COLLECTOR")
-        print("NOTE: Twitter functionality is temporarily disabled")
-        print("Testing YouTube collector first")
+        print(f"Available platforms: {', '.join(available_platforms())}")
         print("="*60)
     
-    def _init_youtube_collector(self, api_key=None):
-        """Initialize YouTube collector"""
-        try:
-            api_key = api_key or config.YOUTUBE_API_KEY
-            self.collectors['youtube'] = YouTubeCollector(api_key=api_key)
-            print("✓ YouTube collector ready")
-            return True
-        except Exception as e:
-            print(f"✗ Failed to initialize YouTube collector: {e}")
-            return False
+    def _platform_options(self, platforms, kwargs):
+        """Split {platform}_{option} keyword arguments by platform"""
+        options = {platform: {} for platform in platforms}
+        for key, value in kwargs.items():
+            owners = [platform for platform in platforms if key.startswith(platform + '_')]
+            if owners and value is not None:
+                platform = max(owners, key=len)
+                options[platform][key[len(platform) + 1:]] = value
+        for platform in platforms:
+            rate = options[platform].pop('rate', None)
+            if rate:
+                self.rate_limiters[platform] = RateLimiter(rate)
+        return options
     
-    def _init_twitter_collector(self, method='auto', bearer_token=None):
-        """Initialize Twitter collector - TEMPORARILY DISABLED"""
-        print("⚠️ Twitter collector is temporarily disabled for testing")
-        print("⚠️ Will be enabled after YouTube testing is complete")
-        return False
-    
-    def collect(self, hashtag, platforms=None, **kwargs):
+    def stream(self, hashtag, platforms=None, **kwargs):
         """
-        Collect data from specified platforms
+        Collect from the specified platforms concurrently
         
         Args:
             hashtag: Hashtag to search for
-            platforms: List of platforms to collect from
-            **kwargs: Additional parameters for collectors
+            platforms: List of registered platforms to collect from
+            **kwargs: Per-platform options named {platform}_{option}, e.g.
+                youtube_api_key or youtube_max_comments; {platform}_rate sets
+                that platform's requests per second
         
-        Returns:
-            Dictionary with platform DataFrames
+        Yields:
+            Tuples (platform, DataFrame batch) in arrival order
         """
         # Use config defaults if not specified
-        platforms = platforms or config.DEFAULT_PLATFORMS
-        
-        # Remove 'twitter' from platforms if included (temporarily disabled)
-        if 'twitter' in platforms:
-            print("\n⚠️  Twitter collection is temporarily disabled")
-            print("⚠️  Testing YouTube first, then will enable Twitter")
-            platforms = [p for p in platforms if p != 'twitter']
-        
+        platforms = list(platforms or config.DEFAULT_PLATFORMS)
         if not platforms:
             print("No platforms available for collection.")
-            return {}
-        
-        results = {}
+            return
         
         print(f"\n{'='*60}")
         print(f"COLLECTING DATA FOR: #{hashtag}")
-        print(f"PLATFORMS: {', '.join(platforms)} (Twitter disabled for now)")
+        print(f"PLATFORMS: {', '.join(platforms)} (concurrently)")
         print('='*60)
         
-        # YouTube collection
-        if 'youtube' in platforms:
-            if 'youtube' not in self.collectors:
-                if not self._init_youtube_collector(kwargs.get('youtube_api_key')):
-                    print("Skipping YouTube collection")
-                    platforms.remove('youtube')
-            
-            if 'youtube' in platforms:
-                print(f"\n📹 COLLECTING FROM YOUTUBE...")
-                try:
-                    youtube_df = self.collectors['youtube'].get_comments_by_hashtag(
-                        hashtag=hashtag,
-                        max_comments=kwargs.get('youtube_max_comments', config.DEFAULT_MAX_RESULTS),
-                        max_videos=kwargs.get('youtube_max_videos', 10),
-                        include_replies=kwargs.get('youtube_include_replies', config.INCLUDE_REPLIES)
-                    )
-                    results['youtube'] = youtube_df
-                    print(f"✅ YouTube: Collected {len(youtube_df)} comments")
-                except Exception as e:
-                    print(f"❌ YouTube collection failed: {e}")
-                    results['youtube'] = pd.DataFrame()
+        options = self._platform_options(platforms, kwargs)
+        stop = threading.Event()
+        for platform, batch in collect_concurrently(hashtag, platforms, options, self.rate_limiters, stop):
+            if isinstance(batch, Exception):
+                print(f"❌ {platform.capitalize()} collection failed: {batch}")
+            elif batch is not None:
+                yield platform, batch
+    
+    def collect(self, hashtag, platforms=None, **kwargs):
+        """
+        Collect data from specified platforms
         
-        # Twitter collection - TEMPORARILY DISABLED
-        if 'twitter' in platforms:
-            print(f"\n🐦 TWITTER COLLECTION TEMPORARILY DISABLED")
-            print("Will be enabled after YouTube testing")
-            results['twitter'] = pd.DataFrame()
+        Args:
+            hashtag: Hashtag to search for
+            platforms: List of platforms to collect from
+            **kwargs: Additional parameters for collectors, see stream()
+        
+        Returns:
+            Dictionary with platform DataFrames
+        """
+        import pandas as pd
+
+        platforms = list(platforms or config.DEFAULT_PLATFORMS)
+        batches = {platform: [] for platform in platforms}
+        for platform, batch in self.stream(hashtag, platforms, **kwargs):
+            batches[platform].append(batch)
         
+        results = {}
+        for platform, frames in batches.items():
+            results[platform] = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            print(f"✅ {platform.capitalize()}: Collected {len(results[platform])} items")
         return results
     
+    def collect_to_store(self, hashtag, store, platforms=None, **kwargs):
+        """
+        Collect concurrently, appending each batch to the store as it arrives
+        
+        Args:
+            hashtag: Hashtag to search for
+            store: CollectionStore receiving the batches
+            platforms: List of platforms to collect from
+            **kwargs: Additional parameters for collectors, see stream()
+        
+        Returns:
+            Dictionary with the number of items written per platform
+        """
+        platforms = list(platforms or config.DEFAULT_PLATFORMS)
+        for platform, batch in self.stream(hashtag, platforms, **kwargs):
+            store.write(platform, batch)
+        
+        counts = {platform: store.rows.get(platform, 0) for platform in platforms}
+        for platform, rows in counts.items():
+            print(f"✅ {platform.capitalize()}: Collected {rows} items")
+        return counts
+    
     def save_results(self, results, hashtag, separate_files=True):
         """
         Save collection results
@@ -149,6 +159,8 @@ class SocialMediaOrchestrator:
                     all_data.append(df)
             
             if all_data:
+                import pandas as pd
+
                 combined_df = pd.concat(all_data, ignore_index=True)
                 filename = os.path.join(config.OUTPUT_DIR, f"social_media_{hashtag}_{timestamp}.csv")
                 combined_df.to_csv(filename, index=False, encoding='utf-8')
@@ -158,18 +170,17 @@ class SocialMediaOrchestrator:
         return saved_files
 
 
-def main():
+def main(argv=None):
     """Main command-line interface"""
     parser = argparse.ArgumentParser(
-        description="Collect social media data (Twitter temporarily disabled)",
+        description="Collect social media data from several platforms concurrently",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
   %(prog)s python
   %(prog)s machinelearning --youtube-max-comments 200
-  
-Note: Twitter collection is temporarily disabled for YouTube testing.
-      Test YouTube first, then Twitter will be enabled.
+  %(prog)s python --youtube-rate 2
+  %(prog)s python --platforms youtube,twitter --twitter-max-results 1000
         """
     )
     
@@ -178,8 +189,8 @@ Note: Twitter collection is temporarily disabled for YouTube testing.
     # Platform selection
     parser.add_argument(
         "--platforms",
-        default="youtube",  # Only youtube by default for now
-        help="Platforms to collect from (default: youtube, twitter is disabled)"
+        default=",".join(config.DEFAULT_PLATFORMS),
+        help=f"Comma-separated platforms to collect from (available: {', '.join(available_platforms())})"
     )
     
     # YouTube parameters
@@ -216,6 +227,50 @@ Note: Twitter collection is temporarily disabled for YouTube testing.
         help="Exclude YouTube comment replies"
     )
     
+    parser.add_argument(
+        "--youtube-rate",
+        type=float,
+        help="YouTube requests per second (default: one per YOUTUBE_REQUEST_DELAY)"
+    )
+    
+    # Twitter parameters
+    parser.add_argument(
+        "--twitter-bearer-token",
+        help="Twitter bearer token (overrides .env)"
+    )
+    
+    parser.add_argument(
+        "--twitter-base-url",
+        help="Twitter API root, e.g. a local fake_twitter_api.py server"
+    )
+    
+    parser.add_argument(
+        "--twitter-max-results",
+        type=int,
+        default=config.DEFAULT_MAX_RESULTS,
+        help=f"Maximum tweets, 0 for all (default: {config.DEFAULT_MAX_RESULTS})"
+    )
+    
+    parser.add_argument(
+        "--twitter-days",
+        type=int,
+        default=7,
+        help="Days of recent tweets to search (max 7)"
+    )
+    
+    parser.add_argument(
+        "--twitter-concurrency",
+        type=int,
+        default=4,
+        help="Twitter requests in flight at once (default: 4)"
+    )
+    
+    parser.add_argument(
+        "--twitter-rate",
+        type=float,
+        help="Client-side cap on Twitter requests per second (rate-limit headers are always followed)"
+    )
+    
     # Output options
     parser.add_argument(
         "--output-dir",
@@ -234,18 +289,21 @@ Note: Twitter collection is temporarily disabled for YouTube testing.
         action="store_true",
         help="Enable verbose output"
     )
+    profiling.add_arguments(parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Parse platforms
-    platforms = [p.strip().lower() for p in args.platforms.split(',')]
-    valid_platforms = ['youtube']  # Only youtube for now
+    platforms = [p.strip().lower() for p in args.platforms.split(',') if p.strip()]
+    valid_platforms = available_platforms()
     
-    # Filter out any 'twitter' mentions
+    unknown = [p for p in platforms if p not in valid_platforms]
+    if unknown:
+        print(f"⚠️  Skipping unknown platforms: {', '.join(unknown)}")
     platforms = [p for p in platforms if p in valid_platforms]
     
     if not platforms:
-        print("ERROR: No valid platforms specified. Use: youtube")
+        print(f"ERROR: No valid platforms specified. Use: {', '.join(valid_platforms)}")
         sys.exit(1)
     
     # Show configuration
@@ -257,45 +315,59 @@ Note: Twitter collection is temporarily disabled for YouTube testing.
         print("ERROR: YouTube API key is required for YouTube collection.")
         print("Set YOUTUBE_API_KEY in .env file or use --youtube-api-key")
         sys.exit(1)
+    if 'twitter' in platforms and not (args.twitter_bearer_token or config.TWITTER_BEARER_TOKEN):
+        print("ERROR: A bearer token is required for Twitter collection.")
+        print("Set TWITTER_BEARER_TOKEN in .env file or use --twitter-bearer-token")
+        sys.exit(1)
     
     try:
-        # Initialize orchestrator
-        orchestrator = SocialMediaOrchestrator()
+        with profiling.session(args, 'social_collector', argv):
+            # Initialize orchestrator
+            orchestrator = SocialMediaOrchestrator()
         
-        # Collect data
-        results = orchestrator.collect(
-            hashtag=args.hashtag,
-            platforms=platforms,
-            youtube_api_key=args.youtube_api_key,
-            youtube_max_comments=args.youtube_max_comments,
-            youtube_max_videos=args.youtube_max_videos,
-            youtube_include_replies=args.youtube_include_replies,
-        )
+            # Collect data, appending each platform's batches to its file as they arrive
+            store = CollectionStore(
+                output_dir=args.output_dir,
+                hashtag=args.hashtag,
+                timestamp=datetime.now().strftime("%Y%m%d_%H%M%S"),
+                combined=args.combined
+            )
+            try:
+                counts = orchestrator.collect_to_store(
+                    hashtag=args.hashtag,
+                    store=store,
+                    platforms=platforms,
+                    youtube_api_key=args.youtube_api_key,
+                    youtube_max_comments=args.youtube_max_comments,
+                    youtube_max_videos=args.youtube_max_videos,
+                    youtube_include_replies=args.youtube_include_replies,
+                    youtube_rate=args.youtube_rate,
+                    twitter_bearer_token=args.twitter_bearer_token,
+                    twitter_base_url=args.twitter_base_url,
+                    twitter_max_results=args.twitter_max_results,
+                    twitter_days=args.twitter_days,
+                    twitter_concurrency=args.twitter_concurrency,
+                    twitter_rate=args.twitter_rate,
+                )
+            finally:
+                saved_files = store.close()
         
-        # Save results
-        saved_files = orchestrator.save_results(
-            results=results,
-            hashtag=args.hashtag,
-            separate_files=not args.combined
-        )
-        
-        if saved_files:
-            print(f"\n{'='*60}")
-            print("✅ YOUTUBE COLLECTION COMPLETE!")
-            print("Twitter testing will follow after YouTube verification")
-            print(f"Saved {len(saved_files)} file(s):")
-            for file in saved_files:
-                print(f"  📄 {os.path.basename(file)}")
+            if saved_files:
+                print(f"\n{'='*60}")
+                print("✅ COLLECTION COMPLETE!")
+                print(f"Saved {len(saved_files)} file(s):")
+                for file in saved_files:
+                    print(f"  📄 {os.path.basename(file)}")
             
-            # Summary
-            total_items = sum(len(df) for df in results.values() if df is not None)
-            print(f"\n📊 Total items collected: {total_items:,}")
-            for platform, df in results.items():
-                if df is not None and not df.empty:
-                    print(f"  • {platform.capitalize()}: {len(df):,} items")
-            print('='*60)
-        else:
-            print("\n❌ No data was collected.")
+                # Summary
+                total_items = sum(counts.values())
+                print(f"\n📊 Total items collected: {total_items:,}")
+                for platform, rows in counts.items():
+                    if rows:
+                        print(f"  • {platform.capitalize()}: {rows:,} items")
+                print('='*60)
+            else:
+                print("\n❌ No data was collected.")
             
     except KeyboardInterrupt:
         print("\n\n⚠️ Collection interrupted by user.")
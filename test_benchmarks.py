@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# test_benchmarks.py
+"""
+Tests for the synthetic-data pipeline benchmark
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append('.')
+
+import bench_pipeline
+from youtube_collector import YouTubeCollector
+
+
+def _collect(rows, seed=3):
+    collector = YouTubeCollector(api_key='test')
+    collector.youtube = bench_pipeline.SyntheticYouTube(bench_pipeline.SyntheticComments(rows, seed=seed))
+    collector.rate_limiter = None
+    return collector.get_comments_by_hashtag('bench', max_comments=rows, max_videos=50, include_replies=True)
+
+
+def test_synthetic_comments_have_realistic_shape():
+    df = _collect(5000)
+    assert len(df) == 5000 and df['comment_id'].is_unique
+    assert df['video_id'].nunique() == bench_pipeline.VIDEOS
+
+    # Heavy-tailed authors and videos
+    per_author = df['author'].value_counts()
+    assert per_author.iloc[:len(per_author) // 100 + 1].sum() > 0.1 * len(df)
+    per_video = df['video_id'].value_counts()
+    assert per_video.iloc[0] > 5 * per_video.iloc[-1]
+
+    # Replies point at threads of the same video, some answer earlier replies
+    replies = df[df['is_reply']]
+    assert 0.2 < len(replies) / len(df) < 0.6
+    threads = df.set_index('comment_id')['video_id']
+    assert (threads.loc[replies['parent_id']].to_numpy() == replies['video_id'].to_numpy()).all()
+    assert replies['text'].str.startswith('@').any()
+
+    words = df['text'].str.split().str.len()
+    assert words.median() < 15 and words.max() > 50
+    assert df['text'].str.contains('🔥|😂|👍', regex=True).mean() > 0.02
+    assert df['author'].str.startswith('spam_account_').any()
+
+    # Same seed, same data
+    again = _collect(5000)
+    assert again['text'].tolist() == df['text'].tolist()
+
+
+def test_baseline_comparison_fails_on_regression():
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_path = os.path.join(tmp, 'baseline.json')
+        argv = ['--rows', '2000', '--baseline', baseline_path, '--report', os.path.join(tmp, 'run.json')]
+        # Nothing to compare with is a failure unless asked for
+        assert bench_pipeline.main(argv) == 1
+        assert bench_pipeline.main(argv + ['--no-baseline']) == 0
+        assert bench_pipeline.main(argv + ['--save-baseline']) == 0
+        with open(baseline_path) as f:
+            baselines = json.load(f)
+        key = bench_pipeline.baseline_key(2000, 42, 'vectorized', 1)
+        report = baselines[key]
+        stages = {entry['name']: entry for entry in report['stages']}
+        assert {'collect', 'build_rows', 'store_write', 'sentiment', 'graph_build', 'centralities',
+                'summary'} <= set(stages)
+        assert report['metadata']['counts']['collect'] == 2000
+        assert stages['build_rows']['rows'] == 2000
+
+        # Pretend the baseline was much faster: every real stage now regresses
+        for entry in report['stages']:
+            entry['wall_seconds'] /= 10
+        report['stages'].append({'name': 'removed_stage', 'wall_seconds': 1.0})
+        with open(baseline_path, 'w') as f:
+            json.dump(baselines, f)
+        with open(os.path.join(tmp, 'run.json')) as f:
+            regressions = bench_pipeline.find_regressions(report, json.load(f), min_seconds=0)
+        assert 'collect' in [name for name, *_ in regressions]
+        assert 'removed_stage' not in [name for name, *_ in regressions]
+        assert bench_pipeline.main(argv) == 1
+
+        # A host ten times slower at everything, the calibration loop included, is no regression
+        slow_host = json.loads(json.dumps(report))
+        slow_host['wall_seconds'] *= 10
+        for entry in slow_host['stages']:
+            entry['wall_seconds'] *= 10
+        assert bench_pipeline.find_regressions(report, slow_host, min_seconds=0) != []
+        slow_host['metadata']['calibration_seconds'] *= 10
+        assert abs(bench_pipeline.host_scale(report, slow_host) - 10) < 1e-9
+        assert bench_pipeline.find_regressions(report, slow_host, min_seconds=0) == []
+
+    # The 10k preset has a committed baseline
+    with open(bench_pipeline.BASELINE_FILE) as f:
+        assert bench_pipeline.baseline_key(bench_pipeline.SIZES['10k'], 42, 'vectorized', 1) in json.load(f)
+
+
+if __name__ == "__main__":
+    test_synthetic_comments_have_realistic_shape()
+    test_baseline_comparison_fails_on_regression()
+    print("✅ Benchmark tests passed")
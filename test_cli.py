@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# test_cli.py
+"""
+Tests for the dispatching CLI and its import-time budget
+(the tight wall-clock startup check only runs with TIMING_TESTS=true)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add current directory to path
+sys.path.append('.')
+
+import pandas as pd
+import pytest
+
+import cli
+import config
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TIMING_TESTS = os.getenv('TIMING_TESTS', 'false').lower() == 'true'
+# Seconds `cli.py --help` may take beyond a bare interpreter start
+STARTUP_BUDGET = 0.5
+# The always-on check also allows this many more bare starts, so a loaded machine passes
+STARTUP_SLACK_FACTOR = 10
+# Modules that the collector and CLI entry points must not import until a command needs them
+HEAVY_MODULES = ['pandas', 'numpy', 'scipy', 'networkx', 'matplotlib', 'seaborn', 'googleapiclient.discovery',
+                 'vaderSentiment', 'dotenv']
+LIGHT_MODULES = ['cli', 'config', 'collectors', 'youtube_collector', 'twitter_collector', 'social_collector',
+                 'youtube_watchlist']
+# Modules no command may import before its arguments are parsed
+ANALYSIS_MODULES = ['pandas', 'numpy', 'scipy', 'networkx', 'matplotlib', 'seaborn']
+
+
+def _python(code, cwd=ROOT):
+    # Settings an earlier test loaded from .env must not leak into the child
+    env = {name: value for name, value in os.environ.items() if name not in config.SETTINGS}
+    env['PYTHONPATH'] = ROOT
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env, capture_output=True, text=True,
+                            check=True)
+    return result.stdout
+
+
+def _best_of(args, runs=3):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_entry_points_import_no_heavy_modules():
+    loaded = json.loads(_python(
+        f"import sys, json\n"
+        f"import {', '.join(LIGHT_MODULES)}\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    ))
+    assert loaded == []
+
+
+def test_command_help_imports_no_analysis_modules():
+    for command in cli.COMMANDS:
+        out = _python(
+            f"import sys, json, cli\n"
+            f"try:\n"
+            f"    cli.main([{command!r}, '--help'])\n"
+            f"except SystemExit:\n"
+            f"    pass\n"
+            f"print(json.dumps([name for name in {ANALYSIS_MODULES!r} if name in sys.modules]))"
+        )
+        assert 'usage:' in out, command
+        assert json.loads(out.strip().split('\n')[-1]) == [], command
+
+
+def _startup_times():
+    """Best-of wall times of a bare interpreter and of `cli.py [command] --help`"""
+    bare = _best_of([sys.executable, '-c', 'pass'])
+    times = {'cli': _best_of([sys.executable, 'cli.py', '--help'])}
+    for command in cli.COMMANDS:
+        times[command] = _best_of([sys.executable, 'cli.py', command, '--help'])
+    return bare, times
+
+
+def test_help_starts_within_generous_budget():
+    # Scaled by the bare start, so it still catches an analysis stack imported up front
+    bare, times = _startup_times()
+    for command, seconds in times.items():
+        assert seconds - bare < STARTUP_BUDGET + STARTUP_SLACK_FACTOR * bare, command
+
+
+@pytest.mark.skipif(not TIMING_TESTS, reason="wall-clock budget depends on the machine's load; set TIMING_TESTS=true")
+def test_help_starts_within_budget():
+    bare, times = _startup_times()
+    for command, seconds in times.items():
+        assert seconds - bare < STARTUP_BUDGET, command
+
+
+def test_config_reads_env_file_on_first_use():
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, '.env'), 'w') as f:
+            f.write("YOUTUBE_DAILY_QUOTA=1234\nINCLUDE_REPLIES=false\n")
+        out = _python(
+            "import sys, config\n"
+            "print('dotenv' in sys.modules)\n"
+            "print(config.config.YOUTUBE_DAILY_QUOTA, config.Config.INCLUDE_REPLIES, 'dotenv' in sys.modules)",
+            cwd=tmp,
+        )
+    assert out.split('\n')[:2] == ['False', '1234 False True']
+
+
+def test_dispatches_to_command():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'youtube_x_20260101_000000.csv')
+        pd.DataFrame({'platform': 'YouTube', 'author': ['a', 'b', 'a'], 'video_title': 'v',
+                      'likes': [1, 2, 3]}).to_csv(path, index=False)
+        summaries = cli.main(['summary', path])
+    assert summaries[0]['total_items'] == 3 and summaries[0]['unique_authors'] == 2
+    assert set(cli.COMMANDS) >= {'collect', 'sentiment', 'network', 'influence', 'summary'}
+    for command in cli.COMMANDS:
+        assert callable(cli.resolve(command))
+
+
+if __name__ == "__main__":
+    test_entry_points_import_no_heavy_modules()
+    test_command_help_imports_no_analysis_modules()
+    test_help_starts_within_generous_budget()
+    if TIMING_TESTS:
+        test_help_starts_within_budget()
+    test_config_reads_env_file_on_first_use()
+    test_dispatches_to_command()
+    print("✅ CLI tests passed")
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# test_collectors.py
+"""
+Offline tests for the collector registry and concurrent orchestration
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+# Add current directory to path
+sys.path.append('.')
+
+import httplib2
+import pandas as pd
+from googleapiclient.errors import HttpError
+
+import collectors
+import twitter_collector
+from collectors import CollectionStore, RateLimiter, collect_concurrently, register_collector
+from fake_twitter_api import FakeTwitterAPI
+from social_collector import SocialMediaOrchestrator
+from twitter_collector import TWEET_COLUMNS, TwitterAPIError, TwitterCollector
+from utils import generate_summary
+from youtube_collector import YouTubeCollector
+from youtube_watchlist import MAX_INTERVAL, MAX_PAGES_PER_POLL, REPLY_RECHECK, WatchlistDaemon
+
+PAGE_SECONDS = 0.2
+
+
+class SlowCollector:
+    """Stand-in platform that takes PAGE_SECONDS per page"""
+
+    def __init__(self, api_key=None, rate_limiter=None):
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+
+    def stream(self, hashtag, pages=3, prefix='x', barrier=None):
+        for page in range(pages):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            time.sleep(PAGE_SECONDS)
+            # Platforms sharing a barrier only get past each page together
+            if barrier is not None:
+                barrier.wait(timeout=5)
+            yield pd.DataFrame({'id': [f'{prefix}{page}a', f'{prefix}{page}b'], 'key': self.api_key,
+                                'hashtag': hashtag})
+
+
+class FakeClock:
+    def __init__(self, now=1_800_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeRequest:
+    def __init__(self, body):
+        self.body = body
+
+    def execute(self):
+        return self.body
+
+
+class FakeYouTube:
+    """YouTube Data API resources over simulated time; video v gets rates[v] comments/hour"""
+
+    def __init__(self, clock, rates, backlog=30, reply_rates=None):
+        self.clock = clock
+        self.start = clock()
+        self.rates = rates
+        self.backlog = backlog
+        # Thread ID -> replies/hour
+        self.reply_rates = reply_rates or {}
+        # Page offset whose request fails (a 500 from the API)
+        self.fail_at = None
+        self.calls = Counter()
+
+    def _iso(self, epoch):
+        return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def _posted(self, video_id):
+        return self.backlog + int((self.clock() - self.start) * self.rates[video_id] / 3600)
+
+    def _replies(self, thread_id):
+        return int((self.clock() - self.start) * self.reply_rates.get(thread_id, 0) / 3600)
+
+    def _published(self, video_id, k):
+        if k < self.backlog:
+            return self.start - (self.backlog - k) * 60
+        return self.start + (k - self.backlog + 1) * 3600 / self.rates[video_id]
+
+    def search(self):
+        return self
+
+    def videos(self):
+        return self
+
+    def commentThreads(self):
+        return self
+
+    def list(self, part, **params):
+        if 'q' in params:
+            self.calls['search'] += 1
+            return FakeRequest({'items': [{'id': {'videoId': video_id}} for video_id in self.rates]})
+        if 'id' in params:
+            self.calls['videos'] += 1
+            return FakeRequest({'items': [{
+                'id': video_id,
+                'snippet': {'title': video_id, 'description': '', 'channelTitle': 'c',
+                            'publishedAt': self._iso(self.start - 3600)},
+                'statistics': {'viewCount': '10', 'likeCount': '1', 'commentCount': str(
+                    self._posted(video_id) + sum(self._replies(thread_id) for thread_id in self.reply_rates
+                                                 if thread_id.startswith(f'{video_id}-')))},
+            } for video_id in params['id'].split(',')]})
+
+        self.calls['comments'] += 1
+        video_id = params['videoId']
+        offset = int(params.get('pageToken') or 0)
+        if offset == self.fail_at:
+            raise HttpError(httplib2.Response({'status': 500}), b'backend error')
+        newest_first = range(self._posted(video_id) - 1, -1, -1)[offset:offset + params['maxResults']]
+        body = {'items': [{'id': f'{video_id}-{k}', 'snippet': {'topLevelComment': {'snippet': {
+            'authorDisplayName': f'user{k % 7}', 'textDisplay': f'comment {k}', 'likeCount': 0,
+            'publishedAt': self._iso(self._published(video_id, k)),
+        }}, 'totalReplyCount': self._replies(f'{video_id}-{k}')}} for k in newest_first]}
+        if offset + params['maxResults'] < self._posted(video_id):
+            body['nextPageToken'] = str(offset + params['maxResults'])
+        return FakeRequest(body)
+
+
+class BrokenCollector:
+    def stream(self, hashtag):
+        yield pd.DataFrame({'id': ['only']})
+        raise RuntimeError('quota exceeded')
+
+
+def test_platforms_run_concurrently_and_merge():
+    """Two platforms stream at the same time, and their batches interleave"""
+    register_collector('slow_a', SlowCollector)
+    register_collector('slow_b', SlowCollector)
+    # Run one after the other, the first platform would time out waiting for the second
+    barrier = threading.Barrier(2)
+    try:
+        arrivals = list(collect_concurrently(
+            'python', ['slow_a', 'slow_b'],
+            options={'slow_a': {'api_key': 'k1', 'prefix': 'a', 'barrier': barrier},
+                     'slow_b': {'api_key': 'k2', 'prefix': 'b', 'barrier': barrier}},
+        ))
+    finally:
+        collectors.COLLECTORS.pop('slow_a')
+        collectors.COLLECTORS.pop('slow_b')
+
+    assert not [item for _, item in arrivals if isinstance(item, Exception)]
+    batches = [(platform, batch) for platform, batch in arrivals if batch is not None]
+    assert len(batches) == 6
+    # Page k of either platform arrives before page k + 1 of the other
+    assert [int(batch['id'].iloc[0][1]) for _, batch in batches] == [0, 0, 1, 1, 2, 2]
+    # Constructor options reach the constructor, the rest reach stream()
+    assert {batch['key'].iloc[0] for platform, batch in batches if platform == 'slow_a'} == {'k1'}
+    assert {batch['id'].iloc[0][0] for platform, batch in batches if platform == 'slow_b'} == {'b'}
+    first_done = next(i for i, (_, batch) in enumerate(arrivals) if batch is None)
+    assert {platform for platform, _ in arrivals[:first_done]} == {'slow_a', 'slow_b'}
+
+
+def test_failed_platform_does_not_stop_others():
+    register_collector('slow_a', SlowCollector)
+    register_collector('broken', BrokenCollector)
+    try:
+        arrivals = list(collect_concurrently('python', ['slow_a', 'broken'], options={'slow_a': {'pages': 2}}))
+    finally:
+        collectors.COLLECTORS.pop('slow_a')
+        collectors.COLLECTORS.pop('broken')
+
+    errors = [item for platform, item in arrivals if isinstance(item, Exception)]
+    assert len(errors) == 1 and 'quota' in str(errors[0])
+    rows = sum(len(item) for platform, item in arrivals if isinstance(item, pd.DataFrame))
+    assert rows == 2 * 2 + 1
+
+
+def test_rate_limiter_paces_requests():
+    limiter = RateLimiter(rate=20, burst=2)
+    start = time.perf_counter()
+    for _ in range(6):
+        limiter.acquire()
+    # Two requests from the burst, then one every 1/20 s
+    assert time.perf_counter() - start >= 4 / 20 * 0.9
+
+    limiter.pause(0.1)
+    start = time.perf_counter()
+    limiter.acquire()
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_orchestrator_streams_into_store():
+    """Batches are appended per platform as they arrive; --combined merges the parts"""
+    register_collector('slow_a', SlowCollector)
+    register_collector('slow_b', SlowCollector)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            orchestrator = SocialMediaOrchestrator()
+            store = CollectionStore(tmp, 'python', '20260101_000000')
+            counts = orchestrator.collect_to_store('python', store, platforms=['slow_a', 'slow_b'],
+                                                   slow_a_pages=2, slow_b_pages=1, slow_b_rate=50)
+            assert counts == {'slow_a': 4, 'slow_b': 2}
+            assert isinstance(orchestrator.rate_limiters['slow_b'], RateLimiter)
+            files = store.close()
+            assert sorted(os.path.basename(f) for f in files) == [
+                'slow_a_python_20260101_000000.csv', 'slow_b_python_20260101_000000.csv']
+            assert len(pd.read_csv(files[0])) + len(pd.read_csv(files[1])) == 6
+
+            combined = CollectionStore(tmp, 'rust', '20260101_000000', combined=True)
+            orchestrator.collect_to_store('rust', combined, platforms=['slow_a', 'slow_b'])
+            files = combined.close()
+            assert [os.path.basename(f) for f in files] == ['social_media_rust_20260101_000000.csv']
+            assert len(pd.read_csv(files[0])) == 12
+            assert not any(name.endswith('rust_20260101_000000.csv') and name.startswith('slow')
+                           for name in os.listdir(tmp))
+
+            results = orchestrator.collect('python', platforms=['slow_a'], slow_a_pages=1)
+            assert len(results['slow_a']) == 2
+    finally:
+        collectors.COLLECTORS.pop('slow_a')
+        collectors.COLLECTORS.pop('slow_b')
+
+
+def test_twitter_pages_concurrently_against_fake_api():
+    """Every tweet is collected once, in the generate_summary schema, with bounded concurrency"""
+    with FakeTwitterAPI(tweets=3000, latency=0.05) as api:
+        collector = TwitterCollector(bearer_token=api.token, base_url=api.url)
+        df = collector.get_tweets_by_hashtag('python', concurrency=4)
+
+        assert list(df.columns) == TWEET_COLUMNS
+        assert len(df) == 3000 and df['tweet_id'].is_unique
+        assert 1 < api.max_in_flight <= 4
+        assert all(query['query'] == '#python' for query in api.queries)
+        summary = generate_summary(df, 'twitter')
+        assert summary['total_items'] == 3000 and summary['unique_authors'] > 1
+        assert summary['avg_retweets'] >= 0
+        assert (df['parent_id'] != '').any()
+
+        serial_collector = TwitterCollector(bearer_token=api.token, base_url=api.url)
+        api.max_in_flight = 0
+        serial = serial_collector.get_tweets_by_hashtag('python', concurrency=1, slices=1)
+        assert len(serial) == 3000
+        assert api.max_in_flight == 1
+
+        capped = TwitterCollector(bearer_token=api.token, base_url=api.url)
+        assert len(capped.get_tweets_by_hashtag('python', max_results=250)) == 250
+
+
+def test_twitter_stream_buffers_a_bounded_number_of_pages():
+    """A slow consumer pauses paging; stopping early lets the background thread finish"""
+    original = twitter_collector.QUEUE_PAGES
+    twitter_collector.QUEUE_PAGES = 2
+    try:
+        with FakeTwitterAPI(tweets=5000) as api:
+            collector = TwitterCollector(bearer_token=api.token, base_url=api.url)
+            stream = collector.stream('python', concurrency=2, slices=2)
+            with contextlib.redirect_stdout(io.StringIO()):
+                next(stream)
+            time.sleep(0.3)
+            # Two queued pages each side of the event loop, plus the pages in hand and in flight
+            assert api.requests <= 8
+            producer = next(thread for thread in threading.enumerate() if thread.name == 'twitter-pages')
+            stream.close()
+            producer.join(timeout=5)
+            assert not producer.is_alive()
+    finally:
+        twitter_collector.QUEUE_PAGES = original
+
+
+def test_twitter_waits_for_rate_limit_reset():
+    """Requests past the x-rate-limit budget wait for the reset instead of failing"""
+    with FakeTwitterAPI(tweets=1000, rate_limit=6, window=1) as api:
+        collector = TwitterCollector(bearer_token=api.token, base_url=api.url)
+        df = collector.get_tweets_by_hashtag('python', concurrency=2, slices=2)
+        assert len(df) == 1000 and df['tweet_id'].is_unique
+        assert collector.rate_limit_waits >= 1
+
+    with FakeTwitterAPI(tweets=10) as api:
+        collector = TwitterCollector(bearer_token='wrong', base_url=api.url)
+        error = None
+        try:
+            collector.get_tweets_by_hashtag('python')
+        except TwitterAPIError as e:
+            error = e
+        assert error is not None and error.status == 401
+
+
+def test_orchestrator_routes_twitter_options():
+    register_collector('slow_a', SlowCollector)
+    try:
+        with FakeTwitterAPI(tweets=500) as api:
+            results = SocialMediaOrchestrator().collect(
+                'python', platforms=['twitter', 'slow_a'], slow_a_pages=1,
+                twitter_bearer_token=api.token, twitter_base_url=api.url, twitter_max_results=120,
+            )
+        assert len(results['twitter']) == 120 and len(results['slow_a']) == 2
+    finally:
+        collectors.COLLECTORS.pop('slow_a')
+
+
+def _watchlist_collector(clock, rates, **kwargs):
+    collector = YouTubeCollector(api_key='test')
+    collector.youtube = FakeYouTube(clock, rates, **kwargs)
+    collector.rate_limiter = None
+    return collector
+
+
+def test_watchlist_polls_by_comment_velocity():
+    """Hot videos are polled more often than quiet ones, every comment lands once, quota is respected"""
+    clock = FakeClock()
+    rates = {'hot': 600, 'warm': 20, 'dead': 0.001}
+    with tempfile.TemporaryDirectory() as tmp:
+        state = os.path.join(tmp, 'watchlist.json')
+        collector = _watchlist_collector(clock, rates)
+        daemon = WatchlistDaemon(collector, output_dir=tmp, state_path=state, quota_per_day=20000,
+                                 include_replies=False, clock=clock, sleep=clock.sleep)
+        daemon.add_hashtag('python')
+        start = clock()
+        files = daemon.run(cycles=200, verbose=False)
+        elapsed = clock() - start
+
+        assert [os.path.basename(path) for path in files] == [
+            f"youtube_python_{datetime.fromtimestamp(start).strftime('%Y%m%d_%H%M%S')}.csv"]
+        df = pd.read_csv(files[0])
+        assert df['comment_id'].is_unique
+        assert (df['hashtag_query'] == '#python').all()
+        polls = {video_id: video['polls'] for video_id, video in daemon.videos.items()}
+        assert polls['hot'] > 3 * polls['warm'] > 0
+        assert daemon.videos['dead']['interval'] == MAX_INTERVAL
+        for video_id, video in daemon.videos.items():
+            # Everything up to the last completed poll, and nothing twice
+            assert (df['video_id'] == video_id).sum() == video['fetched_count'] == video['collected']
+        assert daemon.units_spent <= daemon.budget.burst + elapsed * daemon.budget.rate
+        assert collector.youtube.calls['search'] == 1 + int(elapsed // 3600)
+
+        # A restart resumes the schedule and the watermarks
+        clock.sleep(600)
+        resumed = WatchlistDaemon(collector, output_dir=tmp, state_path=state,
+                                  include_replies=False, clock=clock, sleep=clock.sleep)
+        hot_before = resumed.videos['hot']['collected']
+        resumed.step()
+        resumed.close()
+        new_files = [name for name in os.listdir(tmp) if name != os.path.basename(files[0]) and name.endswith('.csv')]
+        new_rows = pd.read_csv(os.path.join(tmp, new_files[0]))
+        assert resumed.videos['hot']['collected'] - hot_before == (new_rows['video_id'] == 'hot').sum() > 0
+        assert not set(new_rows['comment_id']) & set(df['comment_id'])
+
+
+def test_watchlist_spends_scarce_quota_on_new_videos_first():
+    clock = FakeClock()
+    collector = _watchlist_collector(clock, {'old': 600, 'new': 5})
+    daemon = WatchlistDaemon(collector, state_path=False, quota_per_day=200, include_replies=False,
+                             clock=clock, sleep=clock.sleep)
+    daemon.add_video('old')
+    with tempfile.TemporaryDirectory() as tmp:
+        daemon.output_dir = tmp
+        daemon.step()
+        clock.sleep(7200)
+        daemon.add_video('new')
+        daemon.budget.tokens, daemon.budget.updated = 3, clock()
+        daemon.step()
+        # One unit for the batched stats check, one for the new video's only
+        # page and one for the first page of the busy video, which resumes next cycle
+        assert daemon.videos['new']['polls'] == 1 and daemon.videos['new']['collected'] == 40
+        assert daemon.videos['old']['collected'] == 30 + 100
+        assert daemon.videos['old']['next_poll'] == clock()
+        daemon.close()
+
+
+def test_watchlist_resumes_capped_and_failed_polls():
+    """The watermark only advances once a poll reaches it; capped and failed polls resume"""
+    clock = FakeClock()
+    collector = _watchlist_collector(clock, {'big': 0.001}, backlog=2500)
+    daemon = WatchlistDaemon(collector, state_path=False, quota_per_day=100_000, include_replies=False,
+                             clock=clock, sleep=clock.sleep)
+    daemon.add_video('big')
+    video = daemon.videos['big']
+    with tempfile.TemporaryDirectory() as tmp:
+        daemon.output_dir = tmp
+        daemon.step()
+        # Capped at MAX_PAGES_PER_POLL pages: due again at once, from the next page
+        assert video['collected'] == MAX_PAGES_PER_POLL * 100 and video['next_poll'] == clock()
+        assert video['watermark'] == '' and video['fetched_count'] == 0 and video['page_token'] == '1000'
+
+        collector.youtube.fail_at = 1500
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            daemon.step()
+        assert 'failed' in out.getvalue()
+        assert video['collected'] == 1500 and video['watermark'] == '' and video['fetched_count'] == 0
+
+        collector.youtube.fail_at = None
+        for _ in range(3):
+            clock.sleep(MAX_INTERVAL)
+            daemon.step()
+        written = pd.concat(pd.read_csv(path) for path in daemon.close())
+    assert video['collected'] == video['fetched_count'] == 2500 and video['page_token'] is None
+    assert video['watermark'] == collector.youtube._iso(collector.youtube._published('big', 2499))
+    assert written['comment_id'].is_unique and len(written) == 2500
+
+
+def test_watchlist_ignores_replies_to_old_threads():
+    """commentCount growth from replies polls cannot reach stops triggering polls once it is learned"""
+    clock = FakeClock()
+    collector = _watchlist_collector(clock, {'chatty': 0.001}, reply_rates={'chatty-0': 20})
+    daemon = WatchlistDaemon(collector, state_path=False, quota_per_day=20000, include_replies=False,
+                             clock=clock, sleep=clock.sleep)
+    daemon.add_video('chatty')
+    with tempfile.TemporaryDirectory() as tmp:
+        daemon.output_dir = tmp
+        with contextlib.redirect_stdout(io.StringIO()):
+            daemon.run(cycles=100, verbose=False)
+        daemon.close()
+    video = daemon.videos['chatty']
+    assert clock() - collector.youtube.start > 10 * REPLY_RECHECK
+    assert video['collected'] == 30 and video['reply_rate'] > 15
+    # Polled while the reply rate is learned, then about once per REPLY_RECHECK
+    # rather than after every commentCount check
+    assert collector.youtube.calls['comments'] < collector.youtube.calls['videos'] / 2
+
+
+if __name__ == "__main__":
+    test_platforms_run_concurrently_and_merge()
+    test_failed_platform_does_not_stop_others()
+    test_rate_limiter_paces_requests()
+    test_orchestrator_streams_into_store()
+    test_twitter_pages_concurrently_against_fake_api()
+    test_twitter_stream_buffers_a_bounded_number_of_pages()
+    test_twitter_waits_for_rate_limit_reset()
+    test_orchestrator_routes_twitter_options()
+    test_watchlist_polls_by_comment_velocity()
+    test_watchlist_spends_scarce_quota_on_new_videos_first()
+    test_watchlist_resumes_capped_and_failed_polls()
+    test_watchlist_ignores_replies_to_old_threads()
+    print("✅ Collector tests passed")
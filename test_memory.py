@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# test_memory.py
+"""
+Tests for the shared --memory-budget setting
+"""
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add current directory to path
+sys.path.append('.')
+
+import pandas as pd
+
+import config
+import memory
+import profiling
+import youtube_sentiment_analysis as ysa
+from youtube_collector import write_pages
+
+
+@contextlib.contextmanager
+def budget(size):
+    previous = memory.budget()
+    memory.set_budget(size)
+    try:
+        yield
+    finally:
+        memory.set_budget(previous)
+
+
+def comments(rows):
+    return pd.DataFrame({'comment_id': [str(i) for i in range(rows)], 'author': [f'user{i % 7}' for i in range(rows)],
+                         'video_id': 'v1', 'text': ['great video', 'awful', 'ok, I guess'] * (rows // 3) +
+                         ['fine'] * (rows % 3)})
+
+
+def test_parse_size():
+    assert memory.parse_size('1048576') == 1 << 20
+    assert memory.parse_size('512M') == memory.parse_size('512mb') == 512 << 20
+    assert memory.parse_size('1.5G') == 3 << 29
+    assert memory.parse_size(' 2 GiB ') == 2 << 30
+    for bad in ('', 'lots', '12Q', '-1G'):
+        try:
+            memory.parse_size(bad)
+        except ValueError as e:
+            assert 'Invalid memory size' in str(e)
+        else:
+            raise AssertionError(f'{bad!r} accepted')
+
+
+def test_chunks_shrink_under_a_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'comments.csv'
+        comments(30_000).to_csv(path, index=False)
+
+        # No budget: the plain fixed-size reader
+        assert [len(chunk) for chunk in memory.read_csv_chunks(path, 20_000)] == [20_000, 10_000]
+
+        with budget(memory.rss() + (4 << 20)):
+            sizer = memory.ChunkSizer(20_000)
+            lengths = [len(chunk) for chunk in memory.read_csv_chunks(path, 20_000, sizer=sizer)]
+        assert sum(lengths) == 30_000
+        assert sizer.sizes[0] == memory.PROBE_ROWS
+        assert sizer.bytes_per_row > 0
+        assert all(memory.MIN_CHUNK_ROWS <= rows < memory.PROBE_ROWS for rows in sizer.sizes[1:])
+
+
+def test_workers_fit_the_budget():
+    assert memory.fit_workers(8) == 8
+    with budget(memory.rss() + (350 << 20)):
+        assert memory.fit_workers(8, per_worker=100 << 20) == 3
+        assert memory.fit_workers(1, per_worker=1 << 30) == 1
+    with budget(memory.rss()):
+        assert memory.fit_workers(8) == 1
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        list(pool.map(abs, range(4)))
+        memory.watch_pool(pool)
+        try:
+            assert memory.worker_memory() > 0
+            assert memory.pool_fit(pool, 2) == 2
+            with budget(memory.used() + (8 << 20)):
+                # Room for the workers already running
+                assert memory.pool_fit(pool, 2) == 2
+            with budget(memory.rss() + max(memory.process_memory(pid) for pid in memory.worker_pids())):
+                assert memory.pool_fit(pool, 2) == 1
+        finally:
+            memory.unwatch_pool(pool)
+    assert memory.worker_pids() == []
+
+
+def test_budgeted_sentiment_streams_and_reports_peaks():
+    with tempfile.TemporaryDirectory() as tmp:
+        comments(3000).to_csv(Path(tmp) / 'youtube_a_1.csv', index=False)
+        output = os.path.join(tmp, 'results.csv')
+        report_path = os.path.join(tmp, 'profile.json')
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                ysa.main(['--data-dir', tmp, '--output', output, '--cache', os.path.join(tmp, 'cache.db'),
+                          '--memory-budget', str(memory.rss() // 2), '--profile',
+                          '--profile-output', report_path])
+        finally:
+            memory.set_budget(None)
+        results = pd.read_csv(output)
+        report = profiling.load_report(report_path)
+
+        # Without --profile the peaks are printed instead
+        out_plain = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out_plain):
+                ysa.main(['--data-dir', tmp, '--output', output, '--cache', os.path.join(tmp, 'cache.db'),
+                          '--stream', '--memory-budget', '64G'])
+        finally:
+            memory.set_budget(None)
+
+    assert 'streaming instead' in out.getvalue()
+    assert len(results) == 3000 and results['comment_id'].is_unique
+    stages = {entry['name']: entry for entry in report['stages']}
+    assert stages['read']['rows'] == 3000 and stages['read']['peak_memory_mb'] > 0
+    assert report['memory_budget_mb'] > 0 and report['peak_memory_mb'] >= stages['read']['peak_memory_mb']
+    assert 'Peak memory' in out_plain.getvalue() and 'of the 65,536 MB budget' in out_plain.getvalue()
+
+
+def test_collector_pages_written_as_they_arrive():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'youtube_x.csv')
+        assert write_pages(iter([]), path) == 0 and not os.path.exists(path)
+        pages = [comments(4), comments(3)[['video_id', 'text', 'author', 'comment_id']]]
+        assert write_pages(iter(pages), path) == 7
+        written = pd.read_csv(path, dtype=str)
+    assert list(written.columns) == list(pages[0].columns)
+    assert written['text'].tolist()[4:] == pages[1]['text'].tolist()
+
+
+def test_budget_read_from_dotenv_when_first_used():
+    saved = memory._budget, config.env_path, config._env_loaded, os.environ.pop('MEMORY_BUDGET', None)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            config.env_path = Path(tmp) / '.env'
+            config.env_path.write_text('MEMORY_BUDGET=1G\n')
+            config._env_loaded = False
+            memory._budget = memory._UNSET
+            assert memory.budget() == 1 << 30
+        finally:
+            memory._budget, config.env_path, config._env_loaded = saved[:3]
+            os.environ.pop('MEMORY_BUDGET', None)
+            if saved[3] is not None:
+                os.environ['MEMORY_BUDGET'] = saved[3]
+
+        # A bad value does not break imports or --help, and is a usage error once used
+        root = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, MEMORY_BUDGET='lots', PYTHONPATH=root)
+        help_run = subprocess.run([sys.executable, os.path.join(root, 'cli.py'), 'collect', '--help'],
+                                  cwd=tmp, env=env, capture_output=True, text=True)
+        run = subprocess.run([sys.executable, os.path.join(root, 'youtube_sentiment_analysis.py'), '--data-dir', tmp],
+                             cwd=tmp, env=env, capture_output=True, text=True)
+    assert help_run.returncode == 0
+    assert run.returncode == 2 and "MEMORY_BUDGET: Invalid memory size: 'lots'" in run.stderr
+
+
+if __name__ == "__main__":
+    test_parse_size()
+    test_chunks_shrink_under_a_budget()
+    test_workers_fit_the_budget()
+    test_budgeted_sentiment_streams_and_reports_peaks()
+    test_collector_pages_written_as_they_arrive()
+    test_budget_read_from_dotenv_when_first_used()
+    print("✅ Memory budget tests passed")
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# test_network.py
+"""
+Offline tests for the network and influence stages
+"""
+
+import os
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append('.')
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+import centrality
+import communities
+from author_projection import project_authors
+from centrality import betweenness_centrality, build_adjacency, eigenvector_centrality, hits, pagerank
+from communities import community_summary, louvain, modularity
+from engagement_graph import aggregate_edges, build_digraph, build_sparse
+from graph_artifacts import load_graph, read_totals
+import plots
+from influence import compute_influence, load_inputs, score_authors
+from incremental_graph import IncrementalGraph
+from reply_graph import reply_edges, reply_edges_from_csv
+
+COMMENTS = pd.DataFrame({
+    'author': ['ann', 'ann', 'bob', 'bob', 'cat', 'ann'],
+    'video_id': ['v1aaaaaa', 'v1aaaaaa', 'v1aaaaaa', 'v2bbbbbb', 'v2bbbbbb', 'v2bbbbbb'],
+    'video_title': ['One', 'One', 'One', 'Two', 'Two', 'Two'],
+    'sentiment_score': [0.5, -0.3, 0.0, 0.8, -0.9, 0.2],
+    'sentiment': ['Positive', 'Negative', 'Neutral', 'Positive', 'Negative', 'Positive'],
+    'likes': [1, 2, 3, 4, 5, 6],
+})
+
+def test_aggregate_edges_matches_per_row_loop():
+    """One groupby gives the weights the old iterrows/has_edge loop produced"""
+    edges = aggregate_edges(COMMENTS).set_index(['author', 'video'])
+
+    ann_one = edges.loc[('ann', 'One (v1aaaa)')]
+    assert ann_one['weight'] == 2
+    assert ann_one['positive'] == 1 and ann_one['negative'] == 1
+    assert ann_one['likes'] == 3
+    assert abs(ann_one['mean_sentiment'] - 0.1) < 1e-12
+    assert edges['weight'].sum() == len(COMMENTS)
+
+def test_digraph_and_sparse_views_agree():
+    """networkx and CSR builds hold the same weighted edges"""
+    edges = aggregate_edges(COMMENTS)
+    G = build_digraph(edges)
+    authors, videos, matrix = build_sparse(edges)
+
+    assert G.nodes['ann']['type'] == 'author'
+    assert G.nodes['Two (v2bbbb)']['type'] == 'video'
+    assert G.number_of_edges() == matrix.nnz == 5
+    for u, v, data in G.edges(data=True):
+        assert matrix[authors.get_loc(u), videos.get_loc(v)] == data['weight']
+
+def test_sparse_centrality_matches_networkx():
+    """CSR power iteration agrees with networkx and converges from a warm start"""
+    edges = aggregate_edges(COMMENTS)
+    nodes, A = build_adjacency(edges)
+    G = build_digraph(edges)
+    U = G.to_undirected()
+
+    expected = nx.eigenvector_centrality(U, weight='weight', max_iter=1000, tol=1e-10)
+    scores, info = eigenvector_centrality(A, tol=1e-10)
+    assert info['converged']
+    for i, node in enumerate(nodes):
+        assert abs(scores[i] - expected[node]) < 1e-6
+
+    expected = nx.pagerank(U, weight='weight', max_iter=1000, tol=1e-10)
+    scores, _ = pagerank(A, tol=1e-10)
+    for i, node in enumerate(nodes):
+        assert abs(scores[i] - expected[node]) < 1e-6
+
+    expected_hubs, _ = nx.hits(G, max_iter=1000, tol=1e-10)
+    hubs, _, _ = hits(A, tol=1e-10)
+    for i, node in enumerate(nodes):
+        assert abs(hubs[i] - expected_hubs[node]) < 1e-6
+
+    _, warm_info = pagerank(A, x0=pagerank(A)[0])
+    assert warm_info['iterations'] == 1
+
+def test_betweenness_exact_and_sampled():
+    """Exact mode matches networkx; pivot sampling is seeded and parallel-safe"""
+    edges = aggregate_edges(COMMENTS)
+    nodes, A = build_adjacency(edges)
+
+    expected = nx.betweenness_centrality(build_digraph(edges).to_undirected())
+    scores, info = betweenness_centrality(A)
+    assert info['exact'] and info['error_bound'] == 0
+    for i, node in enumerate(nodes):
+        assert abs(scores[i] - expected[node]) < 1e-12
+
+    sampled, info = betweenness_centrality(A, k=3, seed=7)
+    assert info['pivots'] == 3 and not info['exact']
+    assert (sampled == betweenness_centrality(A, k=3, seed=7)[0]).all()
+
+    # One source per batch so the pool really splits the work
+    batch = centrality.MAX_BATCH
+    centrality.MAX_BATCH = 1
+    try:
+        parallel, _ = betweenness_centrality(A, k=3, seed=7, workers=2)
+    finally:
+        centrality.MAX_BATCH = batch
+    assert abs(parallel - sampled).max() < 1e-12
+
+def test_graph_artifact_cached_by_content():
+    """The stored graph round-trips and is rebuilt only when the input changes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        results = os.path.join(tmp, 'results.csv')
+        cache_dir = os.path.join(tmp, 'graph_cache')
+        COMMENTS.to_csv(results, index=False)
+
+        graph = load_graph(results, cache_dir=cache_dir)
+        expected = aggregate_edges(COMMENTS).set_index(['author', 'video']).sort_index()
+        actual = graph.edges().set_index(['author', 'video']).sort_index()
+        assert (actual.to_numpy() == expected.to_numpy()).all()
+        profile = graph.author_sentiment().set_index('author')
+        assert profile.loc['bob', 'sentiment_score'] == 0.4
+
+        assert load_graph(results, cache_dir=cache_dir).key == graph.key
+        assert load_graph(results, cache_dir=cache_dir, collapse_near_duplicates=False).key != graph.key
+
+        COMMENTS.iloc[:-1].to_csv(results, index=False)
+        changed = load_graph(results, cache_dir=cache_dir)
+        assert changed.key != graph.key
+        assert changed.matrix.sum() == len(COMMENTS) - 1
+
+def test_author_projection_blocks_and_pruning():
+    """Blocked B @ B.T matches the dense product; top-k keeps the strongest links"""
+    authors, _, B = build_sparse(aggregate_edges(COMMENTS))
+    source, target, weight = project_authors(B, top_k=None, min_weight=1, max_block_nnz=1)
+    links = {(authors[s], authors[t]): w for s, t, w in zip(source, target, weight)}
+    assert links == {('ann', 'bob'): 2, ('ann', 'cat'): 1, ('bob', 'cat'): 1}
+
+    source, target, weight = project_authors(B, top_k=1, min_weight=1)
+    assert {(authors[s], authors[t]) for s, t in zip(source, target)} == {('ann', 'bob'), ('ann', 'cat')}
+    source, _, _ = project_authors(B, top_k=None, min_weight=2)
+    assert len(source) == 1
+
+THREAD = pd.DataFrame({
+    'comment_id': ['c1', 'c2', 'c3', 'c4', 'c5', 'c6', 'c4'],
+    'parent_id': ['', 'c1', 'c1', 'c1', 'c2', 'gone', 'c1'],
+    'author': ['ann', 'bob', 'cat', 'ann', 'ann', 'bob', 'ann'],
+    'sentiment_score': [0.1, 0.6, -0.4, 0.9, 0.2, 0.0, 0.9],
+    'sentiment': ['Positive', 'Positive', 'Negative', 'Positive', 'Positive', 'Neutral', 'Positive'],
+    'likes': [0, 3, 1, 2, 5, 0, 2],
+})
+
+def test_reply_graph_join_in_memory_and_out_of_core():
+    """parent_id resolves to the parent's author; chunked partitions agree"""
+    edges, stats = reply_edges(THREAD)
+    assert stats == {'replies': 5, 'unresolved': 1, 'self_replies': 1}
+    edges = edges.set_index(['source', 'target'])
+    assert sorted(edges.index) == [('ann', 'bob'), ('bob', 'ann'), ('cat', 'ann')]
+    assert edges.loc[('cat', 'ann'), 'sentiment'] == 'Negative'
+    assert edges.loc[('bob', 'ann'), 'likes'] == 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'results.csv')
+        THREAD.to_csv(path, index=False)
+        chunked, chunked_stats = reply_edges_from_csv(path, chunk_rows=2, partitions=3, work_dir=tmp)
+        assert chunked_stats == stats
+        assert chunked.set_index(['source', 'target']).sort_index().equals(edges.sort_index())
+
+def test_incremental_state_matches_full_rebuild():
+    """Appended rows fold into the saved state; a window expires old days"""
+    comments = COMMENTS.assign(
+        comment_id=['c1', 'c2', 'c3', 'c4', 'c5', 'c6'],
+        parent_id=['', 'c1', '', 'c3', 'c4', 'c1'],
+        published_at=['2026-01-01T10:00:00Z', '2026-01-02T10:00:00Z', '2026-01-05T10:00:00Z',
+                      '2026-01-06T10:00:00Z', '2026-01-07T10:00:00Z', '2026-01-08T10:00:00Z'],
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        results = os.path.join(tmp, 'results.csv')
+        state_path = os.path.join(tmp, 'state.sqlite')
+
+        comments.iloc[:3].to_csv(results, index=False)
+        with IncrementalGraph(state_path) as state:
+            assert state.update(results) == 3
+            state.save()
+        comments.iloc[3:].to_csv(results, index=False, header=False, mode='a')
+        with IncrementalGraph(state_path) as state:
+            assert state.update(results) == 3
+            # The appended rows add buckets for their own days next to the first run's
+            assert state.days() == ['2026-01-01', '2026-01-02', '2026-01-05', '2026-01-06', '2026-01-07',
+                                    '2026-01-08']
+            assert state.conn.execute("SELECT COUNT(*) FROM parents").fetchone()[0] == 6
+
+            expected = aggregate_edges(comments).set_index(['author', 'video']).sort_index()
+            actual = state.edges().set_index(['author', 'video']).sort_index()
+            assert (actual.to_numpy() == expected.to_numpy()).all()
+            replies = state.reply_edges().set_index(['source', 'target'])['weight'].to_dict()
+            assert replies == {('cat', 'bob'): 1}
+            assert state.reply_stats == {'replies': 4, 'unresolved': 0, 'self_replies': 3}
+
+        window_path = os.path.join(tmp, 'window.sqlite')
+        with IncrementalGraph(window_path, window_days=3) as windowed:
+            windowed.update(results)
+            windowed.save()
+            assert windowed.edges()['weight'].sum() == 3
+            # Parents and reply counts expire with the window
+            assert windowed.conn.execute("SELECT COUNT(*) FROM parents").fetchone()[0] == 3
+            assert windowed.reply_stats == {'replies': 3, 'unresolved': 0, 'self_replies': 2}
+        # A reply to a comment that has left the window stays unresolved
+        comments.iloc[[3]].assign(comment_id='c7', parent_id='c3', published_at='2026-01-09T10:00:00Z').to_csv(
+            results, index=False, header=False, mode='a')
+        with IncrementalGraph(window_path, window_days=3) as windowed:
+            assert windowed.update(results) == 1
+            assert windowed.reply_stats == {'replies': 3, 'unresolved': 1, 'self_replies': 1}
+            assert windowed.edges()['weight'].sum() == 3
+
+def test_incremental_update_waits_for_a_complete_quoted_record():
+    """A newline inside a quoted text doesn't end the record being appended"""
+    comments = COMMENTS.iloc[:2].assign(comment_id=['c1', 'c2'], parent_id='', text=['multi\nline', 'ok'],
+                                        published_at='2026-01-01T10:00:00Z')
+    with tempfile.TemporaryDirectory() as tmp:
+        results = os.path.join(tmp, 'results.csv')
+        comments.iloc[:1].to_csv(results, index=False)
+        record = comments.iloc[1:].to_csv(index=False, header=False)
+        with open(results, 'a', encoding='utf-8') as f:
+            f.write(record.replace('ok', '"half\n'))
+        with IncrementalGraph(os.path.join(tmp, 'state.sqlite')) as state:
+            assert state.update(results) == 1
+            with open(results, 'a', encoding='utf-8') as f:
+                f.write('written"' + record[record.index('ok') + 2:])
+            assert state.update(results) == 1
+            assert state.edges()['weight'].sum() == 2
+
+def test_incremental_and_full_builds_collapse_the_same_near_duplicates():
+    """A copy in a later chunk or run is counted once by both builds"""
+    comments = pd.concat([COMMENTS, COMMENTS.iloc[[0, 0]]], ignore_index=True).assign(
+        dup_cluster=[0, 1, 2, 3, 4, 5, 0, 0], comment_id=[f'c{i}' for i in range(8)], parent_id='',
+        published_at='2026-01-01T10:00:00Z')
+    with tempfile.TemporaryDirectory() as tmp:
+        results = os.path.join(tmp, 'results.csv')
+        state_path = os.path.join(tmp, 'state.sqlite')
+
+        comments.iloc[:7].to_csv(results, index=False)
+        with IncrementalGraph(state_path) as state:
+            state.update(results, chunk_rows=2)
+            state.save()
+        comments.iloc[7:].to_csv(results, index=False, header=False, mode='a')
+        with IncrementalGraph(state_path) as state:
+            state.update(results)
+            incremental = state.edges().set_index(['author', 'video'])['weight'].sort_index()
+
+        full, _ = read_totals(results, chunk_rows=2)
+        assert incremental.sum() == len(COMMENTS)
+        assert incremental.tolist() == full['weight'].sort_index().astype(int).tolist()
+
+def test_louvain_finds_planted_communities():
+    """Two cliques joined by one edge split cleanly; modularity matches networkx"""
+    G = nx.barbell_graph(6, 0)
+    A = nx.to_scipy_sparse_array(G, format='csr')
+    membership, info = louvain(A)
+    assert info['communities'] == 2
+    assert len(set(membership[:6])) == 1 and len(set(membership[6:])) == 1
+    groups = [set(np.flatnonzero(membership == c)) for c in range(2)]
+    assert abs(modularity(A, membership) - nx.community.modularity(G, groups)) < 1e-12
+
+    edges = aggregate_edges(COMMENTS)
+    profile = pd.DataFrame({'author': ['ann', 'bob', 'cat'], 'community': [0, 0, 1],
+                            'prestige_influence': [0.2, 0.9, 0.5]})
+    summary = community_summary(profile, edges).set_index('community')
+    assert summary.loc[0, 'authors'] == 2 and summary.loc[0, 'comments'] == 5
+    assert summary.loc[0, 'top_influencers'] == 'bob; ann'
+    assert summary.loc[1, 'sentiment'] == 'Negative'
+
+def test_louvain_without_edges_keeps_every_node_apart():
+    """A graph with nodes but no edges never divides by its zero total weight"""
+    with np.errstate(divide='raise', invalid='raise'):
+        membership, info = louvain(nx.to_scipy_sparse_array(nx.empty_graph(4), format='csr'))
+    assert sorted(membership.tolist()) == [0, 1, 2, 3]
+    assert info['communities'] == 4 and info['modularity'] == 0.0 and info['levels'] == 0
+
+def test_rejected_moves_leave_labels_unchanged():
+    """When neither the simultaneous moves nor the single best move improve modularity, nothing moves"""
+    A = nx.to_scipy_sparse_array(nx.barbell_graph(4, 0), format='csr').astype(np.float64)
+    qualities = iter([0.0])
+    original = communities.modularity
+    # The starting partition scores 0, every partition tried afterwards scores worse
+    communities.modularity = lambda W, labels, resolution: next(qualities, -1.0)
+    try:
+        labels, sweeps = communities._local_moving(A, 1.0, np.random.default_rng(0), 5)
+    finally:
+        communities.modularity = original
+    assert labels.tolist() == list(range(8)) and sweeps == 1
+
+def test_headless_rendering_and_layout_cache():
+    """Layouts are reused from disk; large profiles render as density plots"""
+    G = build_digraph(aggregate_edges(COMMENTS))
+    with tempfile.TemporaryDirectory() as tmp:
+        pos = plots.spring_layout(G, cache_dir=tmp)
+        assert len(os.listdir(tmp)) == 1
+        cached = plots.spring_layout(G, cache_dir=tmp)
+        assert all((pos[node] == cached[node]).all() for node in pos)
+
+        rng = np.random.default_rng(0)
+        profile = pd.DataFrame({
+            'prestige_influence': rng.random(plots.LARGE_POINTS + 1),
+            'sentiment_score': rng.uniform(-1, 1, plots.LARGE_POINTS + 1),
+        })
+        path = os.path.join(tmp, 'matrix.png')
+        plots.influence_scatter(profile, 'prestige_influence', path, title='t', xlabel='x')
+        assert os.path.getsize(path) > 0
+
+def test_network_figures_build_only_the_top_commenters_subgraph():
+    """Only the top commenters' edges are loaded into networkx"""
+    import contextlib
+    import io
+
+    import engagement_graph
+    import youtube_network_analysis
+
+    built = []
+    original, top = engagement_graph.build_digraph, youtube_network_analysis.TOP_COMMENTERS
+
+    def recording_build_digraph(edges):
+        built.append(edges)
+        return original(edges)
+
+    engagement_graph.build_digraph, youtube_network_analysis.TOP_COMMENTERS = recording_build_digraph, 1
+    out = io.StringIO()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = os.path.join(tmp, 'results.csv')
+            COMMENTS.to_csv(results, index=False)
+            with contextlib.redirect_stdout(out):
+                youtube_network_analysis.main(['--input', results, '--output-dir', tmp,
+                                               '--cache-dir', os.path.join(tmp, 'graph_cache')])
+            assert all(os.path.getsize(os.path.join(tmp, name)) > 0 for name in youtube_network_analysis.FIGURES)
+    finally:
+        engagement_graph.build_digraph, youtube_network_analysis.TOP_COMMENTERS = original, top
+    assert len(built) == 1 and set(built[0]['author']) == {'ann'} and len(built[0]) == 2
+    assert 'Number of nodes: 5' in out.getvalue() and 'Number of edges: 5' in out.getvalue()
+
+
+def test_chunked_author_profile_and_engine():
+    """Chunked totals match one pass; the engine returns the profile without writing outputs"""
+    comments = pd.concat([COMMENTS, COMMENTS.iloc[[0]]], ignore_index=True).assign(dup_cluster=[0, 1, 2, 3, 4, 5, 0])
+    with tempfile.TemporaryDirectory() as tmp:
+        results = os.path.join(tmp, 'results.csv')
+        comments.to_csv(results, index=False)
+
+        edges, authors = read_totals(results, chunk_rows=2)
+        whole_edges, whole_authors = read_totals(results)
+        assert edges.sort_index().equals(whole_edges.sort_index())
+        assert authors.sort_index().equals(whole_authors.sort_index())
+        assert authors['weight'].sum() == len(COMMENTS)
+
+        cache_dir = os.path.join(tmp, 'graph_cache')
+        profile = compute_influence(results, metrics=['degree', 'replies'], cache_dir=cache_dir)
+        assert sorted(os.listdir(tmp)) == ['graph_cache', 'results.csv']
+        assert 'prestige_influence' not in profile.columns and 'community' not in profile.columns
+        profile = profile.set_index('author')
+        assert profile.loc['ann', 'comments'] == 3 and profile.loc['ann', 'likes'] == 9
+        assert profile.loc['ann', 'sentiment'] == 'Positive'
+        # bob has one Neutral and one Positive comment; ties go to Positive
+        assert profile.loc['bob', ['positive', 'neutral', 'negative']].tolist() == [1, 1, 0]
+        assert profile.loc['bob', 'sentiment'] == 'Positive'
+        assert profile.loc['cat', 'sentiment'] == 'Negative'
+        assert abs(profile.loc['bob', 'sentiment_score'] - 0.4) < 1e-12
+
+def test_influence_state_kept_next_to_the_input():
+    """Without --graph-state/--centrality-state the state files follow --input"""
+    import contextlib
+    import io
+
+    import influence
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, 'other_project')
+        os.makedirs(data_dir)
+        results = os.path.join(data_dir, 'results.csv')
+        COMMENTS.assign(comment_id=[f'c{i}' for i in range(len(COMMENTS))], parent_id='',
+                        published_at='2026-01-01T10:00:00Z').to_csv(results, index=False)
+        argv = ['--input', results, '--cache-dir', os.path.join(tmp, 'graph_cache'), '--incremental', '--no-plot',
+                '--metrics', 'degree,pagerank', '--output', os.path.join(tmp, 'profile.csv'),
+                '--summary-output', os.path.join(tmp, 'summary.csv')]
+        with contextlib.redirect_stdout(io.StringIO()):
+            influence.main(argv)
+            influence.main(argv + ['--graph-state', os.path.join(tmp, 'g.sqlite'),
+                                   '--centrality-state', os.path.join(tmp, 'c.csv')])
+        assert {'graph_state.sqlite', 'centrality_state.csv'} <= set(os.listdir(data_dir))
+        assert {'g.sqlite', 'c.csv'} <= set(os.listdir(tmp))
+
+
+def test_reply_warm_start_skips_authors_outside_the_graph():
+    """Reply nodes missing from the engagement graph start from zero, not the last node's score"""
+    with tempfile.TemporaryDirectory() as tmp:
+        results = os.path.join(tmp, 'results.csv')
+        COMMENTS.to_csv(results, index=False)
+        inputs = load_inputs(results, cache_dir=os.path.join(tmp, 'graph_cache'), replies=False)
+        replies, _ = reply_edges(THREAD)
+        inputs['replies'] = pd.concat([replies, replies.iloc[[0]].assign(source='zed')], ignore_index=True)
+        inputs['reply_stats'] = {}
+        warm_start = os.path.join(tmp, 'centrality_state.csv')
+        nodes = inputs['nodes']
+        pd.DataFrame({'node': nodes, 'reply_influence': np.arange(1, len(nodes) + 1) / len(nodes)}).to_csv(
+            warm_start, index=False)
+
+        starts = {}
+        original = centrality.pagerank
+
+        def recording_pagerank(A, directed=False, x0=None, **kwargs):
+            if directed:
+                starts['x0'] = x0
+            return original(A, directed=directed, x0=x0, **kwargs)
+
+        centrality.pagerank = recording_pagerank
+        try:
+            score_authors(inputs, metrics=['replies'], warm_start=warm_start)
+        finally:
+            centrality.pagerank = original
+    reply_nodes, _ = build_adjacency(inputs['replies'], source='source', target='target')
+    x0 = pd.Series(starts['x0'], index=reply_nodes)
+    assert x0['zed'] == 0
+    assert x0['ann'] == (nodes.get_loc('ann') + 1) / len(nodes)
+
+
+if __name__ == "__main__":
+    test_aggregate_edges_matches_per_row_loop()
+    test_digraph_and_sparse_views_agree()
+    test_sparse_centrality_matches_networkx()
+    test_betweenness_exact_and_sampled()
+    test_graph_artifact_cached_by_content()
+    test_author_projection_blocks_and_pruning()
+    test_reply_graph_join_in_memory_and_out_of_core()
+    test_incremental_state_matches_full_rebuild()
+    test_incremental_update_waits_for_a_complete_quoted_record()
+    test_incremental_and_full_builds_collapse_the_same_near_duplicates()
+    test_louvain_finds_planted_communities()
+    test_louvain_without_edges_keeps_every_node_apart()
+    test_rejected_moves_leave_labels_unchanged()
+    test_headless_rendering_and_layout_cache()
+    test_network_figures_build_only_the_top_commenters_subgraph()
+    test_chunked_author_profile_and_engine()
+    test_influence_state_kept_next_to_the_input()
+    test_reply_warm_start_skips_authors_outside_the_graph()
+    print("✅ Network tests passed")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# test_pipeline.py
+"""
+Tests for the incremental pipeline runner, using small stand-in stages
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add current directory to path
+sys.path.append('.')
+
+import pandas as pd
+
+from pipeline import Figure, FileSet, Pipeline, Stage, Table, default_pipeline
+
+SLEEP_SECONDS = 0.6
+
+
+def select_stage(argv):
+    """Copy one column of a CSV"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input")
+    parser.add_argument("--output")
+    parser.add_argument("--column")
+    args = parser.parse_args(argv)
+    pd.read_csv(args.input)[[args.column]].to_csv(args.output, index=False)
+
+
+def join_stage(argv):
+    """Concatenate CSVs"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inputs", nargs='+')
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+    pd.concat([pd.read_csv(path) for path in args.inputs], axis=1).to_csv(args.output, index=False)
+
+
+def sleep_stage(argv):
+    time.sleep(SLEEP_SECONDS)
+    with open(argv[0], 'w') as f:
+        f.write('done')
+
+
+def failing_stage(argv):
+    raise RuntimeError('bad input')
+
+
+def _diamond(tmp):
+    path = lambda name: os.path.join(tmp, name)
+    stages = [
+        Stage('left', 'test_pipeline:select_stage', ['--input', path('in.csv'), '--output', path('left.csv'),
+                                                     '--column', 'a'],
+              inputs=[Table(path('in.csv'), ['a', 'b'])], outputs=[Table(path('left.csv'), ['a'])]),
+        Stage('right', 'test_pipeline:select_stage', ['--input', path('in.csv'), '--output', path('right.csv'),
+                                                      '--column', 'b'],
+              inputs=[Table(path('in.csv'), ['a', 'b'])], outputs=[Table(path('right.csv'), ['b'])]),
+        Stage('join', 'test_pipeline:join_stage', ['--inputs', path('left.csv'), path('right.csv'),
+                                                   '--output', path('joined.csv')],
+              inputs=[Table(path('left.csv')), Table(path('right.csv'))], outputs=[Table(path('joined.csv'))]),
+    ]
+    return Pipeline(stages, path('.pipeline'))
+
+
+def test_stages_skip_when_inputs_and_args_are_unchanged():
+    with tempfile.TemporaryDirectory() as tmp:
+        pd.DataFrame({'a': [1, 2], 'b': [3, 4], 'c': [5, 6]}).to_csv(os.path.join(tmp, 'in.csv'), index=False)
+        pipeline = _diamond(tmp)
+        assert pipeline.dependencies == {'left': set(), 'right': set(), 'join': {'left', 'right'}}
+        assert pipeline.order[-1] == 'join'
+
+        statuses = lambda results: {name: result['status'] for name, result in results.items()}
+        assert set(statuses(pipeline.run()).values()) == {'ran'}
+        assert set(statuses(pipeline.run()).values()) == {'skipped'}
+        assert pd.read_csv(os.path.join(tmp, 'joined.csv')).columns.tolist() == ['a', 'b']
+
+        # A column only the upstream stages read changes: they rerun, but
+        # their outputs are identical so the join is skipped
+        pd.DataFrame({'a': [1, 2], 'b': [3, 4], 'c': [0, 0]}).to_csv(os.path.join(tmp, 'in.csv'), index=False)
+        assert statuses(pipeline.run()) == {'left': 'ran', 'right': 'ran', 'join': 'skipped'}
+
+        pd.DataFrame({'a': [1, 2], 'b': [3, 9], 'c': [0, 0]}).to_csv(os.path.join(tmp, 'in.csv'), index=False)
+        assert statuses(pipeline.run(['right'])) == {'right': 'ran'}
+        assert statuses(pipeline.run()) == {'left': 'ran', 'right': 'skipped', 'join': 'ran'}
+
+        # Deleted outputs are rebuilt, forced stages run regardless
+        os.remove(os.path.join(tmp, 'joined.csv'))
+        assert statuses(pipeline.run(dry_run=True))['join'] == 'would run'
+        assert statuses(pipeline.run()) == {'left': 'skipped', 'right': 'skipped', 'join': 'ran'}
+        assert statuses(pipeline.run(force=['left']))['left'] == 'ran'
+
+        runs = pipeline.history()
+        assert len(runs) == 7
+        assert all(result['seconds'] >= 0 for run in runs for result in run['stages'].values())
+        assert runs[0]['stages']['join']['status'] == 'ran'
+
+
+def test_independent_stages_run_in_parallel_and_failures_block_dependents():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = lambda name: os.path.join(tmp, name)
+        stages = [
+            Stage('one', 'test_pipeline:sleep_stage', [path('one.txt')], outputs=[Figure(path('one.txt'))]),
+            Stage('two', 'test_pipeline:sleep_stage', [path('two.txt')], outputs=[Figure(path('two.txt'))]),
+            Stage('broken', 'test_pipeline:failing_stage', inputs=[Figure(path('one.txt'))],
+                  outputs=[Table(path('broken.csv'))]),
+            Stage('after', 'test_pipeline:select_stage', inputs=[Table(path('broken.csv'))],
+                  outputs=[Table(path('after.csv'))]),
+        ]
+        pipeline = Pipeline(stages, path('.pipeline'))
+        start = time.perf_counter()
+        results = pipeline.run(['one', 'two'], workers=2)
+        assert time.perf_counter() - start < 2 * SLEEP_SECONDS * 0.9
+        assert [result['status'] for result in results.values()] == ['ran', 'ran']
+
+        results = pipeline.run(workers=2)
+        assert [result['status'] for result in results.values()] == ['skipped', 'skipped', 'failed', 'blocked']
+        assert 'bad input' in results['broken']['error']
+        with open(path('.pipeline/logs/broken.log')) as f:
+            assert 'RuntimeError' in f.read()
+
+        error = None
+        try:
+            Pipeline([Stage('a', 'x:y', inputs=[Table(path('b.csv'))], outputs=[Table(path('a.csv'))]),
+                      Stage('b', 'x:y', inputs=[Table(path('a.csv'))], outputs=[Table(path('b.csv'))])], tmp)
+        except ValueError as e:
+            error = e
+        assert error is not None and 'cycle' in str(error)
+
+
+def test_default_pipeline_wiring():
+    pipeline = default_pipeline('data', hashtag='python', metrics=['degree'])
+    assert pipeline.order[:3] == ['collect', 'sentiment', 'graph']
+    assert pipeline.dependencies['sentiment'] == {'collect'}
+    assert pipeline.dependencies['influence'] == {'sentiment', 'graph'}
+    assert pipeline.dependencies['replies'] == {'sentiment'}
+    assert pipeline.upstream(['network']) == ['collect', 'sentiment', 'graph', 'network']
+
+    # Derived results are not treated as collected comments
+    comments = FileSet('data', 'youtube_*.csv')
+    assert comments.covers('data/youtube_python_20260101.csv')
+    assert not pipeline.stages['sentiment'].inputs[0].covers('data/youtube_sentiment_results.csv')
+
+    # State and caches live in the data directory and are hashed as stage outputs
+    sentiment, influence = pipeline.stages['sentiment'], pipeline.stages['influence']
+    assert os.path.join('data', 'sentiment_cache.sqlite') in sentiment.args
+    assert os.path.join('data', 'sentiment_cache.sqlite') in [output.path for output in sentiment.outputs]
+    assert os.path.join('data', 'graph_state.sqlite') in influence.args
+    assert os.path.join('data', 'centrality_state.csv') in influence.args
+    # Only the degree metric was selected, so no warm-start scores are written
+    assert os.path.join('data', 'centrality_state.csv') not in [output.path for output in influence.outputs]
+    influence = default_pipeline('data').stages['influence']
+    assert os.path.join('data', 'centrality_state.csv') in [output.path for output in influence.outputs]
+
+
+if __name__ == "__main__":
+    test_stages_skip_when_inputs_and_args_are_unchanged()
+    test_independent_stages_run_in_parallel_and_failures_block_dependents()
+    test_default_pipeline_wiring()
+    print("✅ Pipeline tests passed")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# test_profiling.py
+"""
+Tests for the shared --profile stage timers and reports
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add current directory to path
+sys.path.append('.')
+
+import pandas as pd
+
+import profiling
+import youtube_sentiment_analysis as ysa
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def sleep_stage():
+    with profiling.stage('sleep', rows=1):
+        time.sleep(0.01)
+
+
+def test_stages_accumulate_across_calls_and_threads():
+    # Without an active profiler stages are no-ops
+    with profiling.stage('ignored', rows=5) as run:
+        run.add(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'report.json')
+        with profiling.Profiler('demo', output=output, argv=['--x']) as profiler:
+            with profiling.stage('outer'):
+                for _ in range(3):
+                    with profiling.stage('inner', rows=10):
+                        busy(0.01)
+            threads = [threading.Thread(target=sleep_stage) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            items = list(profiling.timed_iter('read', [[1, 2], [3], [4, 5, 6]]))
+        assert profiling._active is None
+
+        with open(output) as f:
+            report = json.load(f)
+    stages = {entry['name']: entry for entry in report['stages']}
+    assert items == [[1, 2], [3], [4, 5, 6]]
+    assert [entry['name'] for entry in report['stages']] == ['inner', 'outer', 'sleep', 'read']
+    assert 'ignored' not in stages
+    assert stages['inner']['calls'] == 3 and stages['inner']['rows'] == 30
+    assert stages['inner']['cpu_seconds'] > 0.02
+    assert stages['outer']['wall_seconds'] >= stages['inner']['wall_seconds']
+    assert stages['outer']['rows'] is None and 'rows_per_second' not in stages['outer']
+    assert stages['inner']['rows_per_second'] > 0
+    assert stages['sleep']['calls'] == 4
+    # One timed next() per item plus the one that finds the iterator exhausted
+    assert stages['read']['calls'] == 4 and stages['read']['rows'] == 6
+    assert report['command'] == 'demo' and report['argv'] == ['--x'] and report['mode'] == 'timers'
+    assert report['wall_seconds'] >= stages['outer']['wall_seconds']
+    assert profiler.report()['hotspots'] == []
+
+
+def test_function_profiles_and_compare():
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = {}
+        for mode in ('cprofile', 'sample'):
+            output = os.path.join(tmp, f'{mode}.json')
+            with profiling.Profiler('demo', mode=mode, output=output, sample_interval=0.001):
+                with profiling.stage('spin', rows=100):
+                    busy(0.15)
+            reports[mode] = profiling.load_report(output)
+        assert os.path.exists(os.path.join(tmp, 'cprofile.prof'))
+        with open(os.path.join(tmp, 'sample.folded')) as f:
+            folded = f.read().splitlines()
+
+        assert any('busy' in spot['function'] for spot in reports['cprofile']['hotspots'])
+        assert reports['sample']['hotspots'][0]['function'].endswith(':busy')
+        assert all(line.startswith('spin;') for line in folded if 'busy' in line)
+
+        rows = {name: ratio for name, _, _, ratio in profiling.compare_reports(reports['cprofile'],
+                                                                               reports['sample'])}
+        assert set(rows) == {'(total)', 'spin'} and rows['spin'] > 0
+
+        try:
+            profiling.Profiler('demo', mode='perf')
+        except ValueError as e:
+            assert 'perf' in str(e)
+        else:
+            raise AssertionError('unknown mode accepted')
+
+
+def test_sentiment_profile_report():
+    parser = argparse.ArgumentParser()
+    profiling.add_arguments(parser)
+    assert parser.parse_args(['--profile']).profile == 'timers'
+    assert isinstance(profiling.session(parser.parse_args([]), 'x'), profiling._NoProfile)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pd.DataFrame({'comment_id': [str(i) for i in range(50)], 'author': 'ann',
+                      'text': ['great video', 'awful', 'ok'] * 16 + ['x', 'y']}).to_csv(
+            Path(tmp) / 'youtube_a_1.csv', index=False)
+        report_path = os.path.join(tmp, 'profile.json')
+        ysa.main(['--data-dir', tmp, '--output', os.path.join(tmp, 'results.csv'), '--stream',
+                  '--stream-rows', '20', '--cache', os.path.join(tmp, 'cache.db'), '--profile',
+                  '--profile-output', report_path])
+        report = profiling.load_report(report_path)
+
+    stages = {entry['name']: entry for entry in report['stages']}
+    assert report['command'] == 'sentiment'
+    assert stages['read']['rows'] == 50 and stages['write']['rows'] == 50
+    assert stages['score']['calls'] == 3 and stages['score']['rows'] == 3 + 3 + 5
+    assert stages['cache_lookup']['rows'] == 50 and stages['dedupe_texts']['rows'] == 50
+
+
+if __name__ == "__main__":
+    test_stages_accumulate_across_calls_and_threads()
+    test_function_profiles_and_compare()
+    test_sentiment_profile_report()
+    print("✅ Profiling tests passed")
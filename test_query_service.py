@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# test_query_service.py
+"""
+Tests for the local influence and sentiment query service
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# Add current directory to path
+sys.path.append('.')
+
+import pandas as pd
+
+import query_service
+from query_service import QueryService
+
+
+def write_artifacts(data_dir, scale=1.0):
+    pd.DataFrame({
+        'author': ['ann', 'bob', 'cat', 'dan'],
+        'pagerank': [0.4 * scale, 0.3, 0.2, None],
+        'degree_influence': [0.1, 0.5, 0.3, 0.2],
+        'community': [0, 1, 0, 1],
+        'comments': [3, 2, 1, 1],
+        'sentiment': ['Positive', 'Negative', 'Neutral', 'Positive'],
+    }).to_csv(os.path.join(data_dir, query_service.PROFILE_NAME), index=False)
+    pd.DataFrame({
+        'author': ['ann', 'ann', 'ann', 'bob', 'bob', 'cat', 'dan'],
+        'video_id': ['v1', 'v1', 'v2', 'v2', 'v2', 'v1', 'v3'],
+        'video_title': ['One', 'One', 'Two', 'Two', 'Two', 'One', 'Three'],
+        'published_at': ['2026-01-01T10:00:00Z', '2026-01-02T10:00:00Z', '2026-01-02T11:00:00Z',
+                         '2026-01-03T10:00:00Z', '2026-01-03T12:00:00Z', '2026-01-01T09:00:00Z', None],
+        'hashtag_query': ['#python', '#python', '#rust', '#rust', '#rust', '#python', '#python'],
+        'text': 'x',
+        'sentiment_score': [0.5, 0.7, 0.1, -0.6, -0.4, 0.0, 0.8],
+        'sentiment': ['Positive', 'Positive', 'Neutral', 'Negative', 'Negative', 'Neutral', 'Positive'],
+    }).to_csv(os.path.join(data_dir, query_service.RESULTS_NAME), index=False)
+
+
+def get(port, target):
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}{target}') as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+async def run_requests(service, targets):
+    server = await service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        return [await asyncio.to_thread(get, port, target) for target in targets]
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def test_queries():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_artifacts(tmp)
+        service = QueryService(tmp)
+        responses = asyncio.run(run_requests(service, [
+            '/top?k=2', '/top?metric=degree_influence&hashtag=%23Python', '/top?community=1',
+            '/authors/ann', '/authors/nobody',
+            '/sentiment', '/sentiment?hashtag=rust&since=2026-01-03&by=author', '/sentiment?by=date',
+            '/sentiment?author=ann&until=2026-01-01',
+            '/top?metric=likes', '/top?k=0', '/sentiment?since=yesterday', '/nowhere', '/top?k=2', '/health',
+        ]))
+    (top, top_python, top_community, ann, nobody, overall, rust, by_date, ann_early,
+     bad_metric, bad_k, bad_date, nowhere, top_again, health) = responses
+
+    assert top == (200, {'metric': 'pagerank', 'k': 2, 'authors': [
+        {'rank': 1, 'author': 'ann', 'pagerank': 0.4, 'community': 0, 'sentiment': 'Positive'},
+        {'rank': 2, 'author': 'bob', 'pagerank': 0.3, 'community': 1, 'sentiment': 'Negative'}]})
+    # bob only commented under #rust; dan has no pagerank and ranks last
+    assert [a['author'] for a in top_python[1]['authors']] == ['cat', 'dan', 'ann']
+    assert [a['author'] for a in top_community[1]['authors']] == ['bob', 'dan']
+    assert top_community[1]['authors'][1]['pagerank'] is None
+
+    assert ann[0] == 200 and ann[1]['profile']['comments'] == 3 and ann[1]['ranks']['degree_influence'] == 4
+    assert ann[1]['sentiment']['counts'] == {'Positive': 2, 'Neutral': 1, 'Negative': 0}
+    assert ann[1]['videos'] == [{'video_id': 'v1', 'title': 'One', 'comments': 2},
+                                {'video_id': 'v2', 'title': 'Two', 'comments': 1}]
+    assert nobody[0] == 404
+
+    assert overall[1]['comments'] == 7 and overall[1]['shares']['Positive'] == round(3 / 7, 4)
+    assert rust[1]['comments'] == 2 and rust[1]['mean_score'] == -0.5
+    assert rust[1]['groups'] == [{'author': 'bob', 'comments': 2, 'mean_score': -0.5,
+                                  'counts': {'Positive': 0, 'Neutral': 0, 'Negative': 2}}]
+    assert [(g['date'], g['comments']) for g in by_date[1]['groups']] == [
+        ('2026-01-01', 2), ('2026-01-02', 2), ('2026-01-03', 2)]
+    assert ann_early[1]['comments'] == 1
+
+    assert bad_metric[0] == 400 and 'degree_influence' in bad_metric[1]['error']
+    assert bad_k[0] == 400 and bad_date[0] == 400 and nowhere[0] == 404
+    assert top_again == top
+    assert health[1]['cache']['hits'] == 1 and health[1]['requests'] == 14
+    assert health[1]['latency_ms']['p99'] < 100
+
+
+def test_hot_swap_keeps_serving():
+    async def scenario(tmp):
+        service = QueryService(tmp)
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            first = await asyncio.to_thread(get, port, '/top?k=1')
+            write_artifacts(tmp, scale=0.1)
+            # Changed files are loaded once they have stopped changing
+            assert not await service.refresh()
+            assert (await asyncio.to_thread(get, port, '/top?k=1')) == first
+            assert await service.refresh()
+            second = await asyncio.to_thread(get, port, '/top?k=1')
+
+            # A pipeline run part way through defers the swap
+            state_dir = os.path.join(tmp, query_service.STATE_DIR_NAME)
+            os.makedirs(state_dir)
+            with open(os.path.join(state_dir, query_service.RUNS_NAME), 'w') as f:
+                f.write('{}\n')
+            time.sleep(0.01)
+            with open(os.path.join(state_dir, query_service.STATE_NAME), 'w') as f:
+                f.write('{}')
+            write_artifacts(tmp)
+            assert not await service.refresh() and not await service.refresh()
+            with open(os.path.join(state_dir, query_service.RUNS_NAME), 'a') as f:
+                f.write('{}\n')
+            assert await service.refresh()
+            third = await asyncio.to_thread(get, port, '/top?k=1')
+
+            # A broken file keeps the current snapshot
+            with open(os.path.join(tmp, query_service.PROFILE_NAME), 'w') as f:
+                f.write('name,score\nx,1\n')
+            assert not await service.refresh() and not await service.refresh()
+            assert service.last_error and service.snapshot.version == 3
+            broken = await asyncio.to_thread(get, port, '/top?k=1')
+            return first, second, third, broken
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_artifacts(tmp)
+        first, second, third, broken = asyncio.run(scenario(tmp))
+    assert first[1]['authors'][0]['author'] == 'ann'
+    assert second[1]['authors'][0]['author'] == 'bob'
+    assert third == broken == first
+
+
+if __name__ == "__main__":
+    test_queries()
+    test_hot_swap_keeps_serving()
+    print("✅ Query service tests passed")
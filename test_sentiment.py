@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# test_sentiment.py
+"""
+Offline tests for the sentiment scoring stage
+"""
+
+import contextlib
+import io
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to path
+sys.path.append('.')
+
+import pandas as pd
+
+import youtube_sentiment_analysis as ysa
+from comment_dataset import DatasetManifest, complete_lines_end
+from near_duplicates import cluster_near_duplicates
+from sentiment_cache import SentimentCache
+from vader_vectorized import COMPOUND_TOLERANCE, VectorizedVader
+
+SAMPLE_TEXTS = [
+    "I love this video!!!",
+    "This is the WORST tutorial ever :(",
+    "not bad at all",
+    "first!",
+    "🔥🔥🔥",
+    "",
+    None,
+    "Meh. It was okay, I guess?",
+] * 7
+
+def test_parallel_scores_match_serial():
+    """Parallel scoring returns the serial scores, in order"""
+    serial = [ysa.get_sentiment_score(text) for text in SAMPLE_TEXTS]
+    parallel = ysa.score_texts(SAMPLE_TEXTS, workers=2, chunk_size=5)
+
+    assert parallel == serial
+
+def test_single_worker_is_serial():
+    """workers=1 never starts a pool and still scores every text"""
+    scores = ysa.score_texts(SAMPLE_TEXTS[:4], workers=1, chunk_size=1)
+
+    assert len(scores) == 4
+    assert scores[0] > 0.05 and scores[1] < -0.05
+
+def test_cache_rescores_only_new_or_edited_comments():
+    """Cached comments are reused; edited texts and new analyzer versions miss"""
+    df = pd.DataFrame({
+        'comment_id': ['c1', 'c2', 'c3'],
+        'text': ['great video', 'awful audio', 'ok'],
+    })
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'cache.sqlite'
+        with SentimentCache(path, 'v1') as cache:
+            first = ysa.score_comments(df, cache=cache)
+            assert len(cache) == 3
+
+        edited = df.copy()
+        edited.loc[1, 'text'] = 'awesome audio'
+        with SentimentCache(path, 'v1') as cache:
+            cached = cache.lookup(edited['comment_id'], edited['text'])
+            assert cached[0] == first[0] and cached[2] == first[2]
+            assert cached[1] is None
+
+            rescored = ysa.score_comments(edited, cache=cache)
+            assert rescored[1] == ysa.get_sentiment_score('awesome audio')
+
+        with SentimentCache(path, 'v2') as cache:
+            assert cache.lookup(df['comment_id'], df['text']) == [None] * 3
+
+def test_whitespace_normalization_preserves_scores():
+    """Memoizing on normalized text must not change any score"""
+    for text in ["  great   video ", "NOT  good\t at all!!", "🔥 🔥\n🔥", "lol :)  "]:
+        assert ysa.get_sentiment_score(ysa.normalize_text(text)) == ysa.get_sentiment_score(text)
+
+def test_near_duplicates_cluster_template_spam():
+    """Template spam lands in one cluster; unrelated comments stay apart"""
+    texts = [
+        "Check out my channel for free giveaways!!! link in bio",
+        "check out my channel for FREE giveaways!!! link in bio",
+        "Check out my channel for free giveaways!!  link in bio",
+        "The editing in this video is really well done",
+        "first!",
+        "first!",
+    ]
+    clusters = cluster_near_duplicates(texts)
+
+    assert clusters['dup_cluster'].tolist()[:3] == [0, 0, 0]
+    assert clusters['dup_count'].tolist() == [3, 3, 3, 1, 2, 2]
+    assert clusters['dup_cluster'][3] not in (0, clusters['dup_cluster'][4])
+
+def test_manifest_reads_only_new_files_and_skips_outputs():
+    """Results files are never ingested; unchanged files are not new on rerun"""
+    with tempfile.TemporaryDirectory() as tmp:
+        comments = pd.DataFrame({
+            'comment_id': ['c1', 'c2'],
+            'author': ['ann', 'bob'],
+            'text': ['nice', 'bad'],
+            'likes': [3, None],
+            'is_reply': [False, True],
+            'extra_column': [1, 2],
+        })
+        comments.to_csv(Path(tmp) / 'youtube_a_1.csv', index=False)
+        comments.to_csv(Path(tmp) / 'youtube_sentiment_results.csv', index=False)
+
+        dataset = DatasetManifest(tmp).dataset()
+        assert [Path(f).name for f in dataset.files] == ['youtube_a_1.csv']
+        df = dataset.to_frame()
+        assert 'extra_column' not in df.columns
+        assert str(df['likes'].dtype) == 'Int64'
+        assert dataset.known_rows == 2
+        dataset.commit()
+
+        comments.to_csv(Path(tmp) / 'youtube_b_2.csv', index=False)
+        new = DatasetManifest(tmp).dataset(only_new=True)
+        assert [Path(f).name for f in new.files] == ['youtube_b_2.csv']
+
+def test_quoted_newlines_are_not_record_boundaries():
+    """A record cut off inside a multi-line quoted text is left for the next read"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'youtube_a_1.csv'
+        pd.DataFrame({'comment_id': ['c1'], 'author': ['ann'], 'text': ['first line\nsecond line']}).to_csv(
+            path, index=False)
+        # A collector interrupted after the first line of a quoted text
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('c2,bob,"half-written\n')
+        complete = b'comment_id,author,text\nc1,ann,"first line\nsecond line"\n'
+        assert complete_lines_end(path, path.stat().st_size) == len(complete)
+
+        dataset = DatasetManifest(tmp).dataset()
+        assert dataset.to_frame()['text'].tolist() == ['first line\nsecond line']
+        dataset.commit()
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('with ""quotes"" inside"\n')
+        new = DatasetManifest(tmp).dataset(only_new=True)
+        assert new.to_frame()['text'].tolist() == ['half-written\nwith "quotes" inside']
+
+def parity_corpus(n=3000, seed=7):
+    """Hand-picked VADER cases plus seeded random comments built from the lexicon"""
+    corpus = SAMPLE_TEXTS + [
+        "VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!",
+        "VADER is not smart, handsome, nor funny.",
+        "At least it isn't a horrible book.",
+        "The book was only kind of good.",
+        "The plot was good, but the characters are uncompelling and the dialog is not great.",
+        "Today only kinda sux! But I'll get by, lol",
+        "Make sure you :) or :D today!",
+        "Catch utf-8 emoji such as 💘 and 💋 and 😁",
+        "this song is the bomb", "yeah right, great job", "never so happy",
+        "without a doubt the best", "no good deed", "it was sort of fun???",
+        float('nan'),
+    ]
+    rng = random.Random(seed)
+    lexicon = sorted(ysa.get_analyzer().lexicon)
+    filler = ['the', 'a', 'video', 'not', 'no', 'very', 'so', 'never', 'least',
+              'kind', 'of', 'but', 'ALWAYS', "isn't", 'the', 'bomb', '🔥', ':)']
+    for _ in range(n):
+        words = [rng.choice(lexicon) if rng.random() < 0.4 else rng.choice(filler)
+                 for _ in range(rng.randint(0, 20))]
+        corpus.append(' '.join(words) + rng.choice(['', '!', '!!!', '??', '.']))
+    return corpus
+
+def test_vectorized_engine_matches_vader():
+    """Vectorized compound scores stay within the documented tolerance"""
+    corpus = parity_corpus()
+    expected = [ysa.get_sentiment_score(text) for text in corpus]
+    actual = VectorizedVader(ysa.get_analyzer()).compound_scores(corpus)
+
+    worst = max(abs(e - a) for e, a in zip(expected, actual))
+    assert worst <= COMPOUND_TOLERANCE
+
+    # The engine option routes through the same scorer, chunked
+    assert ysa.score_texts(corpus[:50], chunk_size=7, engine='vectorized') == list(actual[:50])
+
+class InterruptingCache:
+    """Cache stand-in that simulates Ctrl-C on the n-th chunk"""
+
+    def __init__(self, interrupt_on):
+        self.calls = 0
+        self.interrupt_on = interrupt_on
+
+    def lookup(self, comment_ids, texts):
+        self.calls += 1
+        if self.calls == self.interrupt_on:
+            raise KeyboardInterrupt
+        return [None] * len(texts)
+
+    def store(self, comment_ids, texts, scores):
+        pass
+
+def test_stream_resume_matches_full_run():
+    """An interrupted, resumed stream writes every row exactly once, in order"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, texts in [('youtube_a_1.csv', SAMPLE_TEXTS[:5]), ('youtube_b_2.csv', SAMPLE_TEXTS[5:13])]:
+            pd.DataFrame({
+                'comment_id': [f'{name}-{i}' for i in range(len(texts))],
+                'author': 'ann',
+                'text': texts,
+            }).to_csv(Path(tmp) / name, index=False)
+        output = str(Path(tmp) / 'out' / 'results.csv')
+
+        try:
+            ysa.stream_sentiment(DatasetManifest(tmp).dataset(), output_file=output,
+                                 rows_per_chunk=2, cache=InterruptingCache(interrupt_on=4))
+        except KeyboardInterrupt:
+            pass
+        assert Path(output + '.checkpoint.json').exists()
+
+        counts = ysa.stream_sentiment(DatasetManifest(tmp).dataset(), output_file=output,
+                                      rows_per_chunk=2, resume=True)
+        result = pd.read_csv(output)
+        expected = [ysa.get_sentiment_score(t) for t in SAMPLE_TEXTS[:13]]
+
+        assert result['sentiment_score'].tolist() == expected
+        assert sum(counts.values()) == 13
+        assert not Path(output + '.checkpoint.json').exists()
+
+def test_only_new_scores_appended_rows_once():
+    """--only-new scores rows appended to a known file, not the whole file again"""
+    def comments(start, stop):
+        return pd.DataFrame({'comment_id': [f'c{i}' for i in range(start, stop)], 'author': 'ann',
+                             'text': SAMPLE_TEXTS[start:stop]})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'youtube_a_1.csv'
+        output = str(Path(tmp) / 'results.csv')
+        argv = ['--data-dir', tmp, '--output', output, '--stream', '--stream-rows', '2', '--only-new']
+        comments(0, 5).to_csv(path, index=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ysa.main(argv)
+            # Appended like CollectionStore.write, plus a new file
+            comments(5, 12).to_csv(path, index=False, header=False, mode='a')
+            comments(12, 15).to_csv(Path(tmp) / 'youtube_b_2.csv', index=False)
+            ysa.main(argv)
+            ysa.main(argv)
+        result = pd.read_csv(output)
+        # The score cache belongs to the data directory
+        assert (Path(tmp) / ysa.CACHE_NAME).exists()
+
+        comments(0, 4).to_csv(path, index=False)
+        try:
+            DatasetManifest(tmp).dataset(only_new=True)
+        except ValueError as e:
+            assert 'youtube_a_1.csv' in str(e)
+        else:
+            raise AssertionError('rewritten file accepted')
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            try:
+                ysa.parse_args(['--stream', '--stream-rows', '0'])
+            except SystemExit:
+                pass
+            else:
+                raise AssertionError('--stream-rows 0 accepted')
+
+    assert result['comment_id'].tolist() == [f'c{i}' for i in range(15)]
+    assert result['sentiment_score'].tolist() == [ysa.get_sentiment_score(t) for t in SAMPLE_TEXTS[:15]]
+
+
+if __name__ == "__main__":
+    test_parallel_scores_match_serial()
+    test_single_worker_is_serial()
+    test_cache_rescores_only_new_or_edited_comments()
+    test_whitespace_normalization_preserves_scores()
+    test_near_duplicates_cluster_template_spam()
+    test_manifest_reads_only_new_files_and_skips_outputs()
+    test_quoted_newlines_are_not_record_boundaries()
+    test_vectorized_engine_matches_vader()
+    test_stream_resume_matches_full_run()
+    test_only_new_scores_appended_rows_once()
+    print("✅ Sentiment tests passed")
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Twitter/X Collector
+Pages the v2 recent search endpoint asynchronously: the search period is
+split into time slices that are paged side by side, with at most
+`concurrency` requests in flight, and the x-rate-limit-* headers are
+followed so requests wait for the window reset instead of failing.
+Rows use the schema utils.generate_summary expects (author_username,
+like_count, retweet_count, ...).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+# Import configuration
+from config import config
+import profiling
+
+SEARCH_PATH = "/2/tweets/search/recent"
+DEFAULT_CONCURRENCY = 4
+DEFAULT_DAYS = 7
+PAGE_SIZE = 100
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 1.0
+# Margin added to x-rate-limit-reset, which has one-second resolution
+RESET_MARGIN = 0.05
+# Pages buffered ahead of the consumer; fetching pauses while the buffer is full
+QUEUE_PAGES = 64
+TWEET_FIELDS = "created_at,public_metrics,author_id,conversation_id,lang,referenced_tweets"
+TWEET_COLUMNS = [
+    'platform', 'tweet_id', 'conversation_id', 'parent_id', 'author_id', 'author_username', 'author_name',
+    'text', 'lang', 'like_count', 'retweet_count', 'reply_count', 'quote_count', 'created_at',
+    'collected_at', 'hashtag_query',
+]
+
+
+class TwitterAPIError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"Twitter API returned {status}: {body}")
+        self.status = status
+
+
+def _iso(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def time_slices(days, count, now=None):
+    """
+    Split the last `days` days into `count` equal [start, end) ranges
+
+    The search API requires end_time at least 10 seconds in the past.
+
+    Returns:
+        List of (start_time, end_time) ISO strings, newest first
+    """
+    end = (now or datetime.now(timezone.utc)).replace(microsecond=0) - timedelta(seconds=10)
+    start = end - timedelta(days=days)
+    step = (end - start) / count
+    bounds = [start + step * i for i in range(count)] + [end]
+    bounds = [moment.replace(microsecond=0) for moment in bounds]
+    return [(_iso(a), _iso(b)) for a, b in zip(bounds[:-1], bounds[1:]) if a < b][::-1]
+
+
+def tweets_frame(body, hashtag):
+    """Flatten one search response into TWEET_COLUMNS rows"""
+    import pandas as pd
+
+    users = {user['id']: user for user in body.get('includes', {}).get('users', [])}
+    collected_at = datetime.now().isoformat()
+    rows = []
+    for tweet in body.get('data', []):
+        user = users.get(tweet.get('author_id'), {})
+        metrics = tweet.get('public_metrics', {})
+        parent = next((ref['id'] for ref in tweet.get('referenced_tweets', []) if ref.get('type') == 'replied_to'),
+                      '')
+        rows.append({
+            'platform': 'Twitter',
+            'tweet_id': tweet['id'],
+            'conversation_id': tweet.get('conversation_id', ''),
+            'parent_id': parent,
+            'author_id': tweet.get('author_id', ''),
+            'author_username': user.get('username', ''),
+            'author_name': user.get('name', ''),
+            'text': tweet.get('text', ''),
+            'lang': tweet.get('lang', ''),
+            'like_count': metrics.get('like_count', 0),
+            'retweet_count': metrics.get('retweet_count', 0),
+            'reply_count': metrics.get('reply_count', 0),
+            'quote_count': metrics.get('quote_count', 0),
+            'created_at': tweet.get('created_at', ''),
+            'collected_at': collected_at,
+            'hashtag_query': f'#{hashtag}',
+        })
+    with profiling.stage('dataframe', rows=len(rows)):
+        return pd.DataFrame(rows, columns=TWEET_COLUMNS)
+
+
+class TwitterCollector:
+    platform = 'twitter'
+
+    def __init__(self, bearer_token=None, rate_limiter=None, base_url=None, timeout=30):
+        """
+        Initialize Twitter collector
+
+        Args:
+            bearer_token: App bearer token (optional, uses config if not provided)
+            rate_limiter: Optional collectors.RateLimiter for client-side pacing
+                on top of the server's rate-limit headers
+            base_url: API root (default: config.TWITTER_API_URL)
+            timeout: Seconds per HTTP request
+        """
+        self.bearer_token = bearer_token or config.TWITTER_BEARER_TOKEN
+        if not self.bearer_token:
+            raise ValueError(
+                "Twitter bearer token is required. "
+                "Set TWITTER_BEARER_TOKEN in .env file or provide via --bearer-token"
+            )
+        self.base_url = (base_url or config.TWITTER_API_URL).rstrip('/')
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.total_requests = 0
+        self.rate_limit_waits = 0
+
+    def _fetch(self, url):
+        """Blocking GET, run in a worker thread; returns (status, headers, body)"""
+        if self.rate_limiter:
+            with profiling.stage('rate_limit_wait'):
+                self.rate_limiter.acquire()
+        request = urllib.request.Request(url, headers={'Authorization': f'Bearer {self.bearer_token}'})
+        try:
+            with profiling.stage('api_request'):
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    status, headers, raw = response.status, response.headers, response.read()
+            with profiling.stage('parse_json'):
+                return status, headers, json.loads(raw)
+        except urllib.error.HTTPError as e:
+            raw = e.read()
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                body = raw.decode('utf-8', 'replace')
+            return e.code, e.headers, body
+
+    async def _wait_for_window(self):
+        """Take one request from the rate-limit budget, sleeping until the reset if it's spent"""
+        async with self._window_lock:
+            while self._remaining is not None and self._remaining <= 0:
+                wait = self._reset_at - time.time()
+                if wait <= 0:
+                    self._remaining = self._reset_at = None
+                    break
+                self.rate_limit_waits += 1
+                print(f"  ⏳ Twitter rate limit reached; waiting {wait:.1f}s for the window to reset")
+                await asyncio.sleep(wait + RESET_MARGIN)
+            if self._remaining is not None:
+                self._remaining -= 1
+
+    def _update_window(self, headers, throttled=False):
+        remaining, reset = headers.get('x-rate-limit-remaining'), headers.get('x-rate-limit-reset')
+        if remaining is None or reset is None:
+            return
+        remaining, reset = int(remaining), float(reset)
+        if throttled:
+            remaining = 0
+        if self._reset_at != reset:
+            # New window: the server's count already covers requests in flight
+            self._remaining, self._reset_at = remaining, reset
+        else:
+            self._remaining = min(self._remaining, remaining)
+
+    async def _request(self, params):
+        url = f"{self.base_url}{SEARCH_PATH}?{urlencode(params)}"
+        for attempt in range(MAX_RETRIES + 1):
+            await self._wait_for_window()
+            async with self._slots:
+                self.total_requests += 1
+                status, headers, body = await asyncio.to_thread(self._fetch, url)
+            self._update_window(headers, throttled=status == 429)
+            if status == 200:
+                return body
+            if status == 429 and self._reset_at is None:
+                await asyncio.sleep(BACKOFF_SECONDS * 2 ** attempt)
+            elif status >= 500:
+                await asyncio.sleep(BACKOFF_SECONDS * 2 ** attempt)
+            elif status != 429:
+                raise TwitterAPIError(status, body)
+        raise TwitterAPIError(status, body)
+
+    async def iter_pages(self, hashtag, max_results=None, days=DEFAULT_DAYS, concurrency=DEFAULT_CONCURRENCY,
+                         slices=None, page_size=PAGE_SIZE):
+        """
+        Page recent-search results for a hashtag concurrently
+
+        Args:
+            hashtag: Hashtag to search for (without #)
+            max_results: Stop after this many tweets (None = all)
+            days: Search period (the recent-search API covers 7 days)
+            concurrency: Requests in flight at once
+            slices: Time slices paged side by side (default: 2 x concurrency)
+            page_size: Tweets per request (10-100)
+
+        Yields:
+            One DataFrame of TWEET_COLUMNS per page, as pages arrive
+        """
+        self._window_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._remaining = self._reset_at = None
+        pages = asyncio.Queue(maxsize=QUEUE_PAGES)
+        collected = 0
+
+        async def page_slice(start_time, end_time):
+            nonlocal collected
+            params = {
+                'query': f'#{hashtag}', 'max_results': min(100, max(10, page_size)),
+                'start_time': start_time, 'end_time': end_time,
+                'tweet.fields': TWEET_FIELDS, 'expansions': 'author_id', 'user.fields': 'username,name',
+            }
+            while max_results is None or collected < max_results:
+                body = await self._request(params)
+                frame = tweets_frame(body, hashtag)
+                if max_results is not None:
+                    frame = frame.iloc[:max_results - collected]
+                collected += len(frame)
+                if len(frame):
+                    await pages.put(frame)
+                token = body.get('meta', {}).get('next_token')
+                if not token:
+                    return
+                params['next_token'] = token
+
+        async def run_all():
+            try:
+                await asyncio.gather(*(page_slice(a, b) for a, b in time_slices(days, slices or 2 * concurrency)))
+                await pages.put(None)
+            except Exception as e:
+                await pages.put(e)
+
+        runner = asyncio.create_task(run_all())
+        try:
+            while True:
+                item = await pages.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            runner.cancel()
+
+    def stream(self, hashtag, max_results=None, days=DEFAULT_DAYS, concurrency=DEFAULT_CONCURRENCY, slices=None):
+        """
+        Stream tweets for a hashtag (collectors.py interface)
+
+        Runs iter_pages() on an event loop in a background thread. At most
+        QUEUE_PAGES pages wait for the consumer: the thread blocks on a full
+        queue, which pauses the event loop and so the requests in flight.
+
+        Yields:
+            One DataFrame of TWEET_COLUMNS per page
+        """
+        max_results = max_results or None
+        pages = queue.Queue(maxsize=QUEUE_PAGES)
+        stop = threading.Event()
+
+        async def produce():
+            async for page in self.iter_pages(hashtag, max_results=max_results, days=days,
+                                              concurrency=concurrency, slices=slices):
+                pages.put(page)
+                if stop.is_set():
+                    break
+
+        def run():
+            try:
+                asyncio.run(produce())
+                pages.put(None)
+            except Exception as e:
+                pages.put(e)
+
+        print(f"\n🐦 Searching recent tweets for #{hashtag} "
+              f"(last {days} days, {concurrency} requests in flight)")
+        threading.Thread(target=run, name='twitter-pages', daemon=True).start()
+        finished = False
+        try:
+            while not finished:
+                item = pages.get()
+                finished = item is None or isinstance(item, Exception)
+                if isinstance(item, Exception):
+                    raise item
+                if item is not None:
+                    yield item
+        finally:
+            # Let the thread finish if the consumer stopped early
+            stop.set()
+            while not finished:
+                item = pages.get()
+                finished = item is None or isinstance(item, Exception)
+        print(f"  Twitter: {self.total_requests} API requests, {self.rate_limit_waits} rate-limit waits")
+
+    def get_tweets_by_hashtag(self, hashtag, max_results=None, **kwargs):
+        """Collect tweets for a hashtag into one DataFrame"""
+        import pandas as pd
+
+        pages = list(self.stream(hashtag, max_results=max_results, **kwargs))
+        return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame(columns=TWEET_COLUMNS)
+
+
+def main(argv=None):
+    """Command-line interface for Twitter collector"""
+    parser = argparse.ArgumentParser(
+        description="Collect recent tweets matching a hashtag",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s python --max-results 500
+  %(prog)s ai --days 2 --concurrency 8
+        """
+    )
+    parser.add_argument("hashtag", help="Hashtag to search for (without #)")
+    parser.add_argument("--bearer-token", help="Twitter bearer token (overrides .env)")
+    parser.add_argument("--base-url", help=f"API root (default: {config.TWITTER_API_URL})")
+    parser.add_argument("--max-results", type=int, default=config.DEFAULT_MAX_RESULTS,
+                        help=f"Maximum tweets to collect (0 = all; default: {config.DEFAULT_MAX_RESULTS})")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Search period in days (max 7)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Requests in flight at once")
+    parser.add_argument("--output", help="Output CSV file (default: twitter_[hashtag]_[timestamp].csv)")
+    parser.add_argument("--output-dir", default=config.OUTPUT_DIR, help=f"Output directory (default: {config.OUTPUT_DIR})")
+    args = parser.parse_args(argv)
+
+    if args.concurrency <= 0:
+        parser.error("--concurrency must be positive")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    try:
+        collector = TwitterCollector(bearer_token=args.bearer_token, base_url=args.base_url)
+        start = time.perf_counter()
+        df = collector.get_tweets_by_hashtag(args.hashtag, max_results=args.max_results, days=args.days,
+                                             concurrency=args.concurrency)
+        elapsed = time.perf_counter() - start
+
+        if not df.empty:
+            filename = args.output or os.path.join(
+                args.output_dir, f"twitter_{args.hashtag}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+            df.to_csv(filename, index=False, encoding='utf-8')
+            print(f"\n✅ Saved {len(df)} tweets to {filename} ({len(df) / max(elapsed, 1e-9):,.0f} tweets/s)")
+        else:
+            print("\n❌ No tweets collected.")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 """
 Utility functions for social media collection
+pandas is imported by the functions that need it, so the summary command's
+--help stays fast.
 """
 
-import pandas as pd
 import json
 import csv
 from datetime import datetime
@@ -11,6 +12,8 @@ from pathlib import Path
 
 def save_to_csv(data, filename):
     """Save data to CSV file"""
+    import pandas as pd
+
     if isinstance(data, pd.DataFrame):
         data.to_csv(filename, index=False, encoding='utf-8')
     elif isinstance(data, list):
@@ -29,6 +32,8 @@ def save_to_json(data, filename):
 
 def read_csv(filename):
     """Read CSV file into DataFrame"""
+    import pandas as pd
+
     return pd.read_csv(filename, encoding='utf-8')
 
 def read_json(filename):
@@ -107,6 +112,8 @@ def generate_summary(df, platform):
 
 def merge_datasets(files, output_file):
     """Merge multiple CSV files into one"""
+    import pandas as pd
+
     dataframes = []
     
     for file in files:
@@ -125,4 +132,46 @@ def merge_datasets(files, output_file):
         return merged_df
     else:
         print("❌ No data to merge")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+
+def main(argv=None):
+    """Print generate_summary() for collected data files"""
+    import argparse
+    import glob
+    from comment_dataset import is_derived_output
+    from config import config
+
+    parser = argparse.ArgumentParser(description="Summarize collected data files")
+    parser.add_argument("files", nargs='*', help="CSV files (default: the collected files in OUTPUT_DIR)")
+    args = parser.parse_args(argv)
+
+    files = args.files
+    if not files:
+        # Collector output only, not the analysis results written next to it
+        files = sorted(path for pattern in ('youtube_*.csv', 'twitter_*.csv', 'social_media_*.csv')
+                       for path in glob.glob(str(Path(config.OUTPUT_DIR) / pattern))
+                       if not is_derived_output(path))
+    if not files:
+        print(f"❌ No collected files in {config.OUTPUT_DIR}/")
+        return []
+
+    summaries = []
+    for file in files:
+        df = read_csv(file)
+        if 'platform' in df.columns and df['platform'].notna().any():
+            platforms = df['platform'].dropna().unique()
+        else:
+            platforms = [Path(file).name.split('_')[0]]
+        print(f"\n{file}")
+        for platform in platforms:
+            rows = df[df['platform'] == platform] if 'platform' in df.columns else df
+            summary = generate_summary(rows, str(platform))
+            summaries.append(summary)
+            for key, value in summary.items():
+                print(f"  {key}: {value:,.2f}" if isinstance(value, float) else f"  {key}: {value}")
+    return summaries
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Vectorized VADER-compatible sentiment scorer
+Tokenizes a whole column at once, looks tokens up in the VADER lexicon via a
+precomputed vocabulary index, and applies VADER's heuristics with array
+operations over the flat token stream instead of one Python loop per word.
+
+Parity with SentimentIntensityAnalyzer.polarity_scores()["compound"]:
+  * Implemented: lexicon valence, emoji descriptions, "no" handling, ALL-CAPS
+    emphasis, boosters/dampeners (with distance decay), negation words and
+    "n't" (up to three words back), "never so/this", "without doubt",
+    special-case idioms and bigram boosters, "least", the "but" shift,
+    "kind of" and punctuation emphasis (! and ?).
+  * Tolerance: compound scores match VADER to within COMPOUND_TOLERANCE.
+    VADER's "but" check rescales scores found with list.index(), which
+    misfires when two values in a text collide; texts containing "but" go
+    through a short per-text replica of that loop so they match too.
+"""
+
+import string
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from vaderSentiment.vaderSentiment import (
+    BOOSTER_DICT, C_INCR, N_SCALAR, NEGATE, SPECIAL_CASES, SentimentIntensityAnalyzer,
+)
+
+# Max absolute compound difference from VADER (both round to 4 d.p.)
+COMPOUND_TOLERANCE = 1e-4
+
+_NEGATE = frozenset(NEGATE)
+_BOOSTERS = {word: value for word, value in BOOSTER_DICT.items() if ' ' not in word}
+_BOOSTER_NGRAMS = pd.Series({word: value for word, value in BOOSTER_DICT.items() if ' ' in word})
+_SPECIAL_CASES = pd.Series(SPECIAL_CASES, dtype=np.float64)
+_IDIOM_WORDS = sorted({w for phrase in (*SPECIAL_CASES, *_BOOSTER_NGRAMS.index) for w in phrase.split()})
+
+
+def _vader_but_shift(sentiments, but_index):
+    """Replica of VADER's _but_check loop, including its list.index() lookups"""
+    for sentiment in sentiments:
+        si = sentiments.index(sentiment)
+        if si < but_index:
+            sentiments[si] = sentiment * 0.5
+        elif si > but_index:
+            sentiments[si] = sentiment * 1.5
+    return sentiments
+
+
+def _strip_punc_if_word(token):
+    """Same rule as SentiText._strip_punc_if_word"""
+    stripped = token.strip(string.punctuation)
+    if len(stripped) <= 2:
+        return token
+    return stripped
+
+
+class VectorizedVader:
+    def __init__(self, analyzer=None):
+        """
+        Build the vocabulary index from a VADER analyzer's lexicons
+
+        Args:
+            analyzer: SentimentIntensityAnalyzer to copy lexicons from (default: a new one)
+        """
+        analyzer = analyzer or SentimentIntensityAnalyzer()
+
+        self.vocab = pd.Index(list(analyzer.lexicon), dtype=object)
+        self.valences = np.array(list(analyzer.lexicon.values()), dtype=np.float64)
+        self.booster_vocab = pd.Index(list(_BOOSTERS), dtype=object)
+        self.booster_values = np.array(list(_BOOSTERS.values()), dtype=np.float64)
+
+        # VADER swaps single-character emojis for their description; a leading
+        # space gives the same tokens after whitespace splitting
+        self.emoji_table = str.maketrans({
+            emoji: ' ' + description
+            for emoji, description in analyzer.emojis.items() if len(emoji) == 1
+        })
+
+    def tokenize(self, texts):
+        """
+        Tokenize a column of texts the way VADER's SentiText does
+
+        Punctuation stripping and case handling run once per distinct token,
+        not once per occurrence.
+
+        Returns:
+            Tuple (texts, codes, vocabulary, lengths): emoji-expanded texts,
+            the flat token stream as codes into the distinct-token vocabulary,
+            and the token count of each text
+        """
+        # Emoji lexicon entries are all non-ASCII, so ASCII texts skip translate()
+        texts = [str(text) for text in texts]
+        texts = [text if text.isascii() else text.translate(self.emoji_table) for text in texts]
+        words = [text.split() for text in texts]
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+
+        raw_codes, raw_tokens = pd.factorize(
+            np.fromiter(chain.from_iterable(words), dtype=object, count=int(lengths.sum()))
+        )
+        # Strip surrounding punctuation unless that leaves <= 2 chars (emoticons)
+        stripped = [_strip_punc_if_word(token) for token in raw_tokens]
+        token_codes, vocabulary = pd.factorize(np.array(stripped, dtype=object))
+        codes = token_codes[raw_codes] if len(raw_codes) else raw_codes
+        return texts, codes, np.asarray(vocabulary, dtype=object), lengths
+
+    @staticmethod
+    def _apply_idioms(valence, sel, words, word, prev_word, next_word, remaining):
+        """VADER's _special_idioms_check for the selected token positions (in place)"""
+        if not len(sel):
+            return
+        w0 = words[word[sel]]
+        w1, w2, w3 = (words[prev_word[k][sel]] for k in (1, 2, 3))
+        onezero = w1 + ' ' + w0
+        twoone = w2 + ' ' + w1
+        twoonezero = twoone + ' ' + w0
+        threetwo = w3 + ' ' + w2
+        threetwoone = threetwo + ' ' + w1
+        zeroone = w0 + ' ' + words[next_word[1][sel]]
+        zeroonetwo = zeroone + ' ' + words[next_word[2][sel]]
+
+        values = valence[sel]
+        matched = np.zeros(len(sel), dtype=bool)
+        # The first preceding sequence that is an idiom wins...
+        for seq in (onezero, twoonezero, twoone, threetwoone, threetwo):
+            hit = ~matched & np.isin(seq, _SPECIAL_CASES.index)
+            values[hit] = _SPECIAL_CASES.reindex(seq[hit]).to_numpy()
+            matched |= hit
+        # ...but idioms starting at the word itself override it
+        for seq, min_remaining in ((zeroone, 1), (zeroonetwo, 2)):
+            hit = (remaining[sel] >= min_remaining) & np.isin(seq, _SPECIAL_CASES.index)
+            values[hit] = _SPECIAL_CASES.reindex(seq[hit]).to_numpy()
+        # Bigram boosters such as "sort of" / "kind of"
+        for seq in (threetwoone, threetwo, twoone):
+            values = values + _BOOSTER_NGRAMS.reindex(seq).fillna(0.0).to_numpy()
+        valence[sel] = values
+
+    def compound_scores(self, texts):
+        """
+        Score a batch of texts
+
+        Args:
+            texts: Iterable of texts (non-strings are scored as str(text))
+
+        Returns:
+            float64 array of compound scores in input order
+        """
+        texts, codes, vocabulary, lengths = self.tokenize(texts)
+        n_docs, n_tokens = len(lengths), len(codes)
+        if n_tokens == 0:
+            return np.zeros(n_docs)
+
+        doc = np.repeat(np.arange(n_docs), lengths)
+        starts = np.cumsum(lengths) - lengths
+        pos = np.arange(n_tokens) - starts[doc]
+        remaining = lengths[doc] - pos - 1
+
+        # Per distinct token: case, then per distinct lowercase word: lookups
+        is_upper = np.array([token.isupper() for token in vocabulary], dtype=bool)[codes]
+        lower_codes, lower_words = pd.factorize(np.array([t.lower() for t in vocabulary], dtype=object))
+        lower_words = np.asarray(lower_words, dtype=object)
+        word = lower_codes[codes]
+
+        lex_idx = self.vocab.get_indexer(lower_words)
+        in_lex = (lex_idx >= 0)[word]
+        lex_val = np.where(lex_idx >= 0, self.valences[lex_idx], 0.0)[word]
+
+        booster_idx = self.booster_vocab.get_indexer(lower_words)
+        is_booster = (booster_idx >= 0)[word]
+        booster_val = np.where(booster_idx >= 0, self.booster_values[booster_idx], 0.0)[word]
+
+        negation = np.array([w in _NEGATE or "n't" in w for w in lower_words], dtype=bool)[word]
+
+        upper_count = np.bincount(doc, weights=is_upper, minlength=n_docs)
+        cap_diff = (lengths - upper_count > 0) & (upper_count > 0)
+        cap_emphasis = is_upper & cap_diff[doc]
+
+        # Fixed words compare as integer ids; -2 = not in this batch, -1 = no neighbour
+        word_index = {w: i for i, w in enumerate(lower_words)}
+
+        def wid(*words):
+            return [word_index.get(w, -2) for w in words]
+
+        def prev(values, k, fill):
+            out = np.full(n_tokens, fill, dtype=values.dtype)
+            out[k:] = values[:-k]
+            out[pos < k] = fill
+            return out
+
+        def nxt(values, k, fill):
+            out = np.full(n_tokens, fill, dtype=values.dtype)
+            out[:-k] = values[k:]
+            out[remaining < k] = fill
+            return out
+
+        prev_word = {k: prev(word, k, -1) for k in (1, 2, 3)}
+        prev_in_lex = {k: prev(in_lex, k, True) for k in (1, 2, 3)}
+        prev_booster = {k: prev(booster_val, k, 0.0) for k in (1, 2, 3)}
+        prev_is_booster = {k: prev(is_booster, k, False) for k in (1, 2, 3)}
+        prev_cap = {k: prev(cap_emphasis, k, False) for k in (1, 2, 3)}
+        prev_negation = {k: prev(negation, k, False) for k in (1, 2, 3)}
+        next_word = {k: nxt(word, k, -1) for k in (1, 2)}
+        next_in_lex = nxt(in_lex, 1, False)
+
+        no, kind, of, never, without, doubt, least, but = wid(
+            'no', 'kind', 'of', 'never', 'without', 'doubt', 'least', 'but')
+
+        # Tokens that carry a valence: lexicon words that aren't modifiers
+        scored = in_lex & ~is_booster & ~((word == kind) & (next_word[1] == of))
+        valence = lex_val.copy()
+
+        # "no" before a lexicon word negates it instead of scoring on its own
+        valence[(word == no) & next_in_lex] = 0.0
+        after_no = (
+            (prev_word[1] == no) | (prev_word[2] == no)
+            | ((prev_word[3] == no) & np.isin(prev_word[1], wid('or', 'nor')))
+        )
+        valence = np.where(after_no, lex_val * N_SCALAR, valence)
+
+        # ALL-CAPS emphasis when the text mixes caps and lowercase
+        valence = np.where(cap_emphasis, np.where(valence > 0, valence + C_INCR, valence - C_INCR), valence)
+
+        so_this = {k: np.isin(prev_word[k], wid('so', 'this')) for k in (1, 2)}
+        for start_i, decay in ((0, 1.0), (1, 0.95), (2, 0.9)):
+            k = start_i + 1
+            active = (pos > start_i) & ~prev_in_lex[k]
+
+            scalar = np.where(valence < 0, -prev_booster[k], prev_booster[k])
+            caps_bonus = prev_is_booster[k] & prev_cap[k]
+            scalar = np.where(caps_bonus, np.where(valence > 0, scalar + C_INCR, scalar - C_INCR), scalar)
+            valence = np.where(active, valence + scalar * decay, valence)
+
+            if start_i == 0:
+                negate = active & prev_negation[1]
+                boost = np.zeros(n_tokens, dtype=bool)
+            elif start_i == 1:
+                boost = active & (prev_word[2] == never) & so_this[1]
+                keep = active & (prev_word[2] == without) & (prev_word[1] == doubt)
+                negate = active & ~boost & ~keep & prev_negation[2]
+            else:
+                boost = active & (((prev_word[3] == never) & so_this[2]) | so_this[1])
+                keep = active & (prev_word[3] == without) & (
+                    (prev_word[2] == doubt) | (prev_word[1] == doubt))
+                negate = active & ~boost & ~keep & prev_negation[3]
+            valence = np.where(boost, valence * 1.25, valence)
+            valence = np.where(negate, valence * N_SCALAR, valence)
+
+            if start_i == 2:
+                # Only windows that contain an idiom word can match an idiom
+                idiom_ids = wid(*_IDIOM_WORDS)
+                window = np.isin(word, idiom_ids)
+                for codes_k in (*prev_word.values(), *next_word.values()):
+                    window |= np.isin(codes_k, idiom_ids)
+                # Index -1 (no neighbour) maps to the appended empty string
+                self._apply_idioms(
+                    valence, np.flatnonzero(active & scored & window),
+                    np.append(lower_words, ''), word, prev_word, next_word, remaining,
+                )
+
+        # "least" negates unless it is "at least" / "very least"
+        least_mask = ~prev_in_lex[1] & (prev_word[1] == least)
+        least_mask &= (pos == 1) | ~np.isin(prev_word[2], wid('at', 'very'))
+        valence = np.where(least_mask & (pos > 0), valence * N_SCALAR, valence)
+
+        sentiment = np.where(scored, valence, 0.0)
+
+        # "but": halve sentiment before the first "but", boost it after
+        no_but = np.iinfo(np.int64).max
+        first_but = np.full(n_docs, no_but)
+        np.minimum.at(first_but, doc, np.where(word == but, pos, no_but))
+        for d in np.flatnonzero(first_but != no_but):
+            start, end = starts[d], starts[d] + lengths[d]
+            sentiment[start:end] = _vader_but_shift(sentiment[start:end].tolist(), first_but[d])
+
+        sum_s = np.bincount(doc, weights=sentiment, minlength=n_docs)
+
+        # Punctuation emphasis
+        ep_count = np.minimum(np.fromiter((t.count('!') for t in texts), dtype=np.int64, count=n_docs), 4)
+        qm_count = np.fromiter((t.count('?') for t in texts), dtype=np.int64, count=n_docs)
+        qm_amp = np.where(qm_count > 1, np.where(qm_count <= 3, qm_count * 0.18, 0.96), 0.0)
+        amplifier = ep_count * 0.292 + qm_amp
+        sum_s = sum_s + np.sign(sum_s) * amplifier
+
+        compound = np.clip(sum_s / np.sqrt(sum_s * sum_s + 15), -1.0, 1.0)
+        compound[lengths == 0] = 0.0
+        return np.round(compound, 4)
@@ -7,23 +7,27 @@ Now uses config.py for API keys
 import os
 import sys
 import argparse
-import pandas as pd
-import time
 from datetime import datetime
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 # Import configuration
 from config import config
+from collectors import RateLimiter
+import memory
+import profiling
 
 
 class YouTubeCollector:
-    def __init__(self, api_key=None):
+    platform = 'youtube'
+
+    def __init__(self, api_key=None, rate_limiter=None):
         """
         Initialize YouTube collector
         
         Args:
             api_key: YouTube Data API v3 key (optional, uses config if not provided)
+            rate_limiter: RateLimiter pacing the API requests (default: one
+                request per config.YOUTUBE_REQUEST_DELAY seconds)
         """
         # Use provided API key or get from config
         self.api_key = api_key or config.YOUTUBE_API_KEY
@@ -34,26 +38,33 @@ class YouTubeCollector:
                 "Set it in .env file or provide via --api-key"
             )
         
+        # The API client (and pandas, below) are imported on first use so the
+        # CLI starts quickly
+        from googleapiclient.discovery import build
         self.youtube = build('youtube', 'v3', developerKey=self.api_key)
         self.total_requests = 0
         self.request_delay = config.YOUTUBE_REQUEST_DELAY
+        self.rate_limiter = rate_limiter or RateLimiter.from_delay(self.request_delay)
     
     def _make_request(self, request_func, **kwargs):
         """Helper method to make API requests with rate limiting"""
         self.total_requests += 1
         
         # Rate limiting
-        time.sleep(self.request_delay)
+        if self.rate_limiter:
+            with profiling.stage('rate_limit_wait'):
+                self.rate_limiter.acquire()
         
         # Log every 10th request
         if self.total_requests % 10 == 0:
             print(f"  Made {self.total_requests} API requests...")
         
-        return request_func(**kwargs).execute()
+        with profiling.stage('api_request'):
+            return request_func(**kwargs).execute()
     
-    def search_videos_by_hashtag(self, hashtag, max_videos=50):
+    def search_videos_by_hashtag(self, hashtag, max_videos=50, order='relevance'):
         """
-        Search for videos containing a specific hashtag
+        Search for videos containing a specific hashtag (order: 'relevance' or 'date')
         """
         print(f"Searching for videos with hashtag: #{hashtag}")
         
@@ -64,7 +75,7 @@ class YouTubeCollector:
                 part='snippet',
                 type='video',
                 maxResults=min(50, max_videos),
-                order='relevance'
+                order=order
             )
             
             video_ids = []
@@ -123,88 +134,110 @@ class YouTubeCollector:
             print(f"Error getting video details: {e}")
             return {}
     
-    def get_video_comments(self, video_id, max_comments=100, include_replies=None):
+    def fetch_comment_page(self, video_id, page_token=None, max_results=100, include_replies=None, video_info=None):
         """
-        Get comments for a specific video
+        Fetch one page of a video's comment threads, newest first
+
+        Unlike iter_video_comments(), API errors are raised to the caller.
+
+        Args:
+            page_token: nextPageToken of the previous page (None = newest page)
+            video_info: get_video_details() entry for the video metadata columns
+
+        Returns:
+            Tuple (comments, next page token or None after the last page)
         """
-        # Use config default if not specified
         if include_replies is None:
             include_replies = config.INCLUDE_REPLIES
-        
+        video_info = video_info or {}
+        params = {'pageToken': page_token} if page_token else {}
+        response = self._make_request(
+            self.youtube.commentThreads().list,
+            part='snippet,replies',
+            videoId=video_id,
+            maxResults=min(100, max_results),
+            order='time',
+            textFormat='plainText',
+            **params
+        )
         comments_data = []
         
-        try:
-            video_details = self.get_video_details([video_id])
-            video_info = video_details.get(video_id, {})
+        with profiling.stage('build_rows') as build:
+            for item in response.get('items', []):
+                comment = item['snippet']['topLevelComment']['snippet']
             
-            request = self.youtube.commentThreads().list(
-                part='snippet,replies',
-                videoId=video_id,
-                maxResults=min(100, max_comments),
-                textFormat='plainText'
-            )
+                comments_data.append({
+                    'platform': 'YouTube',
+                    'video_id': video_id,
+                    'video_title': video_info.get('title', 'Unknown'),
+                    'video_views': video_info.get('views', 0),
+                    'channel_title': video_info.get('channel_title', 'Unknown'),
+                    'comment_id': item['id'],
+                    'parent_id': '',
+                    'author': comment['authorDisplayName'],
+                    'text': comment['textDisplay'],
+                    'likes': comment.get('likeCount', 0),
+                    'published_at': comment['publishedAt'],
+                    'updated_at': comment.get('updatedAt', ''),
+                    'is_reply': False,
+                    'collected_at': datetime.now().isoformat(),
+                    'hashtag_query': f'#{self.current_hashtag}' if hasattr(self, 'current_hashtag') else ''
+                })
             
-            while request and len(comments_data) < max_comments:
-                response = self._make_request(lambda: request)
-                
-                for item in response.get('items', []):
-                    comment = item['snippet']['topLevelComment']['snippet']
-                    
-                    comments_data.append({
-                        'platform': 'YouTube',
-                        'video_id': video_id,
-                        'video_title': video_info.get('title', 'Unknown'),
-                        'video_views': video_info.get('views', 0),
-                        'channel_title': video_info.get('channel_title', 'Unknown'),
-                        'comment_id': item['id'],
-                        'parent_id': '',
-                        'author': comment['authorDisplayName'],
-                        'text': comment['textDisplay'],
-                        'likes': comment.get('likeCount', 0),
-                        'published_at': comment['publishedAt'],
-                        'updated_at': comment.get('updatedAt', ''),
-                        'is_reply': False,
-                        'collected_at': datetime.now().isoformat(),
-                        'hashtag_query': f'#{self.current_hashtag}' if hasattr(self, 'current_hashtag') else ''
-                    })
-                    
-                    if include_replies and 'replies' in item:
-                        for reply in item['replies']['comments']:
-                            reply_snippet = reply['snippet']
-                            
-                            comments_data.append({
-                                'platform': 'YouTube',
-                                'video_id': video_id,
-                                'video_title': video_info.get('title', 'Unknown'),
-                                'video_views': video_info.get('views', 0),
-                                'channel_title': video_info.get('channel_title', 'Unknown'),
-                                'comment_id': reply['id'],
-                                'parent_id': item['id'],
-                                'author': reply_snippet['authorDisplayName'],
-                                'text': reply_snippet['textDisplay'],
-                                'likes': reply_snippet.get('likeCount', 0),
-                                'published_at': reply_snippet['publishedAt'],
-                                'updated_at': reply_snippet.get('updatedAt', ''),
-                                'is_reply': True,
-                                'collected_at': datetime.now().isoformat(),
-                                'hashtag_query': f'#{self.current_hashtag}' if hasattr(self, 'current_hashtag') else ''
-                            })
+                if include_replies and 'replies' in item:
+                    for reply in item['replies']['comments']:
+                        reply_snippet = reply['snippet']
                     
-                    if len(comments_data) >= max_comments:
+                        comments_data.append({
+                            'platform': 'YouTube',
+                            'video_id': video_id,
+                            'video_title': video_info.get('title', 'Unknown'),
+                            'video_views': video_info.get('views', 0),
+                            'channel_title': video_info.get('channel_title', 'Unknown'),
+                            'comment_id': reply['id'],
+                            'parent_id': item['id'],
+                            'author': reply_snippet['authorDisplayName'],
+                            'text': reply_snippet['textDisplay'],
+                            'likes': reply_snippet.get('likeCount', 0),
+                            'published_at': reply_snippet['publishedAt'],
+                            'updated_at': reply_snippet.get('updatedAt', ''),
+                            'is_reply': True,
+                            'collected_at': datetime.now().isoformat(),
+                            'hashtag_query': f'#{self.current_hashtag}' if hasattr(self, 'current_hashtag') else ''
+                        })
+            build.rows = len(comments_data)
+        
+        return comments_data, response.get('nextPageToken')
+    
+    def iter_video_comments(self, video_id, max_comments=100, include_replies=None, video_info=None):
+        """
+        Yield comments for a specific video, one list per API page
+
+        Threads come newest first. Pass video_info (a get_video_details()
+        entry) to skip the details request when it is already known.
+        """
+        collected = 0
+        page_token = None
+        
+        try:
+            if video_info is None:
+                video_info = self.get_video_details([video_id]).get(video_id, {})
+            
+            while collected < max_comments:
+                comments_data, page_token = self.fetch_comment_page(
+                    video_id, page_token, max_comments - collected, include_replies, video_info
+                )
+                # Stop after the thread (and its replies) that reaches max_comments
+                for index, comment in enumerate(comments_data):
+                    if index >= max_comments - collected and not comment['is_reply']:
+                        comments_data = comments_data[:index]
                         break
                 
-                if 'nextPageToken' in response and len(comments_data) < max_comments:
-                    request = self.youtube.commentThreads().list(
-                        part='snippet,replies',
-                        videoId=video_id,
-                        pageToken=response['nextPageToken'],
-                        maxResults=min(100, max_comments - len(comments_data)),
-                        textFormat='plainText'
-                    )
-                else:
-                    request = None
-            
-            return comments_data
+                collected += len(comments_data)
+                yield comments_data
+                
+                if not page_token:
+                    break
             
         except HttpError as e:
             if e.resp.status == 403 and 'commentsDisabled' in str(e):
@@ -213,11 +246,20 @@ class YouTubeCollector:
                 print(f"Video {video_id} not found")
             else:
                 print(f"Error fetching comments: {e}")
-            return comments_data
     
-    def get_comments_by_hashtag(self, hashtag, max_comments=None, max_videos=None, include_replies=None):
+    def get_video_comments(self, video_id, max_comments=100, include_replies=None):
         """
-        Main method to get comments from videos matching a hashtag
+        Get comments for a specific video
+        """
+        return [comment for page in self.iter_video_comments(video_id, max_comments, include_replies)
+                for comment in page]
+    
+    def stream(self, hashtag, max_comments=None, max_videos=None, include_replies=None):
+        """
+        Stream comments from videos matching a hashtag (collectors.py interface)
+        
+        Yields:
+            One DataFrame per page of comments, as soon as it is fetched
         """
         # Use config defaults if not specified
         max_comments = max_comments or config.DEFAULT_MAX_RESULTS
@@ -234,31 +276,47 @@ class YouTubeCollector:
         print(f"Include replies: {include_replies}")
         print('='*60)
         
-        all_comments = []
+        import pandas as pd
+
+        total = 0
         
         video_ids = self.search_videos_by_hashtag(hashtag, max_videos)
         
         if not video_ids:
             print("No videos found for the given hashtag.")
-            return pd.DataFrame()
+            return
         
         for i, video_id in enumerate(video_ids[:max_videos]):
             print(f"\nProcessing video {i+1}/{min(len(video_ids), max_videos)} (ID: {video_id})")
             
-            comments = self.get_video_comments(
+            collected = 0
+            for page in self.iter_video_comments(
                 video_id=video_id,
-                max_comments=max_comments - len(all_comments),
+                max_comments=max_comments - total,
                 include_replies=include_replies
-            )
+            ):
+                collected += len(page)
+                if page:
+                    with profiling.stage('dataframe', rows=len(page)):
+                        frame = pd.DataFrame(page)
+                    yield frame
             
-            all_comments.extend(comments)
-            print(f"  Collected {len(comments)} comments (Total: {len(all_comments)})")
+            total += collected
+            print(f"  Collected {collected} comments (Total: {total})")
             
-            if len(all_comments) >= max_comments:
+            if total >= max_comments:
                 print(f"Reached maximum comments limit ({max_comments})")
                 break
-        
-        df = pd.DataFrame(all_comments)
+    
+    def get_comments_by_hashtag(self, hashtag, max_comments=None, max_videos=None, include_replies=None):
+        """
+        Main method to get comments from videos matching a hashtag
+        """
+        import pandas as pd
+
+        pages = list(self.stream(hashtag, max_comments, max_videos, include_replies))
+        with profiling.stage('concat'):
+            df = pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
         
         print(f"\n{'='*60}")
         print(f"Collection complete!")
@@ -269,7 +327,28 @@ class YouTubeCollector:
         return df
 
 
-def main():
+def write_pages(pages, filename):
+    """
+    Write DataFrame pages to one CSV as they arrive
+
+    Returns:
+        Rows written (the file is only created once a page arrives)
+    """
+    rows = 0
+    columns = None
+    for page in pages:
+        with profiling.stage('write_csv', rows=len(page)):
+            if columns is None:
+                columns = list(page.columns)
+                page.to_csv(filename, index=False, encoding='utf-8')
+            else:
+                page.reindex(columns=columns).to_csv(filename, index=False, header=False, mode='a',
+                                                     encoding='utf-8')
+        rows += len(page)
+    return rows
+
+
+def main(argv=None):
     """Command-line interface for YouTube collector"""
     parser = argparse.ArgumentParser(
         description="Collect YouTube comments from videos matching a hashtag",
@@ -334,8 +413,11 @@ Examples:
         action="store_true",
         help="Enable verbose output"
     )
+    profiling.add_arguments(parser)
+    memory.add_arguments(parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    memory.apply(args, parser)
     
     # Print config summary
     config.print_config_summary()
@@ -344,33 +426,51 @@ Examples:
     os.makedirs(args.output_dir, exist_ok=True)
     
     try:
-        # Initialize collector
-        collector = YouTubeCollector(api_key=args.api_key)
-        
-        # Collect comments
-        df = collector.get_comments_by_hashtag(
-            hashtag=args.hashtag,
-            max_comments=args.max_comments,
-            max_videos=args.max_videos,
-            include_replies=args.include_replies
-        )
+        with profiling.session(args, 'youtube_collector', argv):
+            # Initialize collector
+            collector = YouTubeCollector(api_key=args.api_key)
         
-        # Save results
-        if not df.empty:
-            if args.output:
-                filename = args.output
-            else:
+            if memory.budget():
+                # Append each page as it arrives instead of holding the whole collection
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = os.path.join(args.output_dir, f"youtube_{args.hashtag}_{timestamp}.csv")
+                filename = args.output or os.path.join(args.output_dir, f"youtube_{args.hashtag}_{timestamp}.csv")
+                rows = write_pages(collector.stream(
+                    hashtag=args.hashtag,
+                    max_comments=args.max_comments,
+                    max_videos=args.max_videos,
+                    include_replies=args.include_replies
+                ), filename)
+                if rows:
+                    print(f"\n✅ Saved {rows} comments to {filename}")
+                else:
+                    print("\n❌ No comments collected.")
+                return
+
+            # Collect comments
+            df = collector.get_comments_by_hashtag(
+                hashtag=args.hashtag,
+                max_comments=args.max_comments,
+                max_videos=args.max_videos,
+                include_replies=args.include_replies
+            )
+        
+            # Save results
+            if not df.empty:
+                if args.output:
+                    filename = args.output
+                else:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    filename = os.path.join(args.output_dir, f"youtube_{args.hashtag}_{timestamp}.csv")
             
-            df.to_csv(filename, index=False, encoding='utf-8')
-            print(f"\n✅ Saved {len(df)} comments to {filename}")
+                with profiling.stage('write_csv', rows=len(df)):
+                    df.to_csv(filename, index=False, encoding='utf-8')
+                print(f"\n✅ Saved {len(df)} comments to {filename}")
             
-            if args.verbose:
-                print("\nFirst 3 comments:")
-                print(df[['author', 'text', 'likes']].head(3).to_string())
-        else:
-            print("\n❌ No comments collected.")
+                if args.verbose:
+                    print("\nFirst 3 comments:")
+                    print(df[['author', 'text', 'likes']].head(3).to_string())
+            else:
+                print("\n❌ No comments collected.")
             
     except Exception as e:
         print(f"\n❌ Error: {e}")
@@ -1,78 +1,83 @@
-import pandas as pd
-import networkx as nx
-import matplotlib.pyplot as plt
-
-# Load sentiment results
-df = pd.read_csv("collected_data/youtube_sentiment_results.csv")
-
-# Create a directed graph
-G = nx.DiGraph()
-
-# Add nodes and edges
-for _, row in df.iterrows():
-    commenter = row["author"]
-    video = f"{row['video_title']} ({row['video_id'][:6]})"  # shorter label
-    
-    # Add nodes
-    G.add_node(commenter, type='author')
-    G.add_node(video, type='video')
-    
-    # Add edge or increase weight if exists
-    if G.has_edge(commenter, video):
-        G[commenter][video]['weight'] += 1
-    else:
-        G.add_edge(commenter, video, weight=1, sentiment=row['sentiment'])
-
-# Basic stats
-print("Number of nodes:", G.number_of_nodes())
-print("Number of edges:", G.number_of_edges())
-
-# Draw a small subgraph for visualization
-# Pick top 20 commenters with most comments
-top_commenters = df['author'].value_counts().head(20).index
-sub_nodes = list(top_commenters) + [v for u, v in G.edges() if u in top_commenters]
-subG = G.subgraph(sub_nodes)
-
-plt.figure(figsize=(12,8))
-pos = nx.spring_layout(subG, k=0.5, seed=42)
-nx.draw(subG, pos, with_labels=True, node_size=500, node_color='skyblue', edge_color='gray', font_size=8)
-plt.title("Commenter-Video Network (Top 20 Commenters)")
-plt.show()
-
-
-# Assuming you already have your graph 'G' and 'df' DataFrame
-# where df has columns: ['author', 'video_title', 'video_id', 'sentiment']
-
-# Create a subgraph if you want to focus on top commenters
-top_commenters = df['author'].value_counts().head(20).index
-sub_nodes = list(top_commenters) + [v for u, v in G.edges() if u in top_commenters]
-subG = G.subgraph(sub_nodes)
-
-# Generate layout
-pos = nx.spring_layout(subG, k=0.5, seed=42)
-
-# Color edges based on sentiment
-edge_colors = []
-for u, v in subG.edges():
-    if 'sentiment' in subG[u][v]:
-        sentiment = subG[u][v]['sentiment']
-        if sentiment == 'positive':
-            edge_colors.append('green')
-        elif sentiment == 'negative':
-            edge_colors.append('red')
+#!/usr/bin/env python3
+"""
+Commenter-video network figures
+Draws the top commenters' subgraph (plain and coloured by sentiment) and a
+density map of the whole engagement graph.
+"""
+
+import argparse
+import os
+import sys
+
+# Add current directory to path
+sys.path.append('.')
+
+from graph_artifacts import DEFAULT_CACHE_DIR, DEFAULT_INPUT, load_graph
+
+OUTPUT_DIR = "collected_data"
+TOP_COMMENTERS = 20
+# Figures written to the output directory
+FIGURES = ['network_top_commenters.png', 'network_sentiment.png', 'network_density.png']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw commenter-video network figures")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="Sentiment results CSV")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Directory for the figures")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Graph artifact cache directory")
+    args = parser.parse_args(argv)
+
+    # networkx and matplotlib are only needed once there is something to draw
+    from engagement_graph import build_digraph
+    from plots import draw_density, draw_network, spectral_layout, spring_layout
+
+    top_path, sentiment_path, density_path = (os.path.join(args.output_dir, name) for name in FIGURES)
+
+    # Load the author -> video graph (edge weight = comment count), cached
+    # alongside the sentiment results and rebuilt only when they change
+    graph = load_graph(args.input, cache_dir=args.cache_dir)
+    edges = graph.edges()
+    comment_counts = edges.groupby('author')['weight'].sum().sort_values(ascending=False, kind='stable')
+
+    # Basic stats, straight from the artifact
+    print("Number of nodes:", graph.meta['authors'] + graph.meta['videos'])
+    print("Number of edges:", len(edges))
+
+    # Draw a small subgraph for visualization
+    # Pick top 20 commenters with most comments; only their edges become a networkx graph
+    top_commenters = comment_counts.head(TOP_COMMENTERS).index
+    subG = build_digraph(edges[edges['author'].isin(top_commenters)])
+
+    # One layout for both figures, cached on disk until the subgraph changes
+    pos = spring_layout(subG, k=0.5, seed=42)
+
+    draw_network(subG, pos, top_path,
+                 title=f"Commenter-Video Network (Top {TOP_COMMENTERS} Commenters)")
+
+    # Color edges based on sentiment
+    edge_colors = []
+    for u, v in subG.edges():
+        if 'sentiment' in subG[u][v]:
+            sentiment = subG[u][v]['sentiment']
+            if sentiment == 'Positive':
+                edge_colors.append('green')
+            elif sentiment == 'Negative':
+                edge_colors.append('red')
+            else:
+                edge_colors.append('gray')
         else:
             edge_colors.append('gray')
-    else:
-        edge_colors.append('gray')
 
-# Draw nodes
-nx.draw_networkx_nodes(subG, pos, node_color='skyblue', node_size=500)
-# Draw edges
-nx.draw_networkx_edges(subG, pos, edge_color=edge_colors, arrows=True)
-# Draw labels
-nx.draw_networkx_labels(subG, pos, font_size=8)
+    draw_network(subG, pos, sentiment_path,
+                 title="YouTube Commenter-Video Network Colored by Sentiment",
+                 edge_colors=edge_colors, arrows=True)
+
+    # Whole graph as a density map: a spectral layout and hexbin cells scale to
+    # 100k+ nodes where drawing one marker per node does not
+    nodes, A = graph.adjacency()
+    draw_density(spectral_layout(A), density_path,
+                 title=f"Commenter-Video Network Density ({len(nodes):,} nodes)")
 
-plt.title("YouTube Commenter-Video Network Colored by Sentiment")
-plt.axis('off')
-plt.show()
 
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,61 @@
-import pandas as pd
-import glob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
 
-# Initialize VADER
-analyzer = SentimentIntensityAnalyzer()
+import memory
+import profiling
+from comment_dataset import COMMENT_DTYPES, DEFAULT_DATA_DIR, CommentDataset, DatasetManifest
+from near_duplicates import DEFAULT_THRESHOLD
+from sentiment_cache import CACHE_NAME, SentimentCache
+
+# VADER analyzer, built on first use so importing this module stays cheap
+analyzer = None
+
+# Batch scorer for the 'vectorized' engine, built on first use
+vectorized_scorer = None
+
+# 'vader' scores one string at a time; 'vectorized' scores whole chunks with
+# array operations and matches VADER within vader_vectorized.COMPOUND_TOLERANCE
+ENGINES = ('vader', 'vectorized')
+
+# Texts handed to each worker task in parallel mode
+DEFAULT_CHUNK_SIZE = 5000
+
+# Rows read, scored and written per step in --stream mode
+DEFAULT_STREAM_ROWS = 50000
+
+OUTPUT_FILE = "collected_data/youtube_sentiment_results.csv"
+
+# Column order of streamed output, so files with different schemas append cleanly
+OUTPUT_COLUMNS = list(COMMENT_DTYPES) + ["source_file", "sentiment_score", "sentiment"]
+
+# Cached scores are only reused for the analyzer version that produced them
+try:
+    ANALYZER_VERSION = f"vaderSentiment-{version('vaderSentiment')}"
+except PackageNotFoundError:
+    ANALYZER_VERSION = "vaderSentiment-unknown"
+
+def analyzer_version(engine='vader'):
+    """Cache key for scores produced by the given engine"""
+    return ANALYZER_VERSION if engine == 'vader' else f"{ANALYZER_VERSION}+{engine}"
+
+def get_analyzer():
+    """The process's VADER analyzer, built on first use"""
+    global analyzer
+    if analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+        analyzer = SentimentIntensityAnalyzer()
+    return analyzer
 
 def get_sentiment_score(text):
-    return analyzer.polarity_scores(str(text))["compound"]
+    return get_analyzer().polarity_scores(str(text))["compound"]
 
 def get_sentiment_label(score):
     if score >= 0.05:
@@ -16,34 +65,466 @@ def get_sentiment_label(score):
     else:
         return "Neutral"
 
-def load_all_youtube_comments():
-    files = glob.glob("collected_data/youtube_*.csv")
-    if not files:
-        raise FileNotFoundError("No YouTube CSV files found in collected_data/")
+def normalize_text(text):
+    """
+    Collapse whitespace so repeated comments share one cache/memo entry
+
+    VADER tokenizes on whitespace, so this never changes a text's score.
+    """
+    return ' '.join(str(text).split())
+
+def _init_worker():
+    """Give each pool process its own analyzer (built on first use) instead of sharing the parent's"""
+    global analyzer, vectorized_scorer
+    analyzer = None
+    vectorized_scorer = None
+
+def _score_chunk(texts, engine='vader'):
+    if engine == 'vectorized':
+        global vectorized_scorer
+        if vectorized_scorer is None:
+            from vader_vectorized import VectorizedVader
+
+            vectorized_scorer = VectorizedVader(get_analyzer())
+        return vectorized_scorer.compound_scores(texts).tolist()
+    return [get_sentiment_score(text) for text in texts]
+
+def score_texts(texts, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, engine='vader', executor=None):
+    """
+    Score texts with VADER, optionally across a process pool
+
+    Args:
+        texts: Iterable of comment texts
+        workers: Number of worker processes (1 = serial, 0 = one per CPU)
+        chunk_size: Number of texts sent to a worker per task
+        engine: 'vader' or 'vectorized'
+        executor: Existing process pool to use instead of starting one
+
+    Returns:
+        List of compound scores in the same order as the input
+    """
+    # Score each distinct text once; spam floods repeat the same few strings
+    memo = {}
+    with profiling.stage('dedupe_texts') as dedupe:
+        codes = [memo.setdefault(normalize_text(text), len(memo)) for text in texts]
+        dedupe.rows = len(codes)
+    distinct = list(memo)
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = memory.fit_workers(workers)
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown sentiment engine: {engine}")
+
+    chunks = [distinct[i:i + chunk_size] for i in range(0, len(distinct), chunk_size)]
+    score_chunk = partial(_score_chunk, engine=engine)
+
+    distinct_scores = []
+    with profiling.stage('score', rows=len(distinct)):
+        if executor is not None and len(chunks) > 1:
+            # map() yields results in submission order, so chunks come back in order
+            for chunk_scores in executor.map(score_chunk, chunks):
+                distinct_scores.extend(chunk_scores)
+        elif workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                distinct_scores.extend(score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                memory.watch_pool(pool)
+                try:
+                    for chunk_scores in pool.map(score_chunk, chunks):
+                        distinct_scores.extend(chunk_scores)
+                finally:
+                    memory.unwatch_pool(pool)
+
+    return [distinct_scores[code] for code in codes]
+
+def score_comments(df, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, cache=None, engine='vader',
+                   executor=None, verbose=True):
+    """
+    Score the 'text' column of a comments DataFrame
+
+    Args:
+        df: Comments with 'text' (and ideally 'comment_id') columns
+        workers: Worker processes, see score_texts()
+        chunk_size: Comments per worker task
+        cache: Optional SentimentCache; only uncached comments are scored
+        engine: 'vader' or 'vectorized'
+        executor: Existing process pool, see score_texts()
+        verbose: Print cache hit counts
+
+    Returns:
+        List of compound scores aligned with df
+    """
+    texts = df["text"].tolist()
+    if cache is None:
+        return score_texts(texts, workers=workers, chunk_size=chunk_size, engine=engine,
+                           executor=executor)
+
+    if "comment_id" in df.columns:
+        comment_ids = df["comment_id"].tolist()
+    else:
+        comment_ids = [None] * len(texts)
+
+    with profiling.stage('cache_lookup', rows=len(texts)):
+        scores = cache.lookup(comment_ids, texts)
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if verbose:
+        print(f"Sentiment cache: {len(texts) - len(missing):,} cached, {len(missing):,} to score")
 
-    dfs = []
-    for f in files:
-        df = pd.read_csv(f)
-        df["source_file"] = f
-        dfs.append(df)
+    if missing:
+        new_scores = score_texts(
+            [texts[i] for i in missing], workers=workers, chunk_size=chunk_size, engine=engine,
+            executor=executor
+        )
+        with profiling.stage('cache_store', rows=len(missing)):
+            cache.store([comment_ids[i] for i in missing], [texts[i] for i in missing], new_scores)
+        for i, score in zip(missing, new_scores):
+            scores[i] = score
 
-    return pd.concat(dfs, ignore_index=True)
+    return scores
 
-def main():
-    df = load_all_youtube_comments()
+def load_all_youtube_comments(data_dir=DEFAULT_DATA_DIR, only_new=False):
+    """
+    Return a lazy CommentDataset over the collected YouTube CSV files
 
-    if "text" not in df.columns:
-        raise KeyError("Expected column 'text' not found in dataset")
+    Derived outputs such as youtube_sentiment_results.csv are excluded.
+    Call .to_frame() or .iter_chunks() to read it, and .commit() to record
+    the files as processed in the manifest.
+    """
+    dataset = DatasetManifest(data_dir).dataset(only_new=only_new)
+    if not dataset.files and not only_new:
+        raise FileNotFoundError(f"No YouTube CSV files found in {data_dir}/")
+    return dataset
 
-    print(f"Loaded {len(df):,} YouTube comments")
+def _load_checkpoint(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_checkpoint(path, state):
+    tmp_path = Path(str(path) + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def stream_sentiment(dataset, output_file=OUTPUT_FILE, partition_dir=None, rows_per_chunk=DEFAULT_STREAM_ROWS,
+                     workers=1, chunk_size=DEFAULT_CHUNK_SIZE, cache=None, engine='vader',
+                     resume=False, append=False):
+    """
+    Score a dataset chunk by chunk, writing results as it goes
+
+    Memory stays bounded by rows_per_chunk; under a memory budget chunks
+    shrink to fit and the worker pool shrinks to the workers that still fit
+    once their size has been measured. After every chunk a checkpoint
+    records the output size and input position, so an interrupted run can
+    continue with resume=True without duplicating or losing rows.
+
+    Args:
+        dataset: CommentDataset to score
+        output_file: CSV to append results to (ignored when partition_dir is set)
+        partition_dir: Write one part-NNNNN.csv per chunk into this directory instead
+        rows_per_chunk: Rows read and scored per step (the upper limit under a memory budget)
+        workers, chunk_size, cache, engine: See score_comments()
+        resume: Continue from the checkpoint of an interrupted run
+        append: Keep existing output (e.g. when scoring only new files)
+
+    Returns:
+        Counter of sentiment labels written in this run (including resumed progress)
+    """
+    if partition_dir:
+        Path(partition_dir).mkdir(exist_ok=True, parents=True)
+        checkpoint_path = Path(partition_dir) / "_checkpoint.json"
+    else:
+        Path(output_file).parent.mkdir(exist_ok=True, parents=True)
+        checkpoint_path = Path(output_file + ".checkpoint.json")
+
+    if resume and checkpoint_path.exists():
+        state = _load_checkpoint(checkpoint_path)
+        print(f"Resuming: {state['rows_written']:,} rows already written")
+    else:
+        if resume:
+            print("No checkpoint found, starting from the beginning")
+        output_bytes = 0
+        if append and not partition_dir and os.path.exists(output_file):
+            output_bytes = os.path.getsize(output_file)
+        state = {"files_done": [], "current_file": None, "rows_done": 0, "rows_written": 0,
+                 "output_bytes": output_bytes, "next_part": 0, "counts": {}}
+
+    # Drop anything written after the last checkpoint
+    if partition_dir:
+        for part in Path(partition_dir).glob("part-*.csv"):
+            if int(part.stem.split("-")[1]) >= state["next_part"]:
+                part.unlink()
+    elif os.path.exists(output_file):
+        with open(output_file, "r+b") as f:
+            f.truncate(state["output_bytes"])
+
+    counts = Counter(state["counts"])
+    total_rows = dataset.known_rows
+    started = time.perf_counter()
+    rows_this_run = 0
+
+    executor = None
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = memory.fit_workers(workers)
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        memory.watch_pool(executor)
+
+    try:
+        for entry in dataset.entries:
+            if entry["path"] in state["files_done"]:
+                continue
+            skip = state["rows_done"] if state["current_file"] == entry["path"] else 0
+            state["current_file"], state["rows_done"] = entry["path"], skip
+
+            single = CommentDataset([entry], manifest=dataset.manifest)
+            seen = 0
+            for chunk in profiling.timed_iter('read', single.iter_chunks(chunksize=rows_per_chunk)):
+                seen += len(chunk)
+                if seen <= skip:
+                    continue
+                if seen - len(chunk) < skip:
+                    chunk = chunk.iloc[skip - (seen - len(chunk)):]
+
+                chunk = chunk.reindex(columns=OUTPUT_COLUMNS)
+                chunk["sentiment_score"] = score_comments(
+                    chunk, workers=workers, chunk_size=chunk_size, cache=cache, engine=engine,
+                    executor=executor, verbose=False
+                )
+                with profiling.stage('label', rows=len(chunk)):
+                    chunk["sentiment"] = chunk["sentiment_score"].apply(get_sentiment_label)
+
+                with profiling.stage('write', rows=len(chunk)):
+                    if partition_dir:
+                        part = Path(partition_dir) / f"part-{state['next_part']:05d}.csv"
+                        chunk.to_csv(part, index=False, encoding="utf-8")
+                        state["next_part"] += 1
+                    else:
+                        write_header = state["output_bytes"] == 0
+                        with open(output_file, "a", newline="", encoding="utf-8") as f:
+                            chunk.to_csv(f, index=False, header=write_header)
+                            f.flush()
+                            os.fsync(f.fileno())
+                        state["output_bytes"] = os.path.getsize(output_file)
+
+                counts.update(chunk["sentiment"].value_counts().to_dict())
+                state["rows_done"] = seen
+                state["rows_written"] += len(chunk)
+                state["counts"] = dict(counts)
+                with profiling.stage('checkpoint'):
+                    _save_checkpoint(checkpoint_path, state)
+
+                if executor is not None and memory.pool_fit(executor, workers) < workers:
+                    workers = memory.pool_fit(executor, workers)
+                    print(f"⚠️  Memory budget: continuing with {workers} worker(s)")
+                    memory.unwatch_pool(executor)
+                    executor.shutdown()
+                    executor = None
+                    if workers > 1:
+                        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                        memory.watch_pool(executor)
+
+                rows_this_run += len(chunk)
+                elapsed = time.perf_counter() - started
+                progress = f"{state['rows_written']:,}"
+                if total_rows:
+                    progress += f"/{total_rows:,}"
+                print(f"  Scored {progress} rows ({rows_this_run / elapsed:,.0f} rows/sec) | "
+                      + ", ".join(f"{label}: {n:,}" for label, n in sorted(counts.items())))
+
+            state["files_done"].append(entry["path"])
+            state["current_file"], state["rows_done"] = None, 0
+            _save_checkpoint(checkpoint_path, state)
+            single.commit()
+    except KeyboardInterrupt:
+        print(f"\n⚠️ Interrupted after {state['rows_written']:,} rows. Rerun with --resume to continue.")
+        raise
+    finally:
+        if executor is not None:
+            memory.unwatch_pool(executor)
+            executor.shutdown()
+
+    checkpoint_path.unlink(missing_ok=True)
+    return counts
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score collected YouTube comments with VADER sentiment"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for scoring (default: 1 = serial, 0 = all CPUs)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Comments per worker task (default: {DEFAULT_CHUNK_SIZE})"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="vader",
+        help="Scoring engine: 'vader' (reference) or 'vectorized' (batch, "
+             "matches VADER compound scores within 1e-4) (default: vader)"
+    )
+    parser.add_argument(
+        "--cache",
+        help=f"Sentiment score cache file (default: {CACHE_NAME} in --data-dir)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_const",
+        const='',
+        help="Rescore every comment without reading or updating the cache"
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        action="store_true",
+        help="Cluster near-duplicate (template/spam) comments with MinHash LSH "
+             "and add dup_cluster/dup_count columns"
+    )
+    parser.add_argument(
+        "--near-dup-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Estimated Jaccard similarity needed to merge comments (default: {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read, score and write in chunks with constant memory (resumable)"
+    )
+    parser.add_argument(
+        "--stream-rows",
+        type=int,
+        default=DEFAULT_STREAM_ROWS,
+        help=f"Rows per streamed chunk (default: {DEFAULT_STREAM_ROWS})"
+    )
+    parser.add_argument(
+        "--partition-dir",
+        help="With --stream, write one CSV part per chunk into this directory"
+    )
+    parser.add_argument(
+        "--only-new",
+        action="store_true",
+        help="With --stream, score only files not yet in the manifest and rows appended to known files, "
+             "and append them to the output"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="With --stream, continue an interrupted run from its checkpoint"
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=DEFAULT_DATA_DIR,
+        help=f"Directory holding the collected youtube_*.csv files (default: {DEFAULT_DATA_DIR})"
+    )
+    parser.add_argument(
+        "--output",
+        default=OUTPUT_FILE,
+        help=f"Results CSV (default: {OUTPUT_FILE})"
+    )
+    profiling.add_arguments(parser)
+    memory.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error("--workers must be 0 or a positive integer")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be a positive integer")
+    if args.stream_rows < 1:
+        parser.error("--stream-rows must be a positive integer")
+    if args.stream and args.near_duplicates:
+        parser.error("--near-duplicates needs the whole dataset and cannot be used with --stream")
+    if not args.stream and (args.partition_dir or args.only_new or args.resume):
+        parser.error("--partition-dir, --only-new and --resume require --stream")
+    if args.cache is None:
+        args.cache = os.path.join(args.data_dir, CACHE_NAME)
+    memory.apply(args, parser)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    with profiling.session(args, 'sentiment', argv):
+        run(args)
+
+def run(args):
+    """Score the comments as configured by parse_args()"""
+    if not args.stream and memory.budget():
+        # Loading everything at once would not fit: stream it instead
+        dataset = load_all_youtube_comments(args.data_dir, only_new=args.only_new)
+        needed = sum(os.path.getsize(path) for path in dataset.files) * memory.CSV_EXPANSION
+        if not memory.fits(needed):
+            if args.near_duplicates:
+                print(f"⚠️  About {memory.format_size(needed)} needed for --near-duplicates, more than the "
+                      f"memory budget leaves; continuing in memory")
+            else:
+                print(f"⚠️  About {memory.format_size(needed)} needed to score in memory, more than the "
+                      f"memory budget leaves; streaming instead")
+                args.stream = True
+
+    if args.stream:
+        dataset = load_all_youtube_comments(args.data_dir, only_new=args.only_new)
+        print(f"Streaming {len(dataset.files)} file(s) in chunks of {args.stream_rows:,} rows")
+        cache = SentimentCache(args.cache, analyzer_version(args.engine)) if args.cache else None
+        try:
+            counts = stream_sentiment(
+                dataset, output_file=args.output, partition_dir=args.partition_dir,
+                rows_per_chunk=args.stream_rows, workers=args.workers, chunk_size=args.chunk_size,
+                cache=cache, engine=args.engine, resume=args.resume, append=args.only_new
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+
+        print("\nSentiment distribution:")
+        for label, n in counts.most_common():
+            print(f"  {label}: {n:,}")
+        print(f"\n✅ Sentiment results saved to: {args.partition_dir or args.output}")
+        return
+
+    dataset = load_all_youtube_comments(args.data_dir)
+    with profiling.stage('load') as load:
+        df = dataset.to_frame()
+        load.rows = len(df)
+
+    print(f"Loaded {len(df):,} YouTube comments from {len(dataset.files)} file(s)")
 
     # Sentiment analysis
-    df["sentiment_score"] = df["text"].apply(get_sentiment_score)
-    df["sentiment"] = df["sentiment_score"].apply(get_sentiment_label)
+    cache = SentimentCache(args.cache, analyzer_version(args.engine)) if args.cache else None
+    try:
+        df["sentiment_score"] = score_comments(
+            df, workers=args.workers, chunk_size=args.chunk_size, cache=cache, engine=args.engine
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    with profiling.stage('label', rows=len(df)):
+        df["sentiment"] = df["sentiment_score"].apply(get_sentiment_label)
+
+    if args.near_duplicates:
+        from near_duplicates import cluster_near_duplicates
+
+        with profiling.stage('near_duplicates', rows=len(df)):
+            clusters = cluster_near_duplicates(df["text"].tolist(), threshold=args.near_dup_threshold)
+        df["dup_cluster"] = clusters["dup_cluster"].to_numpy()
+        df["dup_count"] = clusters["dup_count"].to_numpy()
+        n_clusters = df["dup_cluster"].nunique()
+        print(f"Near-duplicates: {len(df):,} comments in {n_clusters:,} clusters "
+              f"({len(df) - n_clusters:,} collapsible copies)")
 
     # Save results
-    output_file = "collected_data/youtube_sentiment_results.csv"
-    df.to_csv(output_file, index=False, encoding="utf-8")
+    output_file = args.output
+    with profiling.stage('write', rows=len(df)):
+        df.to_csv(output_file, index=False, encoding="utf-8")
+    dataset.commit()
 
     print("\nSentiment distribution:")
     print(df["sentiment"].value_counts())
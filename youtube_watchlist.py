@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+YouTube watchlist daemon
+Keeps a watchlist of hashtags and videos and polls each video at a rate set
+by its recent comment velocity: new and fast-moving videos are polled first
+and most often, quiet ones back off, and the whole schedule stays inside the
+daily API quota. New comments are appended to the collection store as they
+are fetched, and the schedule survives restarts.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add current directory to path
+sys.path.append('.')
+
+from collectors import CollectionStore, RateLimiter
+from config import config
+
+# YouTube Data API quota units per call
+SEARCH_COST = 100
+LIST_COST = 1
+VIDEOS_PER_LIST = 50
+COMMENTS_PER_PAGE = 100
+
+# Poll scheduling:
+#   a video is polled about when TARGET_NEW_COMMENTS new comments are
+#   expected at its smoothed velocity, clamped to [MIN_INTERVAL, MAX_INTERVAL];
+#   a poll that finds nothing new multiplies the interval by BACKOFF
+MIN_INTERVAL = 60
+MAX_INTERVAL = 6 * 3600
+TARGET_NEW_COMMENTS = 50
+BACKOFF = 2.0
+VELOCITY_SMOOTHING = 0.5
+# Page cap per poll; only a first backfill should reach it, since busy
+# videos are polled about every TARGET_NEW_COMMENTS comments. A capped
+# poll resumes on the next cycle
+MAX_PAGES_PER_POLL = 10
+# Growth explained by replies to old threads does not trigger a poll, but a
+# video is polled at least this often so a stale reply estimate cannot hide
+# new threads
+REPLY_RECHECK = 24 * 3600
+# Seconds between searches for new videos per hashtag
+HASHTAG_INTERVAL = 3600
+# Unused quota is banked for at most this many hours
+QUOTA_BURST_HOURS = 1
+# Comment IDs remembered per video to drop re-fetched comments
+SEEN_IDS = 2000
+# Start new output files after this many seconds
+ROTATE_SECONDS = 24 * 3600
+
+STATE_VERSION = 1
+STATE_NAME = ".youtube_watchlist.json"
+# A poll run pages from the newest thread back to the watermark and may
+# span cycles: the page to resume from, the newest thread seen, and the
+# commentCount, time and new rows since the run started
+NEW_RUN = {'page_token': None, 'run_newest': '', 'run_count': 0, 'run_started': None, 'run_rows': 0}
+
+
+def _epoch(timestamp):
+    """Seconds since the epoch for an API timestamp like 2026-01-01T00:00:00Z"""
+    return datetime.strptime(timestamp[:19], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+
+
+def quota_budget(units_per_day, clock=time.time):
+    """RateLimiter spending API quota units evenly over the day"""
+    rate = units_per_day / 86400
+    return RateLimiter(rate, burst=max(SEARCH_COST + LIST_COST, rate * QUOTA_BURST_HOURS * 3600), clock=clock)
+
+
+class WatchlistDaemon:
+    def __init__(self, collector, output_dir=None, state_path=None, quota_per_day=None, include_replies=None,
+                 clock=time.time, sleep=time.sleep):
+        """
+        Schedule comment polling for a watchlist of hashtags and videos
+
+        Args:
+            collector: YouTubeCollector used for the API calls
+            output_dir: Directory for youtube_{hashtag}_{timestamp}.csv files
+                (default: config.OUTPUT_DIR)
+            state_path: JSON file holding the watchlist and schedule (default:
+                .youtube_watchlist.json in output_dir; False = in memory only)
+            quota_per_day: API units the daemon may spend per day (default: config.YOUTUBE_DAILY_QUOTA)
+            include_replies: Collect replies too (default: config.INCLUDE_REPLIES)
+            clock, sleep: Time source and sleep function (replaceable for simulation)
+        """
+        self.collector = collector
+        self.output_dir = output_dir or config.OUTPUT_DIR
+        self.state_path = os.path.join(self.output_dir, STATE_NAME) if state_path is None else state_path
+        self.include_replies = config.INCLUDE_REPLIES if include_replies is None else include_replies
+        self.clock = clock
+        self.sleep = sleep
+        self.budget = quota_budget(quota_per_day or config.YOUTUBE_DAILY_QUOTA, clock=clock)
+        self.hashtags = {}
+        self.videos = {}
+        self.stores = {}
+        self.store_started = None
+        self.units_spent = 0
+        if state_path and os.path.exists(state_path):
+            self.load_state()
+
+    def add_hashtag(self, hashtag):
+        """Watch a hashtag; it is searched for new videos every HASHTAG_INTERVAL seconds"""
+        self.hashtags.setdefault(hashtag.lstrip('#'), {'next_search': self.clock()})
+
+    def add_video(self, video_id, hashtag=''):
+        """Watch a video; videos never polled go first"""
+        if video_id not in self.videos:
+            self.videos[video_id] = {
+                'hashtag': hashtag, 'count': None, 'fetched_count': 0, 'checked': None, 'velocity': 0.0,
+                'interval': MIN_INTERVAL, 'next_poll': self.clock(), 'watermark': '', 'seen': [],
+                'polls': 0, 'collected': 0, 'fetched_at': None, 'reply_rate': 0.0, **NEW_RUN,
+            }
+
+    def load_state(self):
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            self.hashtags = state['hashtags']
+            self.videos = state['videos']
+            for video in self.videos.values():
+                for key, value in {'fetched_at': None, 'reply_rate': 0.0, **NEW_RUN}.items():
+                    video.setdefault(key, value)
+
+    def save_state(self):
+        if not self.state_path:
+            return
+        Path(self.state_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STATE_VERSION, 'hashtags': self.hashtags, 'videos': self.videos}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _spend(self, units):
+        if self.budget.try_acquire(units):
+            self.units_spent += units
+            return True
+        return False
+
+    def _store(self, hashtag, now):
+        """Output file for a hashtag, rotated every ROTATE_SECONDS"""
+        if self.store_started is None or now - self.store_started >= ROTATE_SECONDS:
+            self.close()
+            self.store_started = now
+        name = hashtag or 'watchlist'
+        if name not in self.stores:
+            timestamp = datetime.fromtimestamp(self.store_started).strftime('%Y%m%d_%H%M%S')
+            self.stores[name] = CollectionStore(self.output_dir, name, timestamp)
+        return self.stores[name]
+
+    def close(self):
+        files = [path for store in self.stores.values() for path in store.close()]
+        self.stores = {}
+        return files
+
+    def _priority(self, video, now):
+        """Sort key: never-polled videos first, then the most comments expected since the last check"""
+        if video['checked'] is None:
+            return (0, 0.0)
+        return (1, -video['velocity'] * (now - video['checked']) / 3600)
+
+    def _update_velocity(self, video, info, now):
+        """Fold a commentCount observation into the smoothed comments/hour; returns the count change"""
+        count = info['comments']
+        if video['checked'] is None:
+            # First sighting: average rate since publication
+            age = max(3600.0, now - _epoch(info['published_at'])) if info.get('published_at') else 3600.0
+            video['velocity'] = count / age * 3600
+            delta = count
+        else:
+            delta = count - video['count']
+            # Replies to old threads raise commentCount but polls cannot reach them
+            rate = max(0.0, max(0, delta) / max(1.0, now - video['checked']) * 3600 - video['reply_rate'])
+            video['velocity'] = VELOCITY_SMOOTHING * rate + (1 - VELOCITY_SMOOTHING) * video['velocity']
+        video['count'] = count
+        video['checked'] = now
+        return delta
+
+    def _schedule(self, video, delta, now):
+        if delta > 0 and video['velocity'] > 0:
+            interval = TARGET_NEW_COMMENTS / video['velocity'] * 3600
+        else:
+            interval = video['interval'] * BACKOFF
+        video['interval'] = min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+        video['next_poll'] = now + video['interval']
+
+    def _unfetched(self, video, info, now):
+        """
+        Comments the video gained since its last completed poll, less the
+        expected replies to threads older than the watermark (polls stop at
+        the watermark, so those replies are never fetched)
+        """
+        growth = info['comments'] - video['fetched_count']
+        if video['fetched_at'] is None or now - video['fetched_at'] >= REPLY_RECHECK:
+            return growth
+        return growth - video['reply_rate'] * (now - video['fetched_at']) / 3600
+
+    def _complete(self, video):
+        """Advance the watermark past a finished run and update the reply estimate"""
+        if video['fetched_at'] is not None:
+            # Growth the run's new rows do not account for went to old threads
+            hours = max(1.0, video['run_started'] - video['fetched_at']) / 3600
+            replies = max(0, video['run_count'] - video['fetched_count'] - video['run_rows']) / hours
+            video['reply_rate'] = VELOCITY_SMOOTHING * replies + (1 - VELOCITY_SMOOTHING) * video['reply_rate']
+        video['watermark'] = video['run_newest']
+        video['fetched_count'] = video['run_count']
+        video['fetched_at'] = video['run_started']
+        video.update(NEW_RUN)
+
+    def _fetch(self, video_id, video, info, now):
+        """
+        Fetch comments newer than the video's watermark, newest first
+
+        A run that stops early (quota, the MAX_PAGES_PER_POLL cap or an API
+        error) resumes on a later cycle, from its next page unless the
+        request failed; the watermark only advances once the run reaches
+        it or the last page.
+
+        Returns:
+            Tuple (new comments written, complete)
+        """
+        from googleapiclient.errors import HttpError
+
+        if video['hashtag']:
+            self.collector.current_hashtag = video['hashtag']
+        else:
+            vars(self.collector).pop('current_hashtag', None)
+        if video['run_started'] is None:
+            video.update(run_newest=video['watermark'], run_count=info['comments'], run_started=now)
+        seen = set(video['seen'])
+        rows = []
+        complete = failed = False
+        for _ in range(MAX_PAGES_PER_POLL):
+            if not self._spend(LIST_COST):
+                break
+            try:
+                page, next_token = self.collector.fetch_comment_page(
+                    video_id, video['page_token'], COMMENTS_PER_PAGE, self.include_replies, info,
+                )
+            except HttpError as e:
+                print(f"⚠️  Comments for video {video_id} failed: {e}")
+                failed = True
+                # Page from the top again next time, in case the token went stale
+                video['page_token'] = None
+                if e.resp.status == 404 or 'commentsDisabled' in str(e):
+                    video['interval'] = MAX_INTERVAL
+                    video['next_poll'] = now + MAX_INTERVAL
+                break
+            fresh = [comment for comment in page if comment['comment_id'] not in seen]
+            rows.extend(fresh)
+            seen.update(comment['comment_id'] for comment in fresh)
+            video['run_newest'] = max([video['run_newest']] +
+                                      [comment['published_at'] for comment in page if not comment['is_reply']])
+            video['page_token'] = next_token
+            # Threads are newest first: once one predates the watermark the rest are known
+            if not next_token or (video['watermark'] and any(
+                    not comment['is_reply'] and comment['published_at'] <= video['watermark'] for comment in page)):
+                complete = True
+                break
+
+        if rows:
+            import pandas as pd
+
+            self._store(video['hashtag'], now).write('youtube', pd.DataFrame(rows))
+        video['seen'] = (video['seen'] + [comment['comment_id'] for comment in rows])[-SEEN_IDS:]
+        video['collected'] += len(rows)
+        video['run_rows'] += len(rows)
+        if complete:
+            self._complete(video)
+        elif not failed:
+            # Out of quota or at the page cap: resume from here as soon as possible
+            video['next_poll'] = now
+        return len(rows), complete
+
+    def _discover(self, hashtag, now):
+        """Add the hashtag's newest videos to the watchlist"""
+        video_ids = self.collector.search_videos_by_hashtag(hashtag, max_videos=VIDEOS_PER_LIST, order='date')
+        for video_id in video_ids:
+            self.add_video(video_id, hashtag)
+        self.hashtags[hashtag]['next_search'] = now + HASHTAG_INTERVAL
+        return len(video_ids)
+
+    def step(self):
+        """
+        Run one scheduling cycle: search due hashtags, check due videos'
+        comment counts in batches, and fetch the new comments of those that
+        changed, hottest first, while quota remains
+
+        Returns:
+            Dict with videos checked, new comments and quota units left
+        """
+        now = self.clock()
+        for hashtag, entry in self.hashtags.items():
+            if entry['next_search'] <= now and self._spend(SEARCH_COST + LIST_COST):
+                self._discover(hashtag, now)
+
+        due = sorted((video_id for video_id, video in self.videos.items() if video['next_poll'] <= now),
+                     key=lambda video_id: self._priority(self.videos[video_id], now))
+        checked = new = 0
+        for start in range(0, len(due), VIDEOS_PER_LIST):
+            batch = due[start:start + VIDEOS_PER_LIST]
+            if not self._spend(LIST_COST):
+                break
+            details = self.collector.get_video_details(batch)
+            changes = []
+            for video_id in batch:
+                video = self.videos[video_id]
+                info = details.get(video_id)
+                checked += 1
+                if info is None:
+                    # Deleted, private or a failed request: try again much later
+                    video['interval'] = MAX_INTERVAL
+                    video['next_poll'] = now + MAX_INTERVAL
+                    continue
+                delta = self._update_velocity(video, info, now)
+                self._schedule(video, delta, now)
+                unfetched = self._unfetched(video, info, now)
+                if video['run_started'] is not None or unfetched >= 1:
+                    changes.append(((video['polls'] > 0, -unfetched), video_id, info))
+
+            # New videos first, then the most new comments
+            for _, video_id, info in sorted(changes, key=lambda change: change[0]):
+                video = self.videos[video_id]
+                count, _ = self._fetch(video_id, video, info, now)
+                new += count
+                video['polls'] += 1
+        self.save_state()
+        return {'checked': checked, 'new_comments': new, 'quota_left': self.budget.available()}
+
+    def next_wake(self):
+        """Seconds until something is due and there is quota to spend on it"""
+        now = self.clock()
+        due = [entry['next_search'] for entry in self.hashtags.values()]
+        due += [video['next_poll'] for video in self.videos.values()]
+        wait = max(0.0, min(due) - now) if due else MAX_INTERVAL
+        shortfall = LIST_COST - self.budget.available()
+        if shortfall > 0:
+            wait = max(wait, shortfall / self.budget.rate)
+        return min(max(wait, 1.0), MAX_INTERVAL)
+
+    def run(self, cycles=None, verbose=True):
+        """Poll until interrupted (or for `cycles` cycles), sleeping between them"""
+        done = 0
+        try:
+            while cycles is None or done < cycles:
+                stats = self.step()
+                done += 1
+                wait = self.next_wake()
+                if verbose:
+                    print(f"[{datetime.fromtimestamp(self.clock()).strftime('%H:%M:%S')}] "
+                          f"checked {stats['checked']} video(s), +{stats['new_comments']} comment(s), "
+                          f"{stats['quota_left']:.0f} quota units banked; next cycle in {wait:.0f}s")
+                if cycles is None or done < cycles:
+                    self.sleep(wait)
+        except KeyboardInterrupt:
+            print("\nStopping watchlist")
+        finally:
+            self.save_state()
+            files = self.close()
+        return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Continuously collect new YouTube comments for a watchlist of hashtags and videos",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --hashtags python,rust
+  %(prog)s --videos dQw4w9WgXcQ --quota 2000
+        """
+    )
+    parser.add_argument("--hashtags", default='', help="Comma-separated hashtags whose new videos are watched")
+    parser.add_argument("--videos", default='', help="Comma-separated video IDs to watch")
+    parser.add_argument("--api-key", help="YouTube API key (overrides .env file)")
+    parser.add_argument("--quota", type=int, default=config.YOUTUBE_DAILY_QUOTA,
+                        help=f"API quota units to spend per day (default: {config.YOUTUBE_DAILY_QUOTA})")
+    parser.add_argument("--output-dir", default=config.OUTPUT_DIR, help="Directory for the comment files")
+    parser.add_argument("--state", help=f"Watchlist state file, resumed on restart (default: OUTPUT_DIR/{STATE_NAME})")
+    parser.add_argument("--no-replies", dest="include_replies", action="store_false", default=config.INCLUDE_REPLIES,
+                        help="Exclude comment replies")
+    parser.add_argument("--cycles", type=int, help="Stop after this many cycles (default: run until Ctrl-C)")
+    args = parser.parse_args(argv)
+    if args.quota <= 0:
+        parser.error("--quota must be positive")
+
+    from youtube_collector import YouTubeCollector
+
+    try:
+        daemon = WatchlistDaemon(YouTubeCollector(api_key=args.api_key), output_dir=args.output_dir,
+                                 state_path=args.state, quota_per_day=args.quota, include_replies=args.include_replies)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    for hashtag in filter(None, (tag.strip() for tag in args.hashtags.split(','))):
+        daemon.add_hashtag(hashtag)
+    for video_id in filter(None, (video.strip() for video in args.videos.split(','))):
+        daemon.add_video(video_id)
+    if not daemon.hashtags and not daemon.videos:
+        parser.error("nothing to watch: pass --hashtags and/or --videos")
+
+    print(f"Watching {len(daemon.hashtags)} hashtag(s) and {len(daemon.videos)} video(s) "
+          f"on {args.quota:,} quota units/day")
+    files = daemon.run(cycles=args.cycles)
+    for path in files:
+        print(f"✅ Comments saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()